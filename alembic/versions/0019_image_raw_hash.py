@@ -0,0 +1,32 @@
+"""map raw upload hashes to normalized image hashes
+
+Revision ID: 0019_image_raw_hash
+Revises: 0018_drop_city_labels
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "0019_image_raw_hash"
+down_revision = "0018_drop_city_labels"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+  op.execute(
+    """
+    CREATE TABLE IF NOT EXISTS core.image_raw_hash (
+      raw_sha256        text PRIMARY KEY,
+      normalized_sha256 text NOT NULL,
+      created_at        timestamptz NOT NULL DEFAULT now()
+    );
+    CREATE INDEX IF NOT EXISTS ix_image_raw_hash_normalized
+      ON core.image_raw_hash(normalized_sha256);
+    """
+  )
+
+
+def downgrade() -> None:
+  op.execute("DROP TABLE IF EXISTS core.image_raw_hash;")
@@ -0,0 +1,34 @@
+"""index storage keys to analyzed images
+
+Revision ID: 0020_image_storage_index
+Revises: 0019_image_raw_hash
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "0020_image_storage_index"
+down_revision = "0019_image_raw_hash"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+  op.execute(
+    """
+    CREATE TABLE IF NOT EXISTS core.image_storage_index (
+      storage_key text PRIMARY KEY,
+      etag        text NULL,
+      image_id    uuid NOT NULL REFERENCES core.image_asset(image_id) ON DELETE CASCADE,
+      cache_key   text NULL,
+      created_at  timestamptz NOT NULL DEFAULT now()
+    );
+    CREATE INDEX IF NOT EXISTS ix_image_storage_index_image
+      ON core.image_storage_index(image_id);
+    """
+  )
+
+
+def downgrade() -> None:
+  op.execute("DROP TABLE IF EXISTS core.image_storage_index;")
@@ -0,0 +1,169 @@
+"""monthly range partitions for scan_event and vision_cache
+
+Revision ID: 0021_partition_scan_vcache
+Revises: 0020_image_storage_index
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "0021_partition_scan_vcache"
+down_revision = "0020_image_storage_index"
+branch_labels = None
+depends_on = None
+
+
+# Creates one partition per month from the oldest existing row up to three
+# months ahead; scripts/maintain_partitions.py keeps extending the window.
+_CREATE_MONTHLY_PARTITIONS = """
+DO $$
+DECLARE
+  first_month date;
+  last_month  date := date_trunc('month', now() + interval '3 months')::date;
+  m           date;
+BEGIN
+  SELECT date_trunc('month', COALESCE(min({column}), now()))::date
+    INTO first_month
+    FROM core.{table}_unpartitioned;
+  m := first_month;
+  WHILE m <= last_month LOOP
+    EXECUTE format(
+      'CREATE TABLE IF NOT EXISTS core.%I PARTITION OF core.{table} FOR VALUES FROM (%L) TO (%L)',
+      '{table}_p' || to_char(m, 'YYYYMM'), m, (m + interval '1 month')::date
+    );
+    m := (m + interval '1 month')::date;
+  END LOOP;
+END $$;
+"""
+
+
+def upgrade() -> None:
+  op.execute(
+    """
+    ALTER TABLE core.scan_event RENAME TO scan_event_unpartitioned;
+    ALTER INDEX core.ix_scan_event_created RENAME TO ix_scan_event_unpartitioned_created;
+    ALTER INDEX core.ix_scan_event_city RENAME TO ix_scan_event_unpartitioned_city;
+    ALTER INDEX core.ix_scan_event_item RENAME TO ix_scan_event_unpartitioned_item;
+    ALTER INDEX core.ix_scan_event_prospect RENAME TO ix_scan_event_unpartitioned_prospect;
+
+    CREATE TABLE core.scan_event (
+      scan_id     uuid NOT NULL DEFAULT gen_random_uuid(),
+      image_id    uuid NOT NULL REFERENCES core.image_asset(image_id) ON DELETE CASCADE,
+      cache_key   text NULL,
+      city_id     uuid NOT NULL REFERENCES core.city(city_id) ON DELETE CASCADE,
+      item_id     uuid NULL REFERENCES core.item(item_id) ON DELETE SET NULL,
+      prospect_id uuid NULL REFERENCES core.prospect(prospect_id) ON DELETE SET NULL,
+      search_text text NULL,
+      source      text NOT NULL DEFAULT 'scan',
+      created_at  timestamptz NOT NULL DEFAULT now(),
+      PRIMARY KEY (scan_id, created_at)
+    ) PARTITION BY RANGE (created_at);
+    CREATE INDEX ix_scan_event_created ON core.scan_event(created_at);
+    CREATE INDEX ix_scan_event_city ON core.scan_event(city_id);
+    CREATE INDEX ix_scan_event_item ON core.scan_event(item_id);
+    CREATE INDEX ix_scan_event_prospect ON core.scan_event(prospect_id);
+    CREATE TABLE core.scan_event_default PARTITION OF core.scan_event DEFAULT;
+    """
+  )
+  op.execute(_CREATE_MONTHLY_PARTITIONS.format(table="scan_event", column="created_at"))
+  op.execute(
+    """
+    INSERT INTO core.scan_event
+      (scan_id, image_id, cache_key, city_id, item_id, prospect_id, search_text, source, created_at)
+    SELECT scan_id, image_id, cache_key, city_id, item_id, prospect_id, search_text, source, created_at
+    FROM core.scan_event_unpartitioned;
+    DROP TABLE core.scan_event_unpartitioned;
+    """
+  )
+
+  # cache_key alone can no longer be unique (the partition key must be part of
+  # every unique constraint); _cache_set replaces the row under an advisory lock.
+  op.execute(
+    """
+    ALTER TABLE core.vision_cache RENAME TO vision_cache_unpartitioned;
+    ALTER INDEX core.ix_vision_cache_expires RENAME TO ix_vision_cache_unpartitioned_expires;
+    ALTER INDEX core.ix_vision_cache_image RENAME TO ix_vision_cache_unpartitioned_image;
+
+    CREATE TABLE core.vision_cache (
+      cache_key     text NOT NULL,
+      image_id      uuid NULL REFERENCES core.image_asset(image_id) ON DELETE SET NULL,
+      canonical_key text NULL,
+      confidence    double precision NOT NULL,
+      labels        jsonb NOT NULL,
+      notes         text NULL,
+      created_at    timestamptz NOT NULL DEFAULT now(),
+      expires_at    timestamptz NOT NULL,
+      PRIMARY KEY (cache_key, expires_at)
+    ) PARTITION BY RANGE (expires_at);
+    CREATE INDEX ix_vision_cache_expires ON core.vision_cache(expires_at);
+    CREATE INDEX ix_vision_cache_image ON core.vision_cache(image_id);
+    CREATE TABLE core.vision_cache_default PARTITION OF core.vision_cache DEFAULT;
+    """
+  )
+  op.execute(_CREATE_MONTHLY_PARTITIONS.format(table="vision_cache", column="expires_at"))
+  op.execute(
+    """
+    INSERT INTO core.vision_cache
+      (cache_key, image_id, canonical_key, confidence, labels, notes, created_at, expires_at)
+    SELECT cache_key, image_id, canonical_key, confidence, labels, notes, created_at, expires_at
+    FROM core.vision_cache_unpartitioned
+    WHERE expires_at > now();
+    DROP TABLE core.vision_cache_unpartitioned;
+    """
+  )
+
+
+def downgrade() -> None:
+  op.execute(
+    """
+    ALTER TABLE core.vision_cache RENAME TO vision_cache_partitioned;
+    ALTER INDEX core.ix_vision_cache_expires RENAME TO ix_vision_cache_partitioned_expires;
+    ALTER INDEX core.ix_vision_cache_image RENAME TO ix_vision_cache_partitioned_image;
+    CREATE TABLE core.vision_cache (
+      cache_key     text PRIMARY KEY,
+      image_id      uuid NULL REFERENCES core.image_asset(image_id) ON DELETE SET NULL,
+      canonical_key text NULL,
+      confidence    double precision NOT NULL,
+      labels        jsonb NOT NULL,
+      notes         text NULL,
+      created_at    timestamptz NOT NULL DEFAULT now(),
+      expires_at    timestamptz NOT NULL
+    );
+    INSERT INTO core.vision_cache
+      (cache_key, image_id, canonical_key, confidence, labels, notes, created_at, expires_at)
+    SELECT DISTINCT ON (cache_key)
+      cache_key, image_id, canonical_key, confidence, labels, notes, created_at, expires_at
+    FROM core.vision_cache_partitioned
+    ORDER BY cache_key, expires_at DESC;
+    DROP TABLE core.vision_cache_partitioned;
+    CREATE INDEX IF NOT EXISTS ix_vision_cache_expires ON core.vision_cache(expires_at);
+    CREATE INDEX IF NOT EXISTS ix_vision_cache_image ON core.vision_cache(image_id);
+
+    ALTER TABLE core.scan_event RENAME TO scan_event_partitioned;
+    ALTER INDEX core.ix_scan_event_created RENAME TO ix_scan_event_partitioned_created;
+    ALTER INDEX core.ix_scan_event_city RENAME TO ix_scan_event_partitioned_city;
+    ALTER INDEX core.ix_scan_event_item RENAME TO ix_scan_event_partitioned_item;
+    ALTER INDEX core.ix_scan_event_prospect RENAME TO ix_scan_event_partitioned_prospect;
+    CREATE TABLE core.scan_event (
+      scan_id     uuid PRIMARY KEY DEFAULT gen_random_uuid(),
+      image_id    uuid NOT NULL REFERENCES core.image_asset(image_id) ON DELETE CASCADE,
+      cache_key   text NULL,
+      city_id     uuid NOT NULL REFERENCES core.city(city_id) ON DELETE CASCADE,
+      item_id     uuid NULL REFERENCES core.item(item_id) ON DELETE SET NULL,
+      prospect_id uuid NULL REFERENCES core.prospect(prospect_id) ON DELETE SET NULL,
+      search_text text NULL,
+      source      text NOT NULL DEFAULT 'scan',
+      created_at  timestamptz NOT NULL DEFAULT now()
+    );
+    INSERT INTO core.scan_event
+      (scan_id, image_id, cache_key, city_id, item_id, prospect_id, search_text, source, created_at)
+    SELECT scan_id, image_id, cache_key, city_id, item_id, prospect_id, search_text, source, created_at
+    FROM core.scan_event_partitioned;
+    DROP TABLE core.scan_event_partitioned;
+    CREATE INDEX IF NOT EXISTS ix_scan_event_created ON core.scan_event(created_at);
+    CREATE INDEX IF NOT EXISTS ix_scan_event_city ON core.scan_event(city_id);
+    CREATE INDEX IF NOT EXISTS ix_scan_event_item ON core.scan_event(item_id);
+    CREATE INDEX IF NOT EXISTS ix_scan_event_prospect ON core.scan_event(prospect_id);
+    """
+  )
@@ -0,0 +1,24 @@
+"""record the label language of vision_cache entries
+
+Revision ID: 0022_vision_cache_labels_lang
+Revises: 0021_partition_scan_vcache
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "0022_vision_cache_labels_lang"
+down_revision = "0021_partition_scan_vcache"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+  # Existing rows keep NULL: their labels are in whatever language was scanned
+  # first, so lookups treat them as misses until they are replaced.
+  op.execute("ALTER TABLE core.vision_cache ADD COLUMN IF NOT EXISTS labels_lang text NULL;")
+
+
+def downgrade() -> None:
+  op.execute("ALTER TABLE core.vision_cache DROP COLUMN IF EXISTS labels_lang;")
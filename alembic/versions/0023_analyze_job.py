@@ -0,0 +1,47 @@
+"""queue table for asynchronous analyze jobs
+
+Revision ID: 0023_analyze_job
+Revises: 0022_vision_cache_labels_lang
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "0023_analyze_job"
+down_revision = "0022_vision_cache_labels_lang"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+  op.execute(
+    """
+    CREATE TABLE IF NOT EXISTS core.analyze_job (
+      job_id       uuid PRIMARY KEY DEFAULT gen_random_uuid(),
+      owner        text NOT NULL,
+      status       text NOT NULL DEFAULT 'queued'
+        CHECK (status IN ('queued', 'running', 'done', 'failed')),
+      city         text NOT NULL,
+      lang         text NOT NULL,
+      search_text  text NULL,
+      s3_key       text NOT NULL,
+      image_sha256 text NULL,
+      attempts     int NOT NULL DEFAULT 0,
+      result       jsonb NULL,
+      error        text NULL,
+      locked_until timestamptz NULL,
+      created_at   timestamptz NOT NULL DEFAULT now(),
+      started_at   timestamptz NULL,
+      finished_at  timestamptz NULL
+    );
+    CREATE INDEX IF NOT EXISTS ix_analyze_job_runnable
+      ON core.analyze_job(created_at) WHERE status IN ('queued', 'running');
+    CREATE INDEX IF NOT EXISTS ix_analyze_job_finished
+      ON core.analyze_job(finished_at) WHERE finished_at IS NOT NULL;
+    """
+  )
+
+
+def downgrade() -> None:
+  op.execute("DROP TABLE IF EXISTS core.analyze_job;")
@@ -0,0 +1,55 @@
+"""dataset version counter bumped on recycle_center writes
+
+Revision ID: 0024_dataset_version
+Revises: 0023_analyze_job
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "0024_dataset_version"
+down_revision = "0023_analyze_job"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+  op.execute(
+    """
+    CREATE TABLE IF NOT EXISTS core.dataset_version (
+      dataset    text PRIMARY KEY,
+      version    bigint NOT NULL DEFAULT 1,
+      updated_at timestamptz NOT NULL DEFAULT now()
+    );
+
+    CREATE OR REPLACE FUNCTION core.bump_dataset_version() RETURNS trigger AS $$
+    BEGIN
+      INSERT INTO core.dataset_version (dataset, version, updated_at)
+      VALUES (TG_ARGV[0], 1, now())
+      ON CONFLICT (dataset) DO UPDATE
+      SET version = core.dataset_version.version + 1,
+          updated_at = now();
+      RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+
+    DROP TRIGGER IF EXISTS trg_recycle_center_version ON core.recycle_center;
+    CREATE TRIGGER trg_recycle_center_version
+      AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON core.recycle_center
+      FOR EACH STATEMENT EXECUTE FUNCTION core.bump_dataset_version('recycle_center');
+
+    INSERT INTO core.dataset_version (dataset) VALUES ('recycle_center')
+    ON CONFLICT (dataset) DO NOTHING;
+    """
+  )
+
+
+def downgrade() -> None:
+  op.execute(
+    """
+    DROP TRIGGER IF EXISTS trg_recycle_center_version ON core.recycle_center;
+    DROP FUNCTION IF EXISTS core.bump_dataset_version();
+    DROP TABLE IF EXISTS core.dataset_version;
+    """
+  )
@@ -0,0 +1,38 @@
+"""recycle_center GIN index on disposal_positive and (city_id, is_active, typ_code)
+
+Revision ID: 0025_rc_filter_indexes
+Revises: 0024_dataset_version
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "0025_rc_filter_indexes"
+down_revision = "0024_dataset_version"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+  op.execute(
+    """
+    CREATE INDEX IF NOT EXISTS ix_recycle_center_disposal_positive
+      ON core.recycle_center USING gin (disposal_positive);
+    CREATE INDEX IF NOT EXISTS ix_recycle_center_city_active_type
+      ON core.recycle_center(city_id, is_active, typ_code);
+    DROP INDEX IF EXISTS core.ix_recycle_center_city_type;
+    ANALYZE core.recycle_center;
+    """
+  )
+
+
+def downgrade() -> None:
+  op.execute(
+    """
+    CREATE INDEX IF NOT EXISTS ix_recycle_center_city_type
+      ON core.recycle_center(city_id, typ_code);
+    DROP INDEX IF EXISTS core.ix_recycle_center_city_active_type;
+    DROP INDEX IF EXISTS core.ix_recycle_center_disposal_positive;
+    """
+  )
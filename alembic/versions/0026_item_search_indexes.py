@@ -0,0 +1,35 @@
+"""trigram index on item.canonical_key and item(title_key) for ranked item search
+
+Revision ID: 0026_item_search_indexes
+Revises: 0025_rc_filter_indexes
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "0026_item_search_indexes"
+down_revision = "0025_rc_filter_indexes"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+  op.execute(
+    """
+    CREATE EXTENSION IF NOT EXISTS pg_trgm;
+    CREATE INDEX IF NOT EXISTS ix_item_canonical_key_trgm
+      ON core.item USING gin (canonical_key gin_trgm_ops);
+    CREATE INDEX IF NOT EXISTS ix_item_title_key
+      ON core.item(title_key);
+    """
+  )
+
+
+def downgrade() -> None:
+  op.execute(
+    """
+    DROP INDEX IF EXISTS core.ix_item_title_key;
+    DROP INDEX IF EXISTS core.ix_item_canonical_key_trgm;
+    """
+  )
@@ -0,0 +1,33 @@
+"""image_asset (created_at, image_id) index for keyset pagination
+
+Revision ID: 0027_image_asset_keyset_index
+Revises: 0026_item_search_indexes
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "0027_image_asset_keyset_index"
+down_revision = "0026_item_search_indexes"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+  op.execute(
+    """
+    CREATE INDEX IF NOT EXISTS ix_image_asset_created_id
+      ON core.image_asset(created_at DESC, image_id DESC);
+    DROP INDEX IF EXISTS core.ix_image_asset_created;
+    """
+  )
+
+
+def downgrade() -> None:
+  op.execute(
+    """
+    CREATE INDEX IF NOT EXISTS ix_image_asset_created ON core.image_asset(created_at);
+    DROP INDEX IF EXISTS core.ix_image_asset_created_id;
+    """
+  )
@@ -0,0 +1,51 @@
+"""catalog dataset version bumped on writes to the tables resolve_item reads
+
+Revision ID: 0028_catalog_version
+Revises: 0027_image_asset_keyset_index
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "0028_catalog_version"
+down_revision = "0027_image_asset_keyset_index"
+branch_labels = None
+depends_on = None
+
+TABLES = [
+  "item",
+  "item_alias",
+  "i18n_translation",
+  "item_city_text_override",
+  "item_city_category",
+  "item_city_disposal",
+  "item_city_warning",
+  "category",
+  "disposal_method",
+  "warning",
+]
+
+
+def upgrade() -> None:
+  for table in TABLES:
+    op.execute(
+      f"""
+      DROP TRIGGER IF EXISTS trg_{table}_catalog_version ON core.{table};
+      CREATE TRIGGER trg_{table}_catalog_version
+        AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON core.{table}
+        FOR EACH STATEMENT EXECUTE FUNCTION core.bump_dataset_version('catalog');
+      """
+    )
+  op.execute(
+    """
+    INSERT INTO core.dataset_version (dataset) VALUES ('catalog')
+    ON CONFLICT (dataset) DO NOTHING;
+    """
+  )
+
+
+def downgrade() -> None:
+  for table in TABLES:
+    op.execute(f"DROP TRIGGER IF EXISTS trg_{table}_catalog_version ON core.{table};")
+  op.execute("DELETE FROM core.dataset_version WHERE dataset = 'catalog';")
@@ -0,0 +1,284 @@
+"""catalog change journal for delta sync
+
+Replaces the statement triggers of 0028 with row triggers that journal the
+(city, item) pairs a write affects. Each transaction takes one catalog version
+(core.dataset_version['catalog']) on its first journaled row and holds that row
+lock until commit, so versions become visible in order.
+
+Revision ID: 0029_catalog_change_journal
+Revises: 0028_catalog_version
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "0029_catalog_change_journal"
+down_revision = "0028_catalog_version"
+branch_labels = None
+depends_on = None
+
+CATALOG_TABLES = [
+  "item",
+  "item_alias",
+  "i18n_translation",
+  "item_city_text_override",
+  "item_city_category",
+  "item_city_disposal",
+  "item_city_warning",
+  "category",
+  "disposal_method",
+  "warning",
+]
+
+# table -> (trigger function, columns whose change is journaled on UPDATE)
+JOURNAL_TRIGGERS = {
+  "item_city_text_override": ("journal_item_city_change", "OLD.* IS DISTINCT FROM NEW.*"),
+  "item_city_category": ("journal_item_city_change", "OLD.* IS DISTINCT FROM NEW.*"),
+  "item_city_disposal": ("journal_item_city_change", "OLD.* IS DISTINCT FROM NEW.*"),
+  "item_city_warning": ("journal_item_city_change", "OLD.* IS DISTINCT FROM NEW.*"),
+  "item_alias": (
+    "journal_item_alias_change",
+    "(OLD.canonical_key, OLD.lang, OLD.alias_text, OLD.alias_norm)"
+    " IS DISTINCT FROM (NEW.canonical_key, NEW.lang, NEW.alias_text, NEW.alias_norm)",
+  ),
+  "i18n_translation": (
+    "journal_translation_change",
+    "(OLD.key, OLD.lang, OLD.text) IS DISTINCT FROM (NEW.key, NEW.lang, NEW.text)",
+  ),
+}
+
+# Rows of these tables only change the catalog when updated: inserts are not
+# referenced yet, and deletes are restricted by the item_city_* foreign keys
+# (item deletes cascade into item_city_*, which journal them).
+UPDATE_TRIGGERS = {
+  "item": (
+    "journal_item_change",
+    "(OLD.canonical_key, OLD.title_key, OLD.desc_key, OLD.primary_image_id)"
+    " IS DISTINCT FROM (NEW.canonical_key, NEW.title_key, NEW.desc_key, NEW.primary_image_id)",
+  ),
+  "category": ("journal_category_change", "(OLD.code, OLD.name_key) IS DISTINCT FROM (NEW.code, NEW.name_key)"),
+  "disposal_method": (
+    "journal_disposal_method_change",
+    "(OLD.code, OLD.name_key, OLD.recycle_center_typ_code)"
+    " IS DISTINCT FROM (NEW.code, NEW.name_key, NEW.recycle_center_typ_code)",
+  ),
+  "warning": (
+    "journal_warning_change",
+    "(OLD.code, OLD.title_key, OLD.body_key, OLD.severity)"
+    " IS DISTINCT FROM (NEW.code, NEW.title_key, NEW.body_key, NEW.severity)",
+  ),
+}
+
+
+def upgrade() -> None:
+  for table in CATALOG_TABLES:
+    op.execute(f"DROP TRIGGER IF EXISTS trg_{table}_catalog_version ON core.{table};")
+  op.execute(
+    """
+    ALTER TABLE core.dataset_version
+      ADD COLUMN IF NOT EXISTS compacted_through bigint NOT NULL DEFAULT 0;
+
+    CREATE TABLE IF NOT EXISTS core.catalog_change (
+      change_id  bigserial PRIMARY KEY,
+      version    bigint NOT NULL,
+      city_id    uuid NULL,
+      item_id    uuid NOT NULL,
+      created_at timestamptz NOT NULL DEFAULT now()
+    );
+    CREATE INDEX IF NOT EXISTS ix_catalog_change_version
+      ON core.catalog_change(version);
+    CREATE INDEX IF NOT EXISTS ix_item_desc_key ON core.item(desc_key);
+
+    CREATE OR REPLACE FUNCTION core.catalog_xact_version() RETURNS bigint AS $$
+    DECLARE
+      xact text := pg_current_xact_id()::text;
+      cached text := current_setting('core.catalog_xact_version', true);
+      v bigint;
+    BEGIN
+      IF split_part(cached, ':', 1) = xact THEN
+        RETURN split_part(cached, ':', 2)::bigint;
+      END IF;
+      INSERT INTO core.dataset_version (dataset, version, updated_at)
+      VALUES ('catalog', 1, now())
+      ON CONFLICT (dataset) DO UPDATE
+      SET version = core.dataset_version.version + 1,
+          updated_at = now()
+      RETURNING version INTO v;
+      PERFORM set_config('core.catalog_xact_version', xact || ':' || v, true);
+      RETURN v;
+    END;
+    $$ LANGUAGE plpgsql;
+
+    CREATE OR REPLACE FUNCTION core.journal_catalog_change(p_city_id uuid, p_item_id uuid) RETURNS void AS $$
+      INSERT INTO core.catalog_change (version, city_id, item_id)
+      VALUES (core.catalog_xact_version(), p_city_id, p_item_id);
+    $$ LANGUAGE sql;
+
+    CREATE OR REPLACE FUNCTION core.journal_item_city_change() RETURNS trigger AS $$
+    BEGIN
+      IF TG_OP <> 'INSERT' THEN
+        PERFORM core.journal_catalog_change(OLD.city_id, OLD.item_id);
+      END IF;
+      IF TG_OP = 'INSERT' OR (TG_OP = 'UPDATE' AND (OLD.city_id, OLD.item_id) IS DISTINCT FROM (NEW.city_id, NEW.item_id)) THEN
+        PERFORM core.journal_catalog_change(NEW.city_id, NEW.item_id);
+      END IF;
+      RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+
+    CREATE OR REPLACE FUNCTION core.journal_item_change() RETURNS trigger AS $$
+    BEGIN
+      PERFORM core.journal_catalog_change(NULL, NEW.item_id);
+      RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+
+    CREATE OR REPLACE FUNCTION core.journal_item_alias_change() RETURNS trigger AS $$
+    BEGIN
+      PERFORM core.journal_catalog_change(NULL, i.item_id)
+      FROM core.item i
+      WHERE (TG_OP <> 'INSERT' AND i.canonical_key = OLD.canonical_key)
+         OR (TG_OP <> 'DELETE' AND i.canonical_key = NEW.canonical_key);
+      RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+
+    -- Every item showing the translated key, as title/description (base or
+    -- city override) or as the name of one of its categories, disposals or warnings.
+    CREATE OR REPLACE FUNCTION core.journal_translation_key(p_key text) RETURNS void AS $$
+    BEGIN
+      PERFORM core.journal_catalog_change(x.city_id, x.item_id)
+      FROM (
+        SELECT NULL::uuid AS city_id, i.item_id FROM core.item i WHERE i.title_key = p_key
+        UNION
+        SELECT NULL::uuid, i.item_id FROM core.item i WHERE i.desc_key = p_key
+        UNION
+        SELECT o.city_id, o.item_id FROM core.item_city_text_override o
+        WHERE o.title_key = p_key OR o.desc_key = p_key
+        UNION
+        SELECT icc.city_id, icc.item_id FROM core.category c
+        JOIN core.item_city_category icc ON icc.category_id = c.category_id
+        WHERE c.name_key = p_key
+        UNION
+        SELECT icd.city_id, icd.item_id FROM core.disposal_method d
+        JOIN core.item_city_disposal icd ON icd.disposal_id = d.disposal_id
+        WHERE d.name_key = p_key
+        UNION
+        SELECT icw.city_id, icw.item_id FROM core.warning w
+        JOIN core.item_city_warning icw ON icw.warning_id = w.warning_id
+        WHERE w.title_key = p_key OR w.body_key = p_key
+      ) x;
+    END;
+    $$ LANGUAGE plpgsql;
+
+    CREATE OR REPLACE FUNCTION core.journal_translation_change() RETURNS trigger AS $$
+    BEGIN
+      IF TG_OP <> 'INSERT' THEN
+        PERFORM core.journal_translation_key(OLD.key);
+      END IF;
+      IF TG_OP = 'INSERT' OR (TG_OP = 'UPDATE' AND OLD.key <> NEW.key) THEN
+        PERFORM core.journal_translation_key(NEW.key);
+      END IF;
+      RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+
+    CREATE OR REPLACE FUNCTION core.journal_category_change() RETURNS trigger AS $$
+    BEGIN
+      PERFORM core.journal_catalog_change(icc.city_id, icc.item_id)
+      FROM core.item_city_category icc WHERE icc.category_id = NEW.category_id;
+      RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+
+    CREATE OR REPLACE FUNCTION core.journal_disposal_method_change() RETURNS trigger AS $$
+    BEGIN
+      PERFORM core.journal_catalog_change(icd.city_id, icd.item_id)
+      FROM core.item_city_disposal icd WHERE icd.disposal_id = NEW.disposal_id;
+      RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+
+    CREATE OR REPLACE FUNCTION core.journal_warning_change() RETURNS trigger AS $$
+    BEGIN
+      PERFORM core.journal_catalog_change(icw.city_id, icw.item_id)
+      FROM core.item_city_warning icw WHERE icw.warning_id = NEW.warning_id;
+      RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+
+    -- TRUNCATE has no rows to journal: take a version and make it the floor,
+    -- so every client resyncs.
+    CREATE OR REPLACE FUNCTION core.journal_catalog_truncate() RETURNS trigger AS $$
+    BEGIN
+      UPDATE core.dataset_version
+      SET compacted_through = core.catalog_xact_version()
+      WHERE dataset = 'catalog';
+      RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+
+    INSERT INTO core.dataset_version (dataset) VALUES ('catalog')
+    ON CONFLICT (dataset) DO NOTHING;
+    """
+  )
+  for table, (function, changed) in JOURNAL_TRIGGERS.items():
+    op.execute(
+      f"""
+      CREATE TRIGGER trg_{table}_journal
+        AFTER INSERT OR DELETE ON core.{table}
+        FOR EACH ROW EXECUTE FUNCTION core.{function}();
+      CREATE TRIGGER trg_{table}_journal_update
+        AFTER UPDATE ON core.{table}
+        FOR EACH ROW WHEN ({changed}) EXECUTE FUNCTION core.{function}();
+      """
+    )
+  for table, (function, changed) in UPDATE_TRIGGERS.items():
+    op.execute(
+      f"""
+      CREATE TRIGGER trg_{table}_journal_update
+        AFTER UPDATE ON core.{table}
+        FOR EACH ROW WHEN ({changed}) EXECUTE FUNCTION core.{function}();
+      """
+    )
+  for table in CATALOG_TABLES:
+    op.execute(
+      f"""
+      CREATE TRIGGER trg_{table}_journal_truncate
+        AFTER TRUNCATE ON core.{table}
+        FOR EACH STATEMENT EXECUTE FUNCTION core.journal_catalog_truncate();
+      """
+    )
+
+
+def downgrade() -> None:
+  for table in CATALOG_TABLES:
+    op.execute(
+      f"""
+      DROP TRIGGER IF EXISTS trg_{table}_journal ON core.{table};
+      DROP TRIGGER IF EXISTS trg_{table}_journal_update ON core.{table};
+      DROP TRIGGER IF EXISTS trg_{table}_journal_truncate ON core.{table};
+      CREATE TRIGGER trg_{table}_catalog_version
+        AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON core.{table}
+        FOR EACH STATEMENT EXECUTE FUNCTION core.bump_dataset_version('catalog');
+      """
+    )
+  op.execute(
+    """
+    DROP FUNCTION IF EXISTS core.journal_catalog_truncate();
+    DROP FUNCTION IF EXISTS core.journal_warning_change();
+    DROP FUNCTION IF EXISTS core.journal_disposal_method_change();
+    DROP FUNCTION IF EXISTS core.journal_category_change();
+    DROP FUNCTION IF EXISTS core.journal_translation_change();
+    DROP FUNCTION IF EXISTS core.journal_translation_key(text);
+    DROP FUNCTION IF EXISTS core.journal_item_alias_change();
+    DROP FUNCTION IF EXISTS core.journal_item_change();
+    DROP FUNCTION IF EXISTS core.journal_item_city_change();
+    DROP FUNCTION IF EXISTS core.journal_catalog_change(uuid, uuid);
+    DROP FUNCTION IF EXISTS core.catalog_xact_version();
+    DROP INDEX IF EXISTS core.ix_item_desc_key;
+    DROP TABLE IF EXISTS core.catalog_change;
+    ALTER TABLE core.dataset_version DROP COLUMN IF EXISTS compacted_through;
+    """
+  )
@@ -0,0 +1,29 @@
+"""shared GCRA rate limit state
+
+Revision ID: 0030_rate_limit
+Revises: 0029_catalog_change_journal
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "0030_rate_limit"
+down_revision = "0029_catalog_change_journal"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+  op.execute(
+    """
+    CREATE UNLOGGED TABLE IF NOT EXISTS core.rate_limit (
+      key text PRIMARY KEY,
+      tat double precision NOT NULL
+    );
+    """
+  )
+
+
+def downgrade() -> None:
+  op.execute("DROP TABLE IF EXISTS core.rate_limit;")
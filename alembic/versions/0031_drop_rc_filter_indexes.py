@@ -0,0 +1,41 @@
+"""drop the recycle_center filter indexes of 0025
+
+Centers are filtered in memory (grid index); the only query left is the
+per-city load, served by ix_recycle_center_city. Restores the indexes as they
+were before 0025.
+
+Revision ID: 0031_drop_rc_filter_indexes
+Revises: 0030_rate_limit
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "0031_drop_rc_filter_indexes"
+down_revision = "0030_rate_limit"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+  op.execute(
+    """
+    CREATE INDEX IF NOT EXISTS ix_recycle_center_city_type
+      ON core.recycle_center(city_id, typ_code);
+    DROP INDEX IF EXISTS core.ix_recycle_center_city_active_type;
+    DROP INDEX IF EXISTS core.ix_recycle_center_disposal_positive;
+    """
+  )
+
+
+def downgrade() -> None:
+  op.execute(
+    """
+    CREATE INDEX IF NOT EXISTS ix_recycle_center_disposal_positive
+      ON core.recycle_center USING gin (disposal_positive);
+    CREATE INDEX IF NOT EXISTS ix_recycle_center_city_active_type
+      ON core.recycle_center(city_id, is_active, typ_code);
+    DROP INDEX IF EXISTS core.ix_recycle_center_city_type;
+    """
+  )
@@ -0,0 +1,34 @@
+"""indexes for the admin item list keyset: titles per lang, untitled items by key
+
+Revision ID: 0032_admin_items_keyset_idx
+Revises: 0031_drop_rc_filter_indexes
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "0032_admin_items_keyset_idx"
+down_revision = "0031_drop_rc_filter_indexes"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+  op.execute(
+    """
+    CREATE INDEX IF NOT EXISTS ix_i18n_translation_lang_text
+      ON core.i18n_translation(lang, text);
+    CREATE INDEX IF NOT EXISTS ix_item_canonical_key_id
+      ON core.item(canonical_key, item_id);
+    """
+  )
+
+
+def downgrade() -> None:
+  op.execute(
+    """
+    DROP INDEX IF EXISTS core.ix_item_canonical_key_id;
+    DROP INDEX IF EXISTS core.ix_i18n_translation_lang_text;
+    """
+  )
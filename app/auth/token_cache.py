@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable
+
+
+class TokenRejected(Exception):
+    """The token failed verification recently and is still in the negative cache."""
+
+
+class VerifiedTokenCache:
+    """
+    Claims of tokens that passed verification, keyed by sha256(token) and kept
+    until the token's `exp`, so repeat requests skip the signature check.
+    Tokens that failed are remembered for negative_ttl_seconds in a separate
+    LRU, so a flood of garbage tokens cannot push valid entries out.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 10_000,
+        max_rejected: int = 10_000,
+        negative_ttl_seconds: float = 30.0,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self._lock = threading.Lock()
+        self._valid: OrderedDict[bytes, tuple[dict[str, Any], float]] = OrderedDict()
+        self._rejected: OrderedDict[bytes, float] = OrderedDict()
+        self._max_entries = max(1, max_entries)
+        self._max_rejected = max(1, max_rejected)
+        self._negative_ttl_seconds = negative_ttl_seconds
+        self._clock = clock
+
+    def __len__(self) -> int:
+        return len(self._valid)
+
+    def verify(self, token: str, verify: Callable[[str], dict[str, Any]]) -> dict[str, Any]:
+        """Cached claims, or verify(token) and cache the outcome; re-raises its error."""
+        key = hashlib.sha256(token.encode("utf-8")).digest()
+        now = self._clock()
+        with self._lock:
+            entry = self._valid.get(key)
+            if entry is not None:
+                if now < entry[1]:
+                    self._valid.move_to_end(key)
+                    return entry[0]
+                del self._valid[key]
+            rejected_until = self._rejected.get(key)
+            if rejected_until is not None:
+                if now < rejected_until:
+                    raise TokenRejected("token_rejected")
+                del self._rejected[key]
+        try:
+            claims = verify(token)
+        except Exception:
+            if self._negative_ttl_seconds > 0:
+                self._store(self._rejected, key, now + self._negative_ttl_seconds, self._max_rejected)
+            raise
+        exp = claims.get("exp")
+        if isinstance(exp, (int, float)) and exp > now:
+            self._store(self._valid, key, (claims, float(exp)), self._max_entries)
+        return claims
+
+    def clear(self) -> None:
+        with self._lock:
+            self._valid.clear()
+            self._rejected.clear()
+
+    def _store(self, entries: OrderedDict, key: bytes, value: Any, limit: int) -> None:
+        with self._lock:
+            entries[key] = value
+            entries.move_to_end(key)
+            while len(entries) > limit:
+                entries.popitem(last=False)
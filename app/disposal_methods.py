@@ -84,5 +84,12 @@ _SEED_BY_CITY_AND_LABEL = {
 }
 
 
+_SEED_BY_CITY_AND_CODE = {(seed.city_code, seed.code): seed for seed in DISPOSAL_METHOD_SEEDS}
+
+
 def find_disposal_method_seed(city_code: str, label: str) -> DisposalMethodSeed | None:
   return _SEED_BY_CITY_AND_LABEL.get((city_code, normalize_disposal_label(label)))
+
+
+def find_disposal_method_seed_by_code(city_code: str, code: str) -> DisposalMethodSeed | None:
+  return _SEED_BY_CITY_AND_CODE.get((city_code, code))
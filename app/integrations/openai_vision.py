@@ -5,27 +5,34 @@ import io
 import json
 import re
 import os
+import threading
 import time
-from typing import Dict, Any, List, Optional, Tuple
+from typing import Dict, Any, BinaryIO, Callable, List, Optional, Tuple, Union
 from fastapi import HTTPException
 from sqlalchemy import create_engine, text
 from PIL import Image, UnidentifiedImageError
-import httpx
 import logging
 
+from app.integrations.recognizers import recognizer_from_env
+from app.integrations.vision_client import client_from_env
+
 logger = logging.getLogger("openai_vision")
 _logged_no_db = False
 
-VISION_PROMPT = (
-  'Return JSON only: {"canonical_key":..., "confidence":..., "labels":[...], "notes":...}. '
-  'canonical_key=lowercase slug (no "item.", use _). If unsure: canonical_key=null, confidence<=0.3. '
-  'labels: max 5, <=20 chars; include singular+plural of main object. No extra text.'
-)
-
 DEFAULT_MODEL = os.getenv("OPENAI_VISION_MODEL", "gpt-4o-mini")
 MAX_SIDE = int(os.getenv("OPENAI_VISION_MAX_IMAGE_SIDE", "768"))
 JPEG_QUALITY = int(os.getenv("OPENAI_VISION_JPEG_QUALITY", "75"))
 CACHE_TTL_DAYS = int(os.getenv("VISION_CACHE_TTL_DAYS", "30"))
+# Language of cached labels (the language core.item_alias is seeded in).
+LABELS_LANG = os.getenv("VISION_LABELS_LANG", "de")
+
+# Micro-batching of cache misses; VISION_BATCH_MAX_SIZE=1 disables it.
+BATCH_MAX_SIZE = int(os.getenv("VISION_BATCH_MAX_SIZE", "1"))
+BATCH_MAX_WAIT_MS = float(os.getenv("VISION_BATCH_MAX_WAIT_MS", "15"))
+
+vision_client = client_from_env()
+_recognizer = None
+_batcher = None
 
 
 def _clean_base64(image_base64: str) -> str:
@@ -51,9 +58,10 @@ def _validate_base64(image_base64: str) -> bytes:
       raise HTTPException(status_code=400, detail="invalid_image_base64")
 
 
-def _normalize_image(image_bytes: bytes) -> Tuple[bytes, str, int, int]:
+def _normalize_image(image: Union[bytes, BinaryIO]) -> Tuple[bytes, str, int, int]:
+  source = io.BytesIO(image) if isinstance(image, (bytes, bytearray)) else image
   try:
-    img = Image.open(io.BytesIO(image_bytes))
+    img = Image.open(source)
   except (UnidentifiedImageError, OSError, ValueError):
     raise HTTPException(status_code=400, detail="invalid_image_base64")
   img = img.convert("RGB")
@@ -74,6 +82,19 @@ def _cache_key(image_bytes: bytes, model: str) -> str:
   return f"{h}:{model}"
 
 
+_SHA256_RE = re.compile(r"^[0-9a-f]{64}$")
+
+
+def _normalize_sha256(value: Optional[str]) -> Optional[str]:
+  if not isinstance(value, str):
+    return None
+  value = value.strip().lower()
+  # Accept a full cache_key ("<sha256>:<model>") as fingerprint as well.
+  if ":" in value:
+    value = value.split(":", 1)[0]
+  return value if _SHA256_RE.match(value) else None
+
+
 def _get_engine():
   db_url = os.getenv("DATABASE_URL")
   if not db_url:
@@ -96,10 +117,12 @@ def _cache_get(cache_key: str) -> Optional[Dict[str, Any]]:
         """
         SELECT canonical_key, confidence, labels, notes, image_id::text
         FROM core.vision_cache
-        WHERE cache_key = :k AND expires_at > now()
+        WHERE cache_key = :k AND expires_at > now() AND labels_lang = :labels_lang
+        ORDER BY expires_at DESC
+        LIMIT 1
         """
       ),
-      {"k": cache_key},
+      {"k": cache_key, "labels_lang": LABELS_LANG},
     ).fetchone()
     if not row:
       return None
@@ -109,6 +132,7 @@ def _cache_get(cache_key: str) -> Optional[Dict[str, Any]]:
       "labels": row[2],
       "notes": row[3] or "cache_hit",
       "image_id": row[4],
+      "labels_lang": LABELS_LANG,
     }
 
 
@@ -121,27 +145,31 @@ def _cache_set(cache_key: str, payload: Dict[str, Any]) -> None:
   expires_at = time.time() + CACHE_TTL_DAYS * 86400
   try:
     with engine.begin() as conn:
+      # vision_cache is partitioned by expires_at, so cache_key is not unique on
+      # its own: serialize writers per key and replace the previous row.
+      conn.execute(text("SELECT pg_advisory_xact_lock(hashtext(:k))"), {"k": cache_key})
+      previous = conn.execute(
+        text("DELETE FROM core.vision_cache WHERE cache_key = :k RETURNING image_id::text"),
+        {"k": cache_key},
+      ).fetchall()
+      previous_image_id = next((r[0] for r in previous if r[0]), None)
       conn.execute(
         text(
           """
-          INSERT INTO core.vision_cache (cache_key, image_id, canonical_key, confidence, labels, notes, created_at, expires_at)
-          VALUES (:k, :image_id, :ck, :conf, CAST(:labels AS jsonb), :notes, now(), to_timestamp(:exp))
-          ON CONFLICT (cache_key) DO UPDATE
-          SET image_id = COALESCE(EXCLUDED.image_id, core.vision_cache.image_id),
-              canonical_key = EXCLUDED.canonical_key,
-              confidence = EXCLUDED.confidence,
-              labels = EXCLUDED.labels,
-              notes = EXCLUDED.notes,
-              expires_at = EXCLUDED.expires_at
+          INSERT INTO core.vision_cache
+            (cache_key, image_id, canonical_key, confidence, labels, notes, labels_lang, created_at, expires_at)
+          VALUES
+            (:k, CAST(:image_id AS uuid), :ck, :conf, CAST(:labels AS jsonb), :notes, :labels_lang, now(), to_timestamp(:exp))
           """
         ),
         {
           "k": cache_key,
-          "image_id": payload.get("image_id"),
+          "image_id": payload.get("image_id") or previous_image_id,
           "ck": payload.get("canonical_key"),
           "conf": float(payload.get("confidence", 0.0)),
           "labels": json.dumps(payload.get("labels", [])),
           "notes": payload.get("notes"),
+          "labels_lang": LABELS_LANG,
           "exp": expires_at,
         },
       )
@@ -152,21 +180,43 @@ def _cache_set(cache_key: str, payload: Dict[str, Any]) -> None:
     print(f"vision: cache_set failed: {exc}")
 
 
-def _extract_json(text_content: str) -> Dict[str, Any]:
-  if not text_content:
-    return {"canonical_key": None, "confidence": 0.0, "labels": [], "notes": "parse_error"}
+def _raw_hash_set(raw_sha256: str, normalized_sha256: str) -> None:
+  engine = _get_engine()
+  if not engine:
+    return
   try:
-    return json.loads(text_content)
-  except Exception:
-    pass
-  start = text_content.find("{")
-  end = text_content.rfind("}")
-  if start >= 0 and end > start:
-    try:
-      return json.loads(text_content[start : end + 1])
-    except Exception:
-      pass
-  return {"canonical_key": None, "confidence": 0.0, "labels": [], "notes": "parse_error"}
+    with engine.begin() as conn:
+      conn.execute(
+        text(
+          """
+          INSERT INTO core.image_raw_hash AS h (raw_sha256, normalized_sha256, created_at)
+          VALUES (:raw, :norm, now())
+          ON CONFLICT (raw_sha256) DO UPDATE
+          SET normalized_sha256 = EXCLUDED.normalized_sha256
+          WHERE h.normalized_sha256 <> EXCLUDED.normalized_sha256
+          """
+        ),
+        {"raw": raw_sha256, "norm": normalized_sha256},
+      )
+  except Exception as exc:
+    logger.warning("vision: raw_hash_set failed: %s", exc)
+
+
+def _raw_hash_get(raw_sha256: str) -> Optional[str]:
+  engine = _get_engine()
+  if not engine:
+    return None
+  try:
+    with engine.connect() as conn:
+      row = conn.execute(
+        text("SELECT normalized_sha256 FROM core.image_raw_hash WHERE raw_sha256 = :raw"),
+        {"raw": raw_sha256},
+      ).fetchone()
+  except Exception as exc:
+    # A probe miss only costs the client a full upload.
+    logger.warning("vision: raw_hash_get failed: %s", exc)
+    return None
+  return row[0] if row else None
 
 
 def _extract_text_from_response(data: Dict[str, Any]) -> str:
@@ -193,70 +243,99 @@ def _normalize_labels(labels: List[str]) -> List[str]:
   return out
 
 
-def _call_openai(image_base64: str, lang: str) -> Dict[str, Any]:
-  api_key = os.getenv("OPENAI_API_KEY")
-  if not api_key:
-    logger.info("vision: OPENAI_API_KEY missing, using stub")
-    print("vision: OPENAI_API_KEY missing, using stub")
-    return {
-      "canonical_key": "item.battery",
-      "confidence": 0.5,
-      "labels": ["battery"],
-      "notes": "stub",
-    }
-  model = DEFAULT_MODEL
-  headers = {"Authorization": f"Bearer {api_key}"}
-  payload = {
-    "model": model,
-    "messages": [
-      {
-        "role": "user",
-        "content": [
-          {"type": "text", "text": f"{VISION_PROMPT} Language={lang}"},
-          {
-            "type": "image_url",
-            "image_url": {
-              "url": f"data:image/jpeg;base64,{image_base64}",
-              "detail": "low",
-            },
-          },
-        ],
-      }
-    ],
-    "response_format": {"type": "json_object"},
-    "max_tokens": 120,
-    "temperature": 0,
-  }
-  url = "https://api.openai.com/v1/chat/completions"
-  timeout = httpx.Timeout(10.0)
-  for attempt in range(2):
-    try:
-      logger.info("vision: calling openai model=%s image_bytes=%s", model, len(image_base64))
-      print(f"vision: calling openai model={model} image_bytes={len(image_base64)}")
-      with httpx.Client(timeout=timeout) as client:
-        resp = client.post(url, headers=headers, json=payload)
-      print(f"vision: response status={resp.status_code}")
-      if resp.status_code >= 400:
-        body_preview = (resp.text or "")[:200]
-        msg = f"vision_error: status={resp.status_code} body={body_preview}"
-        logger.warning(msg)
-        return {"canonical_key": None, "confidence": 0.0, "labels": [], "notes": msg}
-      data = resp.json()
-      text_content = ""
+def _get_recognizer():
+  global _recognizer
+  if _recognizer is None:
+    _recognizer = recognizer_from_env(vision_client, DEFAULT_MODEL)
+    logger.info("vision: backend=%s", _recognizer.name)
+  return _recognizer
+
+
+class _MissBatch:
+  def __init__(self) -> None:
+    self.images: List[str] = []
+    self.results: Optional[List[Dict[str, Any]]] = None
+    self.taken = False
+    self.done = threading.Event()
+
+
+class MissBatcher:
+  """
+  Collects concurrent cache misses for up to max_wait seconds (or until
+  max_batch images are queued) and sends them as one multi-image request.
+  The first caller of a batch is its leader and makes the upstream call;
+  the others block until their result has been demultiplexed, for at most
+  result_timeout seconds, after which they get a vision_error: timeout result.
+  """
+
+  def __init__(self, call_many, max_batch: int, max_wait: float, result_timeout: float = 30.0) -> None:
+    self._call_many = call_many
+    self.max_batch = max(1, max_batch)
+    self.max_wait = max_wait
+    self.result_timeout = result_timeout
+    self._cond = threading.Condition()
+    self._open: Dict[str, _MissBatch] = {}
+
+  def recognize(self, image_base64: str, lang: str) -> Dict[str, Any]:
+    with self._cond:
+      batch = self._open.get(lang)
+      if batch is None:
+        batch = self._open[lang] = _MissBatch()
+      index = len(batch.images)
+      batch.images.append(image_base64)
+      if len(batch.images) >= self.max_batch:
+        self._take(lang, batch)
+        self._cond.notify_all()
+      elif index == 0:
+        deadline = time.monotonic() + self.max_wait
+        while not batch.taken:
+          remaining = deadline - time.monotonic()
+          if remaining <= 0:
+            self._take(lang, batch)
+            break
+          self._cond.wait(remaining)
+    if index == 0:
+      results = [{"canonical_key": None, "confidence": 0.0, "labels": [], "notes": "vision_error: batch_failed"}] * len(batch.images)
       try:
-        text_content = data.get("choices", [])[0].get("message", {}).get("content", "") or ""
-      except Exception:
-        text_content = ""
-      logger.info("vision raw completion=%s", text_content)
-      print(f"vision: completion={text_content[:400]}")
-      result = _extract_json(text_content)
-      return result
-    except Exception as exc:
-      print(f"vision: exception={exc}")
-      if attempt == 1:
-        break
-  logger.warning("vision_error: exception_or_timeout")
-  return {"canonical_key": None, "confidence": 0.0, "labels": [], "notes": "vision_error: exception_or_timeout"}
+        results = self._call_many(batch.images, lang)
+        if len(batch.images) > 1:
+          logger.info("vision: batched misses=%s lang=%s", len(batch.images), lang)
+      except Exception as exc:
+        logger.warning("vision: batch failed: %s", exc)
+      finally:
+        batch.results = results
+        batch.done.set()
+    elif not batch.done.wait(self.result_timeout):
+      logger.warning("vision: batch result timed out after %.1fs lang=%s", self.result_timeout, lang)
+      return {"canonical_key": None, "confidence": 0.0, "labels": [], "notes": "vision_error: timeout"}
+    return dict(batch.results[index])
+
+  def _take(self, lang: str, batch: _MissBatch) -> None:
+    batch.taken = True
+    if self._open.get(lang) is batch:
+      del self._open[lang]
+
+
+def _get_batcher() -> Optional[MissBatcher]:
+  global _batcher
+  if BATCH_MAX_SIZE <= 1:
+    return None
+  if _batcher is None:
+    _batcher = MissBatcher(
+      lambda images, lang: _get_recognizer().recognize_many(images, lang),
+      max_batch=BATCH_MAX_SIZE,
+      max_wait=BATCH_MAX_WAIT_MS / 1000.0,
+      # The leader's call makes up to two attempts of at most max_timeout each.
+      result_timeout=2 * vision_client.max_timeout + BATCH_MAX_WAIT_MS / 1000.0 + 1.0,
+    )
+  return _batcher
+
+
+def _call_openai(image_base64: str, lang: str) -> Dict[str, Any]:
+  batcher = _get_batcher()
+  if batcher:
+    return batcher.recognize(image_base64, lang)
+  return _get_recognizer().recognize(image_base64, lang)
 
 
 def _upsert_image_asset(
@@ -268,6 +347,8 @@ def _upsert_image_asset(
   content_type: str = "image/jpeg",
   byte_size: Optional[int] = None,
   source: str = "scan",
+  storage_etag: Optional[str] = None,
+  cache_key: Optional[str] = None,
 ) -> Optional[str]:
   engine = _get_engine()
   if not engine:
@@ -298,18 +379,187 @@ def _upsert_image_asset(
           "source": source,
         },
       ).fetchone()
-      return row[0] if row else None
+      image_id = row[0] if row else None
+      if image_id:
+        conn.execute(
+          text(
+            """
+            INSERT INTO core.image_storage_index (storage_key, etag, image_id, cache_key, created_at)
+            VALUES (:storage_key, :etag, :image_id, :cache_key, now())
+            ON CONFLICT (storage_key) DO UPDATE
+            SET etag = EXCLUDED.etag,
+                image_id = EXCLUDED.image_id,
+                cache_key = COALESCE(EXCLUDED.cache_key, core.image_storage_index.cache_key)
+            """
+          ),
+          {
+            "storage_key": storage_key,
+            "etag": storage_etag,
+            "image_id": image_id,
+            "cache_key": cache_key,
+          },
+        )
+      return image_id
   except Exception as exc:
     logger.warning("vision: image_asset upsert failed: %s", exc)
     print(f"vision: image_asset upsert failed: {exc}")
     return None
 
 
-def recognize_item_from_bytes(image_bytes: bytes, lang: str, storage_key: Optional[str]) -> Dict[str, Any]:
-  normalized_bytes, normalized_b64, width, height = _normalize_image(image_bytes)
+def _labels_as_list(cached: Dict[str, Any]) -> None:
+  if not isinstance(cached.get("labels"), list):
+    try:
+      cached["labels"] = json.loads(cached.get("labels"))
+    except Exception:
+      cached["labels"] = []
+
+
+def lookup_cached_result(
+  image_sha256: Optional[str] = None,
+  fingerprint: Optional[str] = None,
+) -> Optional[Dict[str, Any]]:
+  """
+  Resolve a cached vision result without the image bytes.
+  - image_sha256: sha256 of the raw bytes the client would upload
+  - fingerprint: normalized sha256 (or full cache_key) returned by a previous analyze
+  Returns None on a miss; the caller then falls back to a full upload.
+  """
+  normalized_sha256 = _normalize_sha256(fingerprint)
+  if not normalized_sha256:
+    raw_sha256 = _normalize_sha256(image_sha256)
+    if not raw_sha256:
+      return None
+    normalized_sha256 = _raw_hash_get(raw_sha256)
+    if not normalized_sha256:
+      logger.info("vision: probe_miss raw=%s", raw_sha256)
+      return None
+  cache_key = f"{normalized_sha256}:{DEFAULT_MODEL}"
+  cached = _cache_get(cache_key)
+  if not cached:
+    logger.info("vision: probe_miss key=%s", cache_key)
+    return None
+  logger.info("vision: probe_hit key=%s", cache_key)
+  _labels_as_list(cached)
+  cached["cache_key"] = cache_key
+  return cached
+
+
+def _storage_index_get(storage_key: str) -> Optional[Dict[str, Any]]:
+  engine = _get_engine()
+  if not engine:
+    return None
+  with engine.connect() as conn:
+    row = conn.execute(
+      text(
+        """
+        SELECT si.etag, si.image_id::text, vc.cache_key,
+               vc.canonical_key, vc.confidence, vc.labels, vc.notes
+        FROM core.image_storage_index si
+        JOIN core.vision_cache vc
+          ON vc.cache_key = si.cache_key AND vc.expires_at > now() AND vc.labels_lang = :labels_lang
+        WHERE si.storage_key = :storage_key
+        ORDER BY vc.expires_at DESC
+        LIMIT 1
+        """
+      ),
+      {"storage_key": storage_key, "labels_lang": LABELS_LANG},
+    ).fetchone()
+    if not row:
+      return None
+    return {
+      "storage_etag": row[0],
+      "image_id": row[1],
+      "cache_key": row[2],
+      "canonical_key": row[3],
+      "confidence": float(row[4]),
+      "labels": row[5],
+      "notes": row[6] or "cache_hit",
+      "labels_lang": LABELS_LANG,
+    }
+
+
+def lookup_cached_result_by_storage_key(storage_key: str) -> Optional[Dict[str, Any]]:
+  """
+  Cached vision result for an object that was already analyzed (e.g. client retry).
+  The returned dict carries "storage_etag"; the caller must compare it with the
+  current object ETag before trusting the result.
+  """
+  if not storage_key:
+    return None
+  indexed = _storage_index_get(storage_key)
+  if not indexed or not indexed.get("storage_etag"):
+    return None
+  if not str(indexed.get("cache_key") or "").endswith(f":{DEFAULT_MODEL}"):
+    return None
+  logger.info("vision: storage_index_hit key=%s cache_key=%s", storage_key, indexed["cache_key"])
+  _labels_as_list(indexed)
+  return indexed
+
+
+def recognize_item_from_bytes(
+  image_bytes: bytes,
+  lang: str,
+  storage_key: Optional[str],
+  storage_etag: Optional[str] = None,
+  on_cache: Optional[Callable[[bool, str], None]] = None,
+) -> Dict[str, Any]:
+  raw_sha256 = hashlib.sha256(image_bytes).hexdigest()
+  return _recognize(image_bytes, raw_sha256, lang, storage_key, storage_etag, on_cache)
+
+
+def recognize_item_from_file(
+  fileobj: BinaryIO,
+  lang: str,
+  raw_sha256: str,
+  on_asset: Callable[[Dict[str, Any]], None],
+  on_cache: Optional[Callable[[bool, str], None]] = None,
+) -> Dict[str, Any]:
+  """
+  Same as recognize_item_from_bytes for a streamed upload whose raw hash is
+  already known and which is not in S3 yet: nothing points at its key until
+  the PUT succeeds. on_asset receives the normalized image's fields; pass them
+  to record_stored_image once the object exists.
+  """
+  return _recognize(fileobj, raw_sha256, lang, None, None, on_cache, on_asset)
+
+
+def record_stored_image(asset: Dict[str, Any], storage_key: str, storage_etag: Optional[str] = None) -> Optional[str]:
+  """Write image_asset + image_storage_index for an uploaded object; returns image_id."""
+  return _upsert_image_asset(
+    b"",
+    asset["sha256"],
+    asset["width"],
+    asset["height"],
+    storage_key=storage_key,
+    content_type="image/jpeg",
+    byte_size=asset["byte_size"],
+    source="scan",
+    storage_etag=storage_etag,
+    cache_key=asset["cache_key"],
+  )
+
+
+def _recognize(
+  image: Union[bytes, BinaryIO],
+  raw_sha256: str,
+  lang: str,
+  storage_key: Optional[str],
+  storage_etag: Optional[str],
+  on_cache: Optional[Callable[[bool, str], None]] = None,
+  on_asset: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> Dict[str, Any]:
+  """on_cache(hit, cache_key) is called right after the cache lookup, before any upstream call."""
+  normalized_bytes, normalized_b64, width, height = _normalize_image(image)
   model = DEFAULT_MODEL
   cache_key = _cache_key(normalized_bytes, model)
   sha256_hash = cache_key.split(":", 1)[0]
+  # Repeat scans already have the mapping: a read instead of a write transaction.
+  if _raw_hash_get(raw_sha256) != sha256_hash:
+    _raw_hash_set(raw_sha256, sha256_hash)
+  if on_asset:
+    on_asset(
+      {"sha256": sha256_hash, "width": width, "height": height, "byte_size": len(normalized_bytes), "cache_key": cache_key}
+    )
   image_id = _upsert_image_asset(
     normalized_bytes,
     sha256_hash,
@@ -319,27 +569,30 @@ def recognize_item_from_bytes(image_bytes: bytes, lang: str, storage_key: Option
     content_type="image/jpeg",
     byte_size=len(normalized_bytes),
     source="scan",
+    storage_etag=storage_etag,
+    cache_key=cache_key,
   )
   logger.info("vision: cache_lookup key=%s", cache_key)
   print(f"vision: cache_lookup key={cache_key}")
 
   cached = _cache_get(cache_key)
+  if on_cache:
+    on_cache(cached is not None, cache_key)
   if cached:
     logger.info("vision: cache_hit key=%s", cache_key)
     print(f"vision: cache_hit key={cache_key}")
-    if not isinstance(cached.get("labels"), list):
-      try:
-        cached["labels"] = json.loads(cached.get("labels"))
-      except Exception:
-        cached["labels"] = []
+    _labels_as_list(cached)
     cached["cache_key"] = cache_key
+    cached["cache_hit"] = True
     if image_id:
       cached["image_id"] = image_id
     return cached
 
   logger.info("vision: cache_miss key=%s", cache_key)
   print(f"vision: cache_miss key={cache_key}")
-  result = _call_openai(normalized_b64, lang)
+  # Labels are always requested in LABELS_LANG so one cached result serves every
+  # request language; the API projects them into the caller's language.
+  result = _call_openai(normalized_b64, LABELS_LANG)
   labels = _normalize_labels(result.get("labels", []))
   canonical_key = result.get("canonical_key")
   confidence = float(result.get("confidence", 0.0))
@@ -360,6 +613,8 @@ def recognize_item_from_bytes(image_bytes: bytes, lang: str, storage_key: Option
     "notes": result.get("notes"),
     "image_id": image_id,
     "cache_key": cache_key,
+    "labels_lang": LABELS_LANG,
+    "cache_hit": False,
   }
   if out.get("notes") in ("parse_error",) or str(out.get("notes", "")).startswith("vision_error"):
     logger.info("vision: cache_set skipped due to error notes")
@@ -374,25 +629,57 @@ def recognize_item_from_base64(image_base64: str, lang: str, storage_key: Option
   return recognize_item_from_bytes(raw_bytes, lang, storage_key=storage_key)
 
 
-def store_image_from_base64(image_base64: str, storage_key: str, source: str = "admin") -> Dict[str, Any]:
-  raw_bytes = _validate_base64(image_base64)
+def normalize_for_storage(raw_bytes: bytes) -> Dict[str, Any]:
   normalized_bytes, _, width, height = _normalize_image(raw_bytes)
-  sha256_hash = hashlib.sha256(normalized_bytes).hexdigest()
+  return {
+    "normalized_bytes": normalized_bytes,
+    "sha256": hashlib.sha256(normalized_bytes).hexdigest(),
+    "width": width,
+    "height": height,
+  }
+
+
+def find_image_by_sha256(sha256_hash: str) -> Optional[Dict[str, Any]]:
+  engine = _get_engine()
+  if not engine:
+    return None
+  with engine.connect() as conn:
+    row = conn.execute(
+      text(
+        """
+        SELECT image_id::text, storage_key
+        FROM core.image_asset
+        WHERE normalized_sha256 = :sha256
+        """
+      ),
+      {"sha256": sha256_hash},
+    ).fetchone()
+    if not row:
+      return None
+    return {"image_id": row[0], "storage_key": row[1]}
+
+
+def store_normalized_image(normalized: Dict[str, Any], storage_key: str, source: str = "admin") -> Dict[str, Any]:
   image_id = _upsert_image_asset(
-    normalized_bytes,
-    sha256_hash,
-    width,
-    height,
+    normalized["normalized_bytes"],
+    normalized["sha256"],
+    normalized["width"],
+    normalized["height"],
     storage_key=storage_key,
     content_type="image/jpeg",
-    byte_size=len(normalized_bytes),
+    byte_size=len(normalized["normalized_bytes"]),
     source=source,
   )
   if not image_id:
     raise HTTPException(status_code=500, detail="image_store_failed")
   return {
     "image_id": image_id,
-    "sha256": sha256_hash,
-    "width": width,
-    "height": height,
+    "sha256": normalized["sha256"],
+    "width": normalized["width"],
+    "height": normalized["height"],
   }
+
+
+def store_image_from_base64(image_base64: str, storage_key: str, source: str = "admin") -> Dict[str, Any]:
+  raw_bytes = _validate_base64(image_base64)
+  return store_normalized_image(normalize_for_storage(raw_bytes), storage_key=storage_key, source=source)
@@ -0,0 +1,222 @@
+from __future__ import annotations
+from typing import Any, Dict, List, Optional, Union
+import hashlib
+import json
+import logging
+import os
+import time
+
+from app.integrations.vision_client import CLOSED, VisionClient, VisionUnavailable
+
+logger = logging.getLogger("recognizers")
+
+VISION_PROMPT = (
+  'Return JSON only: {"canonical_key":..., "confidence":..., "labels":[...], "notes":...}. '
+  'canonical_key=lowercase slug (no "item.", use _). If unsure: canonical_key=null, confidence<=0.3. '
+  'labels: max 5, <=20 chars; include singular+plural of main object. No extra text.'
+)
+
+VISION_BATCH_PROMPT = (
+  "You get {count} images. Return JSON only: "
+  '{{"results":[...]}} with exactly one object per image, in image order, each with "index" (0-based) '
+  "and this per-image contract: {per_image}"
+)
+
+OPENAI_CHAT_COMPLETIONS_URL = "https://api.openai.com/v1/chat/completions"
+DEFAULT_FAKE_KEYS = "battery,glass_bottle,pizza_box,newspaper,plastic_bottle,light_bulb"
+
+
+def _extract_json(text_content: str) -> Dict[str, Any]:
+  if not text_content:
+    return {"canonical_key": None, "confidence": 0.0, "labels": [], "notes": "parse_error"}
+  try:
+    return json.loads(text_content)
+  except Exception:
+    pass
+  start = text_content.find("{")
+  end = text_content.rfind("}")
+  if start >= 0 and end > start:
+    try:
+      return json.loads(text_content[start : end + 1])
+    except Exception:
+      pass
+  return {"canonical_key": None, "confidence": 0.0, "labels": [], "notes": "parse_error"}
+
+
+def _error(notes: str) -> Dict[str, Any]:
+  return {"canonical_key": None, "confidence": 0.0, "labels": [], "notes": notes}
+
+
+def _stub_result() -> Dict[str, Any]:
+  return {
+    "canonical_key": "item.battery",
+    "confidence": 0.5,
+    "labels": ["battery"],
+    "notes": "stub",
+  }
+
+
+def split_batch_result(parsed: Dict[str, Any], count: int) -> List[Dict[str, Any]]:
+  """
+  Demultiplex a {"results": [...]} completion. Entries are matched by their
+  "index" field when present, otherwise by position; images without a usable
+  entry get parse_error so the caller does not cache them.
+  """
+  results = parsed.get("results") if isinstance(parsed, dict) else None
+  out: List[Dict[str, Any]] = [_error("parse_error") for _ in range(count)]
+  if not isinstance(results, list):
+    return out
+  for pos, entry in enumerate(results):
+    if not isinstance(entry, dict):
+      continue
+    index = entry.get("index", pos)
+    if isinstance(index, int) and 0 <= index < count:
+      out[index] = {k: v for k, v in entry.items() if k != "index"}
+  return out
+
+
+def fake_completion(image_base64: str, keys: List[str]) -> Dict[str, Any]:
+  """Deterministic recognition result for an image: same bytes, same answer."""
+  digest = hashlib.sha256(image_base64.encode("ascii", "ignore")).digest()
+  key = keys[digest[0] % len(keys)]
+  confidence = 0.55 + (digest[1] % 40) / 100.0
+  return {
+    "canonical_key": key,
+    "confidence": round(confidence, 2),
+    "labels": [key.replace("_", " "), key.replace("_", " ") + "s"],
+    "notes": "fake",
+  }
+
+
+class ChatCompletionsRecognizer:
+  """
+  Speaks the OpenAI chat-completions protocol. Used for OpenAI itself and for
+  the local stand-in server (app/integrations/vision_standin.py).
+  """
+
+  def __init__(self, name: str, url: str, api_key_env: Optional[str], model: str, client: VisionClient) -> None:
+    self.name = name
+    self.url = url
+    self.api_key_env = api_key_env
+    self.model = model
+    self.client = client
+
+  def recognize(self, image_base64: str, lang: str) -> Dict[str, Any]:
+    if self._stub():
+      return _stub_result()
+    text_content = self._complete([f"{VISION_PROMPT} Language={lang}"], [image_base64], 120)
+    if isinstance(text_content, dict):
+      return text_content
+    return _extract_json(text_content)
+
+  def recognize_many(self, images: List[str], lang: str) -> List[Dict[str, Any]]:
+    """One upstream request for several images; results come back in input order."""
+    if len(images) == 1:
+      return [self.recognize(images[0], lang)]
+    if self._stub():
+      return [_stub_result() for _ in images]
+    prompt = VISION_BATCH_PROMPT.format(count=len(images), per_image=VISION_PROMPT)
+    text_content = self._complete([f"{prompt} Language={lang}"], images, 120 * len(images))
+    if isinstance(text_content, dict):
+      return [dict(text_content) for _ in images]
+    return split_batch_result(_extract_json(text_content), len(images))
+
+  def _stub(self) -> bool:
+    if self.name == "openai" and not os.getenv(self.api_key_env or ""):
+      logger.info("vision: OPENAI_API_KEY missing, using stub")
+      print("vision: OPENAI_API_KEY missing, using stub")
+      return True
+    return False
+
+  def _complete(self, texts: List[str], images: List[str], max_tokens: int) -> Union[str, Dict[str, Any]]:
+    """Returns the completion text, or an error result dict."""
+    api_key = os.getenv(self.api_key_env) if self.api_key_env else None
+    model = self.model
+    headers = {"Authorization": f"Bearer {api_key}"} if api_key else {}
+    content: List[Dict[str, Any]] = [{"type": "text", "text": t} for t in texts]
+    for image_base64 in images:
+      content.append(
+        {
+          "type": "image_url",
+          "image_url": {
+            "url": f"data:image/jpeg;base64,{image_base64}",
+            "detail": "low",
+          },
+        }
+      )
+    payload = {
+      "model": model,
+      "messages": [{"role": "user", "content": content}],
+      "response_format": {"type": "json_object"},
+      "max_tokens": max_tokens,
+      "temperature": 0,
+    }
+    image_bytes = sum(len(i) for i in images)
+    for attempt in range(2):
+      try:
+        logger.info("vision: calling %s model=%s images=%s image_bytes=%s", self.name, model, len(images), image_bytes)
+        print(f"vision: calling {self.name} model={model} images={len(images)} image_bytes={image_bytes}")
+        resp = self.client.post(self.url, headers=headers, payload=payload)
+        print(f"vision: response status={resp.status_code}")
+        if resp.status_code >= 400:
+          body_preview = (resp.text or "")[:200]
+          msg = f"vision_error: status={resp.status_code} body={body_preview}"
+          logger.warning(msg)
+          return _error(msg)
+        data = resp.json()
+        text_content = ""
+        try:
+          text_content = data.get("choices", [])[0].get("message", {}).get("content", "") or ""
+        except Exception:
+          text_content = ""
+        logger.info("vision raw completion=%s", text_content)
+        print(f"vision: completion={text_content[:400]}")
+        return text_content
+      except VisionUnavailable:
+        logger.warning("vision_error: circuit_open")
+        return _error("vision_error: circuit_open")
+      except Exception as exc:
+        print(f"vision: exception={exc}")
+        if attempt == 1 or self.client.breaker.state != CLOSED:
+          break
+    logger.warning("vision_error: exception_or_timeout")
+    return _error("vision_error: exception_or_timeout")
+
+
+class FakeRecognizer:
+  """In-process recognizer: no HTTP, deterministic per image, optional fixed latency."""
+
+  name = "fake"
+
+  def __init__(self, keys: List[str], latency_seconds: float = 0.0) -> None:
+    self.keys = keys
+    self.latency_seconds = latency_seconds
+
+  def recognize(self, image_base64: str, lang: str) -> Dict[str, Any]:
+    if self.latency_seconds:
+      time.sleep(self.latency_seconds)
+    return fake_completion(image_base64, self.keys)
+
+  def recognize_many(self, images: List[str], lang: str) -> List[Dict[str, Any]]:
+    if self.latency_seconds:
+      time.sleep(self.latency_seconds)
+    return [fake_completion(image_base64, self.keys) for image_base64 in images]
+
+
+def recognizer_from_env(client: VisionClient, model: str):
+  """
+  VISION_BACKEND selects the backend:
+  - openai (default): api.openai.com, stub result without OPENAI_API_KEY
+  - standin: local chat-completions stand-in at VISION_STANDIN_URL
+  - fake: in-process FakeRecognizer
+  """
+  backend = os.getenv("VISION_BACKEND", "openai").strip().lower()
+  if backend == "fake":
+    keys = [k.strip() for k in os.getenv("VISION_FAKE_KEYS", DEFAULT_FAKE_KEYS).split(",") if k.strip()]
+    return FakeRecognizer(keys, latency_seconds=float(os.getenv("VISION_FAKE_LATENCY_MS", "0")) / 1000.0)
+  if backend == "standin":
+    url = os.getenv("VISION_STANDIN_URL", "http://127.0.0.1:8090/v1/chat/completions")
+    return ChatCompletionsRecognizer("standin", url, "VISION_STANDIN_API_KEY", model, client)
+  if backend != "openai":
+    raise ValueError(f"unknown VISION_BACKEND: {backend}")
+  return ChatCompletionsRecognizer("openai", OPENAI_CHAT_COMPLETIONS_URL, "OPENAI_API_KEY", model, client)
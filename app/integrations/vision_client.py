@@ -0,0 +1,310 @@
+from __future__ import annotations
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, Optional
+import logging
+import math
+import os
+import threading
+import time
+
+import httpx
+
+logger = logging.getLogger("vision_client")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class VisionUnavailable(Exception):
+  """Raised instead of calling upstream while the circuit is open."""
+
+
+class LatencyTracker:
+  """Sliding window of recent upstream latencies (seconds)."""
+
+  def __init__(self, window: int = 200) -> None:
+    self._samples: Deque[float] = deque(maxlen=window)
+    self._lock = threading.Lock()
+
+  def record(self, seconds: float) -> None:
+    with self._lock:
+      self._samples.append(seconds)
+
+  def count(self) -> int:
+    with self._lock:
+      return len(self._samples)
+
+  def percentile(self, pct: float) -> Optional[float]:
+    with self._lock:
+      if not self._samples:
+        return None
+      ordered = sorted(self._samples)
+    index = min(len(ordered) - 1, max(0, math.ceil(pct / 100.0 * len(ordered)) - 1))
+    return ordered[index]
+
+
+class CircuitBreaker:
+  """
+  Opens after failure_threshold consecutive failures and rejects calls for
+  open_seconds. Then a single probe is let through (half-open): success closes
+  the circuit, failure re-opens it.
+  """
+
+  def __init__(self, failure_threshold: int = 5, open_seconds: float = 30.0, clock: Callable[[], float] = time.monotonic) -> None:
+    self.failure_threshold = max(1, failure_threshold)
+    self.open_seconds = open_seconds
+    self._clock = clock
+    self._lock = threading.Lock()
+    self._state = CLOSED
+    self._failures = 0
+    self._opened_at = 0.0
+    self._probe_in_flight = False
+    self.counters = {"opened": 0, "half_opened": 0, "closed": 0, "short_circuited": 0}
+
+  @property
+  def state(self) -> str:
+    with self._lock:
+      return self._current_state()
+
+  def counters_snapshot(self) -> Dict[str, int]:
+    with self._lock:
+      return dict(self.counters)
+
+  def _current_state(self) -> str:
+    if self._state == OPEN and self._clock() - self._opened_at >= self.open_seconds:
+      self._state = HALF_OPEN
+      self._probe_in_flight = False
+      self.counters["half_opened"] += 1
+      logger.info("vision_client: circuit half_open")
+    return self._state
+
+  def allow(self) -> bool:
+    with self._lock:
+      state = self._current_state()
+      if state == CLOSED:
+        return True
+      if state == HALF_OPEN and not self._probe_in_flight:
+        self._probe_in_flight = True
+        return True
+      self.counters["short_circuited"] += 1
+      return False
+
+  def record_success(self) -> None:
+    with self._lock:
+      if self._state != CLOSED:
+        self.counters["closed"] += 1
+        logger.info("vision_client: circuit closed")
+      self._state = CLOSED
+      self._failures = 0
+      self._probe_in_flight = False
+
+  def record_failure(self) -> None:
+    with self._lock:
+      self._failures += 1
+      if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+        if self._state != OPEN:
+          self.counters["opened"] += 1
+          logger.warning("vision_client: circuit open failures=%s", self._failures)
+        self._state = OPEN
+        self._opened_at = self._clock()
+        self._probe_in_flight = False
+
+
+def _failed(resp: httpx.Response) -> bool:
+  return resp.status_code >= 500 or resp.status_code == 429
+
+
+class VisionClient:
+  """
+  HTTP client for the vision upstream with a circuit breaker, a timeout derived
+  from observed latency (p99 * timeout_multiplier, clamped to
+  [min_timeout, max_timeout]) and an optional hedged second request fired once
+  the first one has been outstanding longer than the observed p95.
+
+  The first request runs on the caller's thread; only hedges use a pool of
+  hedge_workers threads, so the pool never limits how many requests are in
+  flight. A hedge holds its worker while it waits for the delay; when all
+  workers are busy hedges start late or not at all. The caller is blocked in
+  the first request, so a hedge's response is used when the first one fails
+  (error, timeout, 5xx or 429).
+  """
+
+  def __init__(
+    self,
+    breaker: Optional[CircuitBreaker] = None,
+    latency: Optional[LatencyTracker] = None,
+    default_timeout: float = 10.0,
+    min_timeout: float = 2.0,
+    max_timeout: float = 10.0,
+    timeout_multiplier: float = 2.0,
+    min_samples: int = 20,
+    hedge_enabled: bool = False,
+    hedge_workers: int = 8,
+    post: Optional[Callable[..., httpx.Response]] = None,
+  ) -> None:
+    self.breaker = breaker or CircuitBreaker()
+    self.latency = latency or LatencyTracker()
+    self.default_timeout = default_timeout
+    self.min_timeout = min_timeout
+    self.max_timeout = max_timeout
+    self.timeout_multiplier = timeout_multiplier
+    self.min_samples = min_samples
+    self.hedge_enabled = hedge_enabled
+    self.hedge_workers = max(1, hedge_workers)
+    self._post = post or self._http_post
+    self._client: Optional[httpx.Client] = None
+    self._client_lock = threading.Lock()
+    self._executor: Optional[ThreadPoolExecutor] = None
+    self._counters_lock = threading.Lock()
+    self.counters = {"requests": 0, "failures": 0, "timeouts": 0, "hedges_fired": 0, "hedges_won": 0}
+
+  def _count(self, name: str) -> None:
+    with self._counters_lock:
+      self.counters[name] += 1
+
+  def current_timeout(self) -> float:
+    p99 = self.latency.percentile(99) if self.latency.count() >= self.min_samples else None
+    if p99 is None:
+      return self.default_timeout
+    return max(self.min_timeout, min(self.max_timeout, p99 * self.timeout_multiplier))
+
+  def hedge_delay(self) -> Optional[float]:
+    if not self.hedge_enabled or self.latency.count() < self.min_samples:
+      return None
+    return self.latency.percentile(95)
+
+  def post(self, url: str, headers: Dict[str, str], payload: Dict[str, Any]) -> httpx.Response:
+    if not self.breaker.allow():
+      raise VisionUnavailable("circuit_open")
+    self._count("requests")
+    # A half-open probe decides whether the circuit closes: give it the full
+    # budget rather than a timeout derived from latencies before the outage.
+    timeout = self.max_timeout if self.breaker.state == HALF_OPEN else self.current_timeout()
+    try:
+      resp = self._send(url, headers, payload, timeout)
+    except Exception:
+      self._count("failures")
+      self.breaker.record_failure()
+      raise
+    if _failed(resp):
+      self._count("failures")
+      self.breaker.record_failure()
+    else:
+      self.breaker.record_success()
+    return resp
+
+  def _send(self, url: str, headers: Dict[str, str], payload: Dict[str, Any], timeout: float) -> httpx.Response:
+    delay = self.hedge_delay()
+    if delay is None or delay >= timeout:
+      return self._timed(url, headers, payload, timeout)
+    started = time.monotonic()
+    primary_done = threading.Event()
+    hedge = self._get_executor().submit(
+      self._hedge, primary_done, started + delay, started + timeout, url, headers, payload
+    )
+    try:
+      resp = self._timed(url, headers, payload, timeout)
+    except Exception:
+      primary_done.set()
+      fallback = self._hedge_result(hedge)
+      if fallback is None:
+        raise
+      return fallback
+    primary_done.set()
+    if _failed(resp):
+      fallback = self._hedge_result(hedge)
+      if fallback is not None:
+        return fallback
+    hedge.cancel()
+    return resp
+
+  def _hedge_result(self, hedge: Future[Optional[httpx.Response]]) -> Optional[httpx.Response]:
+    """The hedge's response if it fired and succeeded, else None."""
+    if hedge.cancel():
+      return None
+    try:
+      resp = hedge.result()
+    except Exception:
+      return None
+    if resp is None or _failed(resp):
+      return None
+    self._count("hedges_won")
+    return resp
+
+  def _hedge(
+    self,
+    primary_done: threading.Event,
+    fire_at: float,
+    deadline: float,
+    url: str,
+    headers: Dict[str, str],
+    payload: Dict[str, Any],
+  ) -> Optional[httpx.Response]:
+    # Time spent queued for a worker counts against the delay, not as latency.
+    if primary_done.wait(max(0.0, fire_at - time.monotonic())):
+      return None
+    remaining = deadline - time.monotonic()
+    if remaining < 0.1:
+      return None
+    self._count("hedges_fired")
+    return self._timed(url, headers, payload, remaining)
+
+  def _timed(self, url: str, headers: Dict[str, str], payload: Dict[str, Any], timeout: float) -> httpx.Response:
+    started = time.monotonic()
+    try:
+      resp = self._post(url, headers=headers, json=payload, timeout=timeout)
+    except httpx.TimeoutException:
+      # Record the time spent, or timeouts would only ever sample the fast
+      # calls and keep the derived timeout too short to recover.
+      self._count("timeouts")
+      self.latency.record(time.monotonic() - started)
+      raise
+    if resp.status_code < 500:
+      self.latency.record(time.monotonic() - started)
+    return resp
+
+  def _http_post(self, url: str, headers: Dict[str, str], json: Dict[str, Any], timeout: float) -> httpx.Response:
+    with self._client_lock:
+      if self._client is None:
+        self._client = httpx.Client()
+      client = self._client
+    return client.post(url, headers=headers, json=json, timeout=httpx.Timeout(timeout))
+
+  def _get_executor(self) -> ThreadPoolExecutor:
+    with self._client_lock:
+      if self._executor is None:
+        self._executor = ThreadPoolExecutor(max_workers=self.hedge_workers, thread_name_prefix="vision-hedge")
+      return self._executor
+
+  def _counters_snapshot(self) -> Dict[str, int]:
+    with self._counters_lock:
+      return dict(self.counters)
+
+  def metrics(self) -> Dict[str, Any]:
+    return {
+      "circuit_state": self.breaker.state,
+      "circuit": self.breaker.counters_snapshot(),
+      "requests": self._counters_snapshot(),
+      "timeout_seconds": round(self.current_timeout(), 3),
+      "latency_samples": self.latency.count(),
+      "latency_p50": self.latency.percentile(50),
+      "latency_p95": self.latency.percentile(95),
+      "latency_p99": self.latency.percentile(99),
+    }
+
+
+def client_from_env() -> VisionClient:
+  return VisionClient(
+    breaker=CircuitBreaker(
+      failure_threshold=int(os.getenv("VISION_CIRCUIT_FAILURES", "5")),
+      open_seconds=float(os.getenv("VISION_CIRCUIT_OPEN_SECONDS", "30")),
+    ),
+    default_timeout=float(os.getenv("VISION_TIMEOUT_SECONDS", "10")),
+    min_timeout=float(os.getenv("VISION_TIMEOUT_MIN_SECONDS", "2")),
+    max_timeout=float(os.getenv("VISION_TIMEOUT_SECONDS", "10")),
+    timeout_multiplier=float(os.getenv("VISION_TIMEOUT_P99_MULTIPLIER", "2")),
+    hedge_enabled=os.getenv("VISION_HEDGE_ENABLED", "false").lower() in ("1", "true", "yes"),
+    hedge_workers=int(os.getenv("VISION_HEDGE_MAX_WORKERS", "8")),
+  )
@@ -0,0 +1,134 @@
+"""
+Local stand-in for the OpenAI chat-completions endpoint, for load tests of
+/analyze without network access or API cost.
+
+Answers are deterministic per image (see recognizers.fake_completion); requests
+with several images get {"results": [...]} like a batched call. Latency
+and failures follow a seeded distribution:
+  latency  ~ lognormal(median=--latency-ms, sigma=--latency-sigma)
+  slow     with probability --slow-rate the response takes --slow-ms instead
+  errors   with probability --error-rate the response is HTTP 500
+
+Usage:
+  python -m app.integrations.vision_standin --port 8090 --latency-ms 600 --error-rate 0.02
+  VISION_BACKEND=standin VISION_STANDIN_URL=http://127.0.0.1:8090/v1/chat/completions uvicorn app.main:app
+"""
+from __future__ import annotations
+from typing import List, Optional
+import argparse
+import asyncio
+import json
+import math
+import random
+import time
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+from app.integrations.recognizers import DEFAULT_FAKE_KEYS, fake_completion
+
+
+def _image_urls(body: dict) -> List[str]:
+  urls = []
+  for message in body.get("messages") or []:
+    content = message.get("content")
+    if not isinstance(content, list):
+      continue
+    for part in content:
+      if isinstance(part, dict) and part.get("type") == "image_url":
+        urls.append((part.get("image_url") or {}).get("url") or "")
+  return urls
+
+
+def _answer(url: str, keys: List[str]) -> dict:
+  result = fake_completion(url.rsplit(",", 1)[-1], keys)
+  result["notes"] = "standin"
+  return result
+
+
+def create_app(
+  keys: Optional[List[str]] = None,
+  latency_ms: float = 500.0,
+  latency_sigma: float = 0.3,
+  slow_rate: float = 0.0,
+  slow_ms: float = 8000.0,
+  error_rate: float = 0.0,
+  seed: int = 42,
+) -> FastAPI:
+  keys = keys or DEFAULT_FAKE_KEYS.split(",")
+  rng = random.Random(seed)
+  app = FastAPI(title="vision stand-in", docs_url=None, redoc_url=None, openapi_url=None)
+  stats = {"requests": 0, "errors": 0, "slow": 0}
+
+  @app.post("/v1/chat/completions")
+  async def chat_completions(request: Request):
+    body = await request.json()
+    stats["requests"] += 1
+    roll = rng.random()
+    if roll < slow_rate:
+      stats["slow"] += 1
+      delay_ms = slow_ms
+    else:
+      delay_ms = latency_ms * math.exp(rng.gauss(0.0, latency_sigma)) if latency_ms > 0 else 0.0
+    fail = rng.random() < error_rate
+    if delay_ms > 0:
+      await asyncio.sleep(delay_ms / 1000.0)
+    if fail:
+      stats["errors"] += 1
+      return JSONResponse(status_code=500, content={"error": {"message": "standin_injected_error"}})
+    urls = _image_urls(body) or [""]
+    if len(urls) == 1:
+      result = _answer(urls[0], keys)
+    else:
+      # Multi-image batch: per-image results keyed by index (see VISION_BATCH_PROMPT).
+      result = {"results": [dict(_answer(url, keys), index=i) for i, url in enumerate(urls)]}
+    return {
+      "id": f"standin-{stats['requests']}",
+      "object": "chat.completion",
+      "created": int(time.time()),
+      "model": body.get("model"),
+      "choices": [
+        {
+          "index": 0,
+          "message": {"role": "assistant", "content": json.dumps(result)},
+          "finish_reason": "stop",
+        }
+      ],
+    }
+
+  @app.get("/stats")
+  def standin_stats():
+    return stats
+
+  return app
+
+
+def main() -> None:
+  parser = argparse.ArgumentParser()
+  parser.add_argument("--host", default="127.0.0.1")
+  parser.add_argument("--port", type=int, default=8090)
+  parser.add_argument("--keys", default=DEFAULT_FAKE_KEYS, help="Comma-separated canonical keys to answer with")
+  parser.add_argument("--latency-ms", type=float, default=500.0, help="Median latency")
+  parser.add_argument("--latency-sigma", type=float, default=0.3, help="Lognormal spread of latency")
+  parser.add_argument("--slow-rate", type=float, default=0.0, help="Share of requests that take --slow-ms")
+  parser.add_argument("--slow-ms", type=float, default=8000.0)
+  parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered with HTTP 500")
+  parser.add_argument("--seed", type=int, default=42)
+  args = parser.parse_args()
+
+  import uvicorn
+
+  app = create_app(
+    keys=[k.strip() for k in args.keys.split(",") if k.strip()],
+    latency_ms=args.latency_ms,
+    latency_sigma=args.latency_sigma,
+    slow_rate=args.slow_rate,
+    slow_ms=args.slow_ms,
+    error_rate=args.error_rate,
+    seed=args.seed,
+  )
+  uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+  main()
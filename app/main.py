@@ -1,31 +1,59 @@
-from typing import Optional
-from math import radians, sin, cos, sqrt, atan2
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, Optional
+import asyncio
 import base64
+import json
+import os
 from io import BytesIO
 import logging
 from dotenv import load_dotenv
 import time
+import uuid
 from fastapi import FastAPI, Depends, Query, Body, HTTPException, Request, Response
-from fastapi.responses import JSONResponse
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from app.db import get_db
-from app.services.resolve import resolve_item, find_item_id_by_aliases
-from app.integrations.openai_vision import recognize_item_from_bytes, store_image_from_base64
+from app.db import SessionLocal, engine, get_db
+from app.services.resolve import resolve_item, find_item_id_by_aliases, project_labels
+from app.services.addresses import AddressIndexes
+from app.services.analyze_jobs import AnalyzeJobWorkers, PermanentJobError, enqueue_job, get_job
+from app.services.catalog import CatalogSnapshots, catalog_changes
+from app.services.item_search import search_items as search_item_rows
+from app.services.pagination import decode_cursor, encode_cursor
+from app.services.recycle_centers import RecycleCenterIndex, centers_for_disposals, clusters_in_bbox
+from app.services.scan_events import ScanEventBuffer
+from app.services.snapshots import Snapshot, etag_matches
+from app.integrations.openai_vision import (
+  find_image_by_sha256,
+  lookup_cached_result,
+  lookup_cached_result_by_storage_key,
+  normalize_for_storage,
+  recognize_item_from_bytes,
+  recognize_item_from_file,
+  record_stored_image,
+  store_normalized_image,
+  vision_client,
+)
 from app.storage.s3 import (
   build_object_key,
   create_presigned_get,
   create_presigned_put,
   ensure_allowed_content_type,
-  get_object_bytes,
+  get_object_with_etag,
+  head_object_etag,
   upload_fileobj,
   validate_settings as validate_s3_settings,
 )
+from app.storage.uploads import StagedUpload, stage_multipart
 from app.settings import get_settings
 from app.auth.guest import issue_guest_token, verify_guest_token
 from app.auth.admin import issue_admin_token, verify_admin_token
-from app.middleware.rate_limit import FixedWindowRateLimiter
-from pydantic import BaseModel, Field
+from app.auth.token_cache import VerifiedTokenCache
+from app.middleware.rate_limit import GcraRateLimiter, PostgresRateLimiter, RateLimiter
+from pydantic import BaseModel, Field, ValidationError
 from sqlalchemy import text
 
 load_dotenv()
@@ -39,7 +67,49 @@ app = FastAPI(
   redoc_url="/redoc" if docs_enabled else None,
   openapi_url="/openapi.json" if docs_enabled else None,
 )
-rate_limiter = FixedWindowRateLimiter()
+
+
+def _build_rate_limiter() -> RateLimiter:
+  if settings.RATE_LIMIT_BACKEND.lower() == "postgres":
+    return PostgresRateLimiter(engine)
+  return GcraRateLimiter(max_keys=settings.RATE_LIMIT_MAX_KEYS)
+
+
+rate_limiter = _build_rate_limiter()
+guest_tokens = VerifiedTokenCache(
+  max_entries=settings.AUTH_TOKEN_CACHE_SIZE,
+  max_rejected=settings.AUTH_TOKEN_CACHE_SIZE,
+  negative_ttl_seconds=settings.AUTH_TOKEN_NEGATIVE_TTL_SECONDS,
+)
+admin_tokens = VerifiedTokenCache(
+  max_entries=settings.AUTH_TOKEN_CACHE_SIZE,
+  max_rejected=settings.AUTH_TOKEN_CACHE_SIZE,
+  negative_ttl_seconds=settings.AUTH_TOKEN_NEGATIVE_TTL_SECONDS,
+)
+scan_events = ScanEventBuffer(
+  engine,
+  batch_size=settings.SCAN_EVENT_BATCH_SIZE,
+  flush_interval=settings.SCAN_EVENT_FLUSH_INTERVAL_SECONDS,
+  max_pending=settings.SCAN_EVENT_MAX_PENDING,
+  block_seconds=settings.SCAN_EVENT_BLOCK_SECONDS,
+  spool_path=settings.SCAN_EVENT_SPOOL_PATH,
+)
+recycle_center_index = RecycleCenterIndex(
+  check_seconds=settings.RECYCLE_CENTER_INDEX_CHECK_SECONDS,
+  cluster_max_zoom=settings.RECYCLE_CENTER_CLUSTER_MAX_ZOOM,
+)
+address_indexes = AddressIndexes(settings.ADDRESS_DATA_DIR)
+catalog_snapshots = CatalogSnapshots(check_seconds=settings.CATALOG_CHECK_SECONDS)
+analyze_jobs = AnalyzeJobWorkers(
+  engine,
+  lambda job: _run_analyze_job(job),
+  workers=settings.ANALYZE_JOB_WORKERS,
+  poll_interval=settings.ANALYZE_JOB_POLL_SECONDS,
+  lease_seconds=settings.ANALYZE_JOB_LEASE_SECONDS,
+  max_attempts=settings.ANALYZE_JOB_MAX_ATTEMPTS,
+  retry_backoff=settings.ANALYZE_JOB_RETRY_BACKOFF_SECONDS,
+  retention_seconds=settings.ANALYZE_JOB_RETENTION_HOURS * 3600,
+)
 
 # CORS
 cors_origins = [o.strip() for o in settings.CORS_ALLOW_ORIGINS.split(",") if o.strip()]
@@ -59,6 +129,15 @@ app.add_middleware(
 @app.on_event("startup")
 def _validate_startup():
   validate_s3_settings(settings)
+  if settings.SCAN_EVENT_BUFFER_ENABLED:
+    scan_events.start()
+  analyze_jobs.start()
+
+
+@app.on_event("shutdown")
+def _drain_scan_events():
+  analyze_jobs.stop()
+  scan_events.close()
 
 _AUTH_EXEMPT_PATHS = {
   "/health",
@@ -131,22 +210,13 @@ def _detect_content_type(image_bytes: bytes) -> str:
   return "image/jpeg"
 
 
-def _haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
-  r = 6371.0
-  dlat = radians(lat2 - lat1)
-  dlon = radians(lon2 - lon1)
-  a = sin(dlat / 2) ** 2 + cos(radians(lat1)) * cos(radians(lat2)) * sin(dlon / 2) ** 2
-  c = 2 * atan2(sqrt(a), sqrt(1 - a))
-  return r * c
-
-
 def _resolve_principal(request: Request) -> dict:
   auth_header = request.headers.get("Authorization") or ""
   if not auth_header.startswith("Bearer "):
     return {"type": "anonymous", "sub": None, "scopes": []}
   token = auth_header.split(" ", 1)[1].strip()
   try:
-    claims = verify_guest_token(token, settings)
+    claims = guest_tokens.verify(token, lambda t: verify_guest_token(t, settings))
     scope = claims.get("scope") or ""
     scopes = scope.split() if isinstance(scope, str) else list(scope or [])
     return {"type": "guest", "sub": claims.get("sub"), "scopes": scopes}
@@ -164,7 +234,7 @@ def _require_admin(request: Request) -> dict:
   if not token:
     raise HTTPException(status_code=401, detail="Unauthorized")
   try:
-    claims = verify_admin_token(token, settings)
+    claims = admin_tokens.verify(token, lambda t: verify_admin_token(t, settings))
   except Exception:
     raise HTTPException(status_code=401, detail="Unauthorized")
   return {
@@ -257,8 +327,18 @@ class RecycleCenterItem(BaseModel):
   distance_km: Optional[float] = None
 
 
+class RecycleCenterCluster(BaseModel):
+  lat: float
+  lng: float
+  count: int
+  typ_code: Optional[int] = None
+
+
 class RecycleCenterResponse(BaseModel):
   city: str
+  address: Optional[str] = None
+  zoom: Optional[int] = None
+  clusters: list[RecycleCenterCluster] = []
   centers: list[RecycleCenterItem]
 
 
@@ -289,6 +369,12 @@ def auth_me(request: Request):
   }
 
 
+@app.get("/admin/metrics/vision")
+def admin_vision_metrics(request: Request):
+  _require_admin(request)
+  return vision_client.metrics()
+
+
 @app.post("/auth/verify", response_model=PrincipalResponse)
 def auth_verify(request: Request):
   auth_header = request.headers.get("Authorization") or ""
@@ -391,85 +477,222 @@ def resolve(
   return resolved
 
 
+@app.get("/resolve/nearby")
+def resolve_nearby(
+  city: str = Query(..., description="city code, e.g. hannover, berlin"),
+  lat: float = Query(..., ge=-90, le=90),
+  lng: float = Query(..., ge=-180, le=180),
+  item_id: Optional[str] = Query(None, description="UUID of item (required if item_name is empty)"),
+  lang: str = Query("de", description="de/en/tr"),
+  item_name: Optional[str] = Query(None, description="Free-text item name (required if item_id is empty)"),
+  per_disposal: int = Query(3, ge=1, le=20, description="nearest accepting centers per disposal"),
+  radius_km: Optional[float] = Query(None, gt=0),
+  db: Session = Depends(get_db),
+):
+  """/resolve plus, per disposal, the nearest recycle centers that accept it."""
+  resolved = resolve_item(db, city, item_id, lang, settings, item_name=item_name)
+  disposals = resolved.get("disposals") or []
+  if disposals:
+    city_id = _city_id_from_code(db, city)
+    index = recycle_center_index.get(db, city_id)
+    resolved["disposals"] = centers_for_disposals(index, city, disposals, lat, lng, k=per_disposal, radius_km=radius_km)
+  logger.info(
+    "resolve_nearby: city=%s item=%s disposals=%s centers=%s",
+    city,
+    bool(resolved.get("item")),
+    len(disposals),
+    sum(len(d.get("centers") or []) for d in resolved.get("disposals") or []),
+  )
+  return resolved
+
+
+def _render_recycle_centers(city: str, centers: list[dict]) -> bytes:
+  return RecycleCenterResponse(city=city, centers=centers).model_dump_json().encode("utf-8")
+
+
+def _snapshot_response(request: Request, snapshot: Snapshot) -> Response:
+  headers = {"ETag": snapshot.etag, "Vary": "Accept-Encoding", "Cache-Control": "no-cache"}
+  if etag_matches(request.headers.get("if-none-match"), snapshot.etag):
+    return Response(status_code=304, headers=headers)
+  body, encoding = snapshot.encoded(request.headers.get("accept-encoding", ""))
+  if encoding:
+    headers["Content-Encoding"] = encoding
+  return Response(content=body, media_type=snapshot.media_type, headers=headers)
+
+
+def _parse_bbox(value: str) -> tuple[float, float, float, float]:
+  try:
+    min_lng, min_lat, max_lng, max_lat = (float(part) for part in value.split(","))
+  except ValueError:
+    raise HTTPException(status_code=400, detail="invalid_bbox")
+  if min_lng > max_lng or min_lat > max_lat:
+    raise HTTPException(status_code=400, detail="invalid_bbox")
+  return (min_lng, min_lat, max_lng, max_lat)
+
+
+RECYCLE_CENTER_DEFAULT_LIMIT = 1000
+
+
 @app.get("/recycle-centers", response_model=RecycleCenterResponse)
 def list_recycle_centers(
+  request: Request,
   city: str = Query(..., description="city code, e.g. hannover, berlin"),
-  lat: Optional[float] = Query(None),
-  lng: Optional[float] = Query(None),
+  lat: Optional[float] = Query(None, ge=-90, le=90),
+  lng: Optional[float] = Query(None, ge=-180, le=180),
   typ_code: Optional[int] = Query(None),
   disposal_positive: Optional[str] = Query(None),
-  limit: int = Query(1000, ge=1, le=2000),
+  radius_km: Optional[float] = Query(None, gt=0, description="only centers within this distance of lat/lng"),
+  bbox: Optional[str] = Query(None, description="viewport: min_lng,min_lat,max_lng,max_lat"),
+  zoom: Optional[int] = Query(None, ge=0, le=22, description="map zoom; clustered up to RECYCLE_CENTER_CLUSTER_MAX_ZOOM"),
+  address: Optional[str] = Query(None, description="street + number (+ PLZ), resolved offline to lat/lng"),
+  limit: int = Query(RECYCLE_CENTER_DEFAULT_LIMIT, ge=1, le=2000),
   db: Session = Depends(get_db),
 ):
-  if (lat is None) != (lng is None):
+  matched = None
+  if address is not None:
+    if lat is not None or lng is not None:
+      raise HTTPException(status_code=400, detail="address_with_lat_lng")
+    matched = _lookup_address(city, address)
+    lat, lng = matched["lat"], matched["lng"]
+  if (lat is None) != (lng is None) or (radius_km is not None and lat is None):
     raise HTTPException(status_code=400, detail="lat_lng_required")
+  viewport = bbox is not None or zoom is not None
+  if viewport and lat is not None:
+    raise HTTPException(status_code=400, detail="viewport_with_lat_lng")
+  bounds = _parse_bbox(bbox) if bbox is not None else None
 
-  city_id = _city_id_from_code(db, city)
+  city_id = recycle_center_index.city_id(db, city)
   if not city_id:
     raise HTTPException(status_code=400, detail="invalid_city")
 
-  rows = db.execute(
-    text(
-      """
-      SELECT
-        rc.center_id::text,
-        rc.name,
-        rc.address,
-        rc.lat,
-        rc.lng,
-        rc.typ_code,
-        rc.typ_label,
-        rc.has_glas,
-        rc.has_kleider,
-        rc.has_papier,
-        rc.disposal_positive
-      FROM core.recycle_center rc
-      WHERE rc.city_id = :city_id
-        AND rc.is_active = true
-        AND (
-          CAST(:typ_code AS integer) IS NULL
-          OR rc.typ_code = CAST(:typ_code AS integer)
-        )
-        AND (
-          CAST(:disposal_positive AS text) IS NULL
-          OR CAST(:disposal_positive AS text) = ANY(COALESCE(rc.disposal_positive, ARRAY[]::text[]))
-        )
-      ORDER BY rc.name ASC
-      """
-    ),
-    {
-      "city_id": city_id,
-      "typ_code": typ_code,
-      "disposal_positive": disposal_positive,
-    },
-  ).fetchall()
+  index = recycle_center_index.get(db, city_id)
+  if not viewport and lat is None and disposal_positive is None:
+    # The default limit gets its own (possibly truncated) snapshot; any other
+    # limit is served from the full one when the whole list fits.
+    snapshot = index.snapshot(
+      city, typ_code, _render_recycle_centers, limit=limit if limit == RECYCLE_CENTER_DEFAULT_LIMIT else None
+    )
+    if snapshot is not None and snapshot.count <= limit:
+      return _snapshot_response(request, snapshot)
+  if viewport:
+    if zoom is not None and zoom <= settings.RECYCLE_CENTER_CLUSTER_MAX_ZOOM:
+      clusters, centers = clusters_in_bbox(index, index.clusters(zoom, typ_code, disposal_positive), bounds)
+      return {"city": city, "zoom": zoom, "clusters": clusters, "centers": centers[:limit]}
+    if bounds is None:
+      centers = index.filtered(typ_code, disposal_positive)
+    else:
+      centers = index.in_bbox(bounds, typ_code, disposal_positive)
+    return {"city": city, "zoom": zoom, "centers": centers[:limit]}
+  if lat is None or lng is None:
+    return {"city": city, "centers": index.filtered(typ_code, disposal_positive)[:limit]}
+  nearest = index.nearest(
+    lat,
+    lng,
+    k=limit,
+    radius_km=radius_km,
+    typ_code=typ_code,
+    disposal_positive=disposal_positive,
+  )
+  centers = [{**center, "distance_km": distance} for center, distance in nearest]
+  return {"city": city, "address": matched["label"] if matched else None, "centers": centers}
+
 
-  centers: list[dict] = []
-  for row in rows:
-    centers.append(
+def _lookup_address(city: str, address: str) -> dict:
+  index = address_indexes.get(city)
+  if index is None:
+    raise HTTPException(status_code=400, detail="no_address_data")
+  matched = index.lookup(address)
+  if not matched or not (-90 <= matched["lat"] <= 90 and -180 <= matched["lng"] <= 180):
+    raise HTTPException(status_code=400, detail="address_not_found")
+  return matched
+
+
+@app.get("/addresses/autocomplete")
+def autocomplete_addresses(
+  city: str = Query(..., description="city code, e.g. hannover"),
+  q: str = Query(..., min_length=1, description="street (+ number) or PLZ prefix"),
+  limit: int = Query(10, ge=1, le=25),
+):
+  index = address_indexes.get(city)
+  if index is None:
+    raise HTTPException(status_code=400, detail="no_address_data")
+  return {"city": city, "addresses": index.complete(q, limit=limit)}
+
+
+@app.post("/admin/recycle-centers/refresh")
+def admin_refresh_recycle_centers(
+  request: Request,
+  city: Optional[str] = Query(None, description="city code; all active cities when empty"),
+  db: Session = Depends(get_db),
+):
+  """Reload the recycle center index and re-render the default-limit snapshots (all centers and per typ_code)."""
+  _require_admin(request)
+  if city:
+    codes = [city]
+  else:
+    codes = [r[0] for r in db.execute(text("SELECT code FROM core.city WHERE is_active = true ORDER BY code")).fetchall()]
+  recycle_center_index.invalidate()
+  out = []
+  for code in codes:
+    city_id = recycle_center_index.city_id(db, code)
+    if not city_id:
+      raise HTTPException(status_code=400, detail="invalid_city")
+    index = recycle_center_index.get(db, city_id)
+    snapshots = [
+      index.snapshot(code, typ_code, _render_recycle_centers, limit=RECYCLE_CENTER_DEFAULT_LIMIT)
+      for typ_code in [None, *index.typ_codes()]
+    ]
+    out.append(
       {
-        "id": row[0],
-        "name": row[1],
-        "address": row[2],
-        "lat": row[3],
-        "lng": row[4],
-        "typ_code": row[5],
-        "typ_label": row[6],
-        "has_glas": row[7],
-        "has_kleider": row[8],
-        "has_papier": row[9],
-        "disposal_positive": list(row[10] or []),
+        "city": code,
+        "centers": len(index),
+        "snapshots": len(snapshots),
+        "bytes": sum(len(snap.body) for snap in snapshots),
+        "brotli_bytes": sum(len(snap.brotli) for snap in snapshots),
       }
     )
+  return {"version": recycle_center_index.version, "cities": out}
 
-  if lat is not None and lng is not None:
-    for center in centers:
-      center["distance_km"] = _haversine_km(
-        lat, lng, center["lat"], center["lng"]
-      )
-    centers.sort(key=lambda c: c.get("distance_km") or 0.0)
 
-  return {"city": city, "centers": centers[:limit]}
+@app.get("/catalog/{city}")
+def get_catalog(
+  request: Request,
+  city: str,
+  lang: str = Query("de", description="de/en/tr"),
+  db: Session = Depends(get_db),
+):
+  """
+  NDJSON catalog of every item with rules in the city: a header line
+  {"type":"catalog","version":...}, then one {"type":"item",...} line per item.
+  Revalidate with If-None-Match; the body only changes with the version.
+  """
+  try:
+    snapshot = catalog_snapshots.get(db, city, lang)
+  except ValueError as exc:
+    raise HTTPException(status_code=400, detail=str(exc))
+  response = _snapshot_response(request, snapshot)
+  response.headers["X-Catalog-Version"] = str(snapshot.version or 0)
+  return response
+
+
+@app.get("/catalog/{city}/changes")
+def get_catalog_changes(
+  city: str,
+  lang: str = Query("de", description="de/en/tr"),
+  since: int = Query(..., ge=0, description="catalog version the client has (header line or last `version`)"),
+  db: Session = Depends(get_db),
+):
+  """
+  Items changed since a catalog version, in the catalog's item format, plus ids
+  to drop. 410 resync_required: download GET /catalog/{city} again.
+  """
+  try:
+    changes = catalog_changes(db, city, lang, since, max_items=settings.CATALOG_CHANGES_MAX_ITEMS)
+  except ValueError as exc:
+    raise HTTPException(status_code=400, detail=str(exc))
+  if changes is None:
+    raise HTTPException(status_code=410, detail="resync_required")
+  return changes
 
 
 @app.get("/items/search")
@@ -478,46 +701,13 @@ def search_items(
   lang: str = Query("de", description="de/en/tr"),
   q: Optional[str] = Query(None),
   limit: int = Query(10, ge=1, le=50),
+  cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
   db: Session = Depends(get_db),
 ):
-  query = f"%{q}%" if q else ""
-  rows = db.execute(
-    text(
-      """
-      SELECT
-        i.item_id::text,
-        i.canonical_key,
-        t1.text,
-        i.primary_image_id::text,
-        COALESCE(
-          jsonb_agg(
-            DISTINCT jsonb_build_object(
-              'code', d.code,
-              'label', dt.text,
-              'recycle_center_typ_code', d.recycle_center_typ_code
-            )
-          ) FILTER (WHERE d.disposal_id IS NOT NULL),
-          '[]'::jsonb
-        ) AS disposals
-      FROM core.item i
-      JOIN core.city c ON c.code = :city AND c.is_active = true
-      JOIN core.item_city_category icc ON icc.item_id = i.item_id AND icc.city_id = c.city_id
-      LEFT JOIN core.item_city_disposal icd ON icd.item_id = i.item_id AND icd.city_id = c.city_id
-      LEFT JOIN core.disposal_method d ON d.disposal_id = icd.disposal_id
-      LEFT JOIN core.i18n_translation dt ON dt.key = d.name_key AND dt.lang = :lang
-      LEFT JOIN core.i18n_translation t1 ON t1.key = i.title_key AND t1.lang = :lang
-      WHERE (
-        :q = ''
-        OR t1.text ILIKE :q
-        OR i.canonical_key ILIKE :q
-      )
-      GROUP BY i.item_id, i.canonical_key, t1.text, i.primary_image_id
-      ORDER BY t1.text NULLS LAST, i.canonical_key ASC
-      LIMIT :limit
-      """
-    ),
-    {"lang": lang, "q": query, "limit": limit, "city": city},
-  ).fetchall()
+  try:
+    rows, next_cursor = search_item_rows(db, city, lang, q, limit, cursor)
+  except ValueError:
+    raise HTTPException(status_code=400, detail="invalid_cursor")
   return {
     "city": city,
     "items": [
@@ -529,7 +719,8 @@ def search_items(
         "disposals": list(r[4] or []),
       }
       for r in rows
-    ]
+    ],
+    "next_cursor": next_cursor,
   }
 
 
@@ -540,6 +731,30 @@ class AnalyzeJsonRequest(BaseModel):
   search_text: Optional[str] = None
 
 
+class AnalyzeProbeRequest(BaseModel):
+  city: str
+  lang: str
+  image_sha256: Optional[str] = None
+  fingerprint: Optional[str] = None
+  search_text: Optional[str] = None
+
+
+class AnalyzeJobAccepted(BaseModel):
+  job_id: str
+  status: str
+  poll_url: str
+
+
+class AnalyzeJobResponse(BaseModel):
+  job_id: str
+  status: str
+  attempts: int = 0
+  result: Optional[dict] = None
+  error: Optional[str] = None
+  created_at: Optional[str] = None
+  finished_at: Optional[str] = None
+
+
 class AnalyzeResponse(BaseModel):
   s3_key: Optional[str] = None
   item: Optional[dict]
@@ -568,7 +783,7 @@ class FeedbackResponse(BaseModel):
 
 
 class AdminImageUploadRequest(BaseModel):
-  image_base64: str
+  image_base64: Optional[str] = None
   source: Optional[str] = "admin"
 
 
@@ -586,7 +801,7 @@ class AdminItemUpdateRequest(BaseModel):
 
 class AdminItemImageUploadRequest(BaseModel):
   city: str
-  image_base64: str
+  image_base64: Optional[str] = None
   source: Optional[str] = "admin"
 
 
@@ -664,6 +879,19 @@ def _insert_scan_event(
 ) -> None:
   if not image_id or not city_id:
     return
+  if settings.SCAN_EVENT_BUFFER_ENABLED:
+    scan_events.submit(
+      {
+        "image_id": image_id,
+        "cache_key": cache_key,
+        "city_id": city_id,
+        "item_id": item_id,
+        "prospect_id": prospect_id,
+        "search_text": search_text,
+        "source": source,
+      }
+    )
+    return
   db.execute(
     text(
       """
@@ -898,72 +1126,124 @@ def _admin_item_detail(db: Session, item_id: str, city_id: str, lang: str) -> di
     ],
   }
 
-@app.post("/analyze", response_model=AnalyzeResponse)
-async def analyze(request: Request, db: Session = Depends(get_db)):
-  principal = getattr(request.state, "principal", None)
-  if not principal or principal.get("type") == "anonymous":
-    raise HTTPException(status_code=401, detail="Unauthorized")
+_background_tasks: set[asyncio.Task] = set()
 
-  image_bytes: Optional[bytes] = None
-  s3_key: Optional[str] = None
-  search_text: Optional[str] = None
-  city: Optional[str] = None
-  lang: Optional[str] = None
 
-  content_type = request.headers.get("content-type", "")
-  if content_type.startswith("multipart/form-data"):
-    form = await request.form()
-    upload = form.get("file")
-    city = form.get("city")
-    lang = form.get("lang")
-    search_text = form.get("search_text") or None
-    if not upload:
-      raise HTTPException(status_code=400, detail="file_required")
-    file_ct = getattr(upload, "content_type", None) or ""
-    ensure_allowed_content_type(file_ct)
-    raw = await upload.read()
-    if len(raw) > settings.MAX_IMAGE_BYTES:
-      raise HTTPException(status_code=413, detail="image_too_large")
-    s3_key = build_object_key(principal, file_ct, getattr(upload, "filename", None))
-    upload_fileobj(settings, BytesIO(raw), settings.S3_BUCKET_NAME, s3_key, file_ct)
-    image_bytes = raw
-  elif content_type.startswith("application/json"):
-    body = await request.json()
-    if "image_base64" in body:
-      raise HTTPException(status_code=400, detail="image_base64_not_supported")
-    if "s3_key" not in body:
-      raise HTTPException(status_code=400, detail="s3_key_required")
-    payload = AnalyzeJsonRequest(**body)
-    city = payload.city
-    lang = payload.lang
-    search_text = payload.search_text
-    prefix = _principal_prefix(principal)
-    if not payload.s3_key.startswith(f"{prefix}/"):
-      raise HTTPException(status_code=403, detail="forbidden_s3_key")
-    s3_key = payload.s3_key
-    image_bytes = get_object_bytes(settings, settings.S3_BUCKET_NAME, s3_key)
-    if len(image_bytes) > settings.MAX_IMAGE_BYTES:
-      raise HTTPException(status_code=413, detail="image_too_large")
-  else:
-    raise HTTPException(status_code=415, detail="unsupported_content_type")
+def _spawn_background(coro) -> None:
+  task = asyncio.create_task(coro)
+  _background_tasks.add(task)
+  task.add_done_callback(_background_tasks.discard)
 
-  if not city or not lang:
-    raise HTTPException(status_code=400, detail="city_and_lang_required")
 
-  logger.info(
-    "analyze: start city=%s lang=%s s3_key=%s has_search_text=%s image_len=%s",
-    city,
-    lang,
-    s3_key,
-    bool(search_text),
-    len(image_bytes or b""),
-  )
-  vision = recognize_item_from_bytes(image_bytes, lang, storage_key=s3_key)
+async def _persist_upload(staged: StagedUpload, s3_key: str, content_type: str, asset: Optional[dict] = None) -> bool:
+  """
+  True once the object is in S3. On failure the upload is retried in the
+  background, which records the image (asset, filled by recognition) itself
+  when it gets through.
+  """
+  try:
+    await run_in_threadpool(
+      upload_fileobj, settings, staged.reader(), settings.S3_BUCKET_NAME, s3_key, content_type
+    )
+    return True
+  except Exception as exc:
+    # The analysis result does not depend on the archived copy; keep retrying off the request path.
+    logger.warning("analyze: s3 upload failed key=%s error=%s -> retry in background", s3_key, exc)
+    path = await run_in_threadpool(staged.spill_to_disk)
+    _spawn_background(_retry_upload(path, s3_key, content_type, asset))
+    return False
+
+
+def _upload_path(path: str, s3_key: str, content_type: str) -> None:
+  with open(path, "rb") as fh:
+    upload_fileobj(settings, fh, settings.S3_BUCKET_NAME, s3_key, content_type)
+
+
+async def _retry_upload(path: str, s3_key: str, content_type: str, asset: Optional[dict] = None) -> None:
+  try:
+    for attempt in range(1, settings.S3_UPLOAD_RETRY_ATTEMPTS + 1):
+      await asyncio.sleep(settings.S3_UPLOAD_RETRY_BACKOFF_SECONDS * attempt)
+      try:
+        await run_in_threadpool(_upload_path, path, s3_key, content_type)
+        logger.info("analyze: s3 upload retry ok key=%s attempt=%s", s3_key, attempt)
+        if asset:
+          await run_in_threadpool(record_stored_image, asset, s3_key)
+        return
+      except Exception as exc:
+        logger.warning("analyze: s3 upload retry failed key=%s attempt=%s error=%s", s3_key, attempt, exc)
+    logger.error("analyze: s3 upload gave up key=%s", s3_key)
+  finally:
+    os.remove(path)
+
+
+async def _attach_stored_image(vision: dict, upload_task: asyncio.Task, inp: "_AnalyzeInput") -> dict:
+  """
+  Record a multipart upload's image_asset/storage index rows only after the
+  PUT succeeded, so the key never points at a missing object.
+  """
+  if not await upload_task or not inp.asset:
+    return vision
+  image_id = await run_in_threadpool(record_stored_image, inp.asset, inp.s3_key)
+  return {**vision, "image_id": image_id} if image_id else vision
+
+
+def _vision_for_known_object(s3_key: str) -> Optional[dict]:
+  indexed = lookup_cached_result_by_storage_key(s3_key)
+  if not indexed:
+    return None
+  expected_etag = indexed.pop("storage_etag", None)
+  # HEAD only when the key is known; guards against an overwritten object.
+  if expected_etag != head_object_etag(settings, settings.S3_BUCKET_NAME, s3_key):
+    return None
+  return indexed
+
+
+_ITEM_STAGE_KEYS = ("s3_key", "item", "categories", "recycle", "repair", "donate", "warnings", "error")
+
+
+def _item_stage(s3_key: Optional[str], resolved: dict) -> dict:
+  return {
+    "s3_key": s3_key,
+    "item": resolved.get("item"),
+    "categories": resolved.get("categories", []),
+    "recycle": {"disposals": resolved.get("disposals", [])},
+    "repair": {"available": False},
+    "donate": {"available": False},
+    "warnings": resolved.get("warnings", []),
+    "error": None,
+  }
+
+
+def _analyze_from_vision(
+  db: Session,
+  vision: dict,
+  city: str,
+  lang: str,
+  search_text: Optional[str],
+  s3_key: Optional[str],
+  on_item: Optional[Callable[[dict], None]] = None,
+  labels: Optional[list[str]] = None,
+) -> AnalyzeResponse:
+  """
+  on_item(payload of the stream's item event) fires once a found item is
+  resolved, before suggestions. labels: vision labels already projected into
+  lang (the stream computes them for its vision event).
+  """
   city_id = _city_id_from_code(db, city)
+  item_stage = (lambda resolved: on_item(_item_stage(s3_key, resolved))) if on_item else None
   canonical_key = vision.get("canonical_key")
   item_id = _find_item_id(db, canonical_key) if canonical_key else None
-  if not item_id and vision.get("labels"):
-    item_id = find_item_id_by_aliases(db, vision.get("labels") or [], lang, city_id)
+  # Cached labels are language-neutral (labels_lang); match aliases in that
+  # language, then project the labels into the request language.
+  labels_lang = vision.get("labels_lang") or lang
+  neutral_labels = vision.get("labels") or []
+  if not item_id and neutral_labels:
+    item_id = find_item_id_by_aliases(db, neutral_labels, labels_lang, city_id)
+  if labels is None:
+    labels = project_labels(db, neutral_labels, labels_lang, lang)
+  vision = {**vision, "labels": labels}
+  if not item_id and labels_lang != lang and vision["labels"]:
+    item_id = find_item_id_by_aliases(db, vision["labels"], lang, city_id)
   image_id = vision.get("image_id")
   cache_key = vision.get("cache_key")
   logger.info(
@@ -1034,7 +1314,7 @@ async def analyze(request: Request, db: Session = Depends(get_db)):
         error="item_not_found",
         debug={"city_chain": [city], "vision": vision},
       )
-    resolved = resolve_item(db, city, None, lang, settings, item_name=search_text)
+    resolved = resolve_item(db, city, None, lang, settings, item_name=search_text, on_item=item_stage)
     resolved_item = resolved.get("item") or {}
     resolved_item_id = resolved_item.get("id")
     prospect_id = None
@@ -1077,7 +1357,7 @@ async def analyze(request: Request, db: Session = Depends(get_db)):
       debug={"city_chain": [city], "vision": vision},
     )
 
-  resolved = resolve_item(db, city, item_id, lang, settings, item_name=search_text)
+  resolved = resolve_item(db, city, item_id, lang, settings, item_name=search_text, on_item=item_stage)
   prospect_id = None
   if resolved.get("prospect"):
     prospect_id = _find_prospect_id(
@@ -1120,6 +1400,357 @@ async def analyze(request: Request, db: Session = Depends(get_db)):
     debug={"city_chain": [city], "vision": vision},
   )
 
+
+@dataclass
+class _AnalyzeInput:
+  city: str
+  lang: str
+  search_text: Optional[str]
+  s3_key: str
+  staged: Optional[StagedUpload] = None
+  file_ct: str = ""
+  image_bytes: Optional[bytes] = None
+  s3_etag: Optional[str] = None
+  vision: Optional[dict] = None
+  # Normalized image fields of a multipart upload, recorded once it is in S3.
+  asset: dict = field(default_factory=dict)
+
+
+async def _read_analyze_input(request: Request, principal: dict) -> _AnalyzeInput:
+  """
+  Parse an /analyze body: multipart upload (staged, not yet archived) or JSON
+  s3_key (resolved via the storage index, else downloaded). The caller closes
+  the staged upload.
+  """
+  content_type = request.headers.get("content-type", "")
+  if content_type.startswith("multipart/form-data"):
+    staged = await stage_multipart(request, settings.MAX_IMAGE_BYTES, settings.UPLOAD_SPOOL_MAX_BYTES)
+    try:
+      city = staged.form.get("city")
+      lang = staged.form.get("lang")
+      search_text = staged.form.get("search_text") or None
+      if not staged.file:
+        raise HTTPException(status_code=400, detail="file_required")
+      file_ct = staged.file.content_type or ""
+      ensure_allowed_content_type(file_ct)
+      if not city or not lang:
+        raise HTTPException(status_code=400, detail="city_and_lang_required")
+      s3_key = build_object_key(principal, file_ct, staged.file.filename)
+    except BaseException:
+      await staged.close()
+      raise
+    return _AnalyzeInput(city, lang, search_text, s3_key, staged=staged, file_ct=file_ct)
+  if content_type.startswith("application/json"):
+    body = await request.json()
+    if "image_base64" in body:
+      raise HTTPException(status_code=400, detail="image_base64_not_supported")
+    if "s3_key" not in body:
+      raise HTTPException(status_code=400, detail="s3_key_required")
+    payload = AnalyzeJsonRequest(**body)
+    if not payload.city or not payload.lang:
+      raise HTTPException(status_code=400, detail="city_and_lang_required")
+    prefix = _principal_prefix(principal)
+    if not payload.s3_key.startswith(f"{prefix}/"):
+      raise HTTPException(status_code=403, detail="forbidden_s3_key")
+    inp = _AnalyzeInput(payload.city, payload.lang, payload.search_text, payload.s3_key)
+    inp.vision = await run_in_threadpool(_vision_for_known_object, inp.s3_key)
+    if inp.vision is None:
+      inp.image_bytes, inp.s3_etag = await run_in_threadpool(
+        get_object_with_etag, settings, settings.S3_BUCKET_NAME, inp.s3_key
+      )
+      if len(inp.image_bytes) > settings.MAX_IMAGE_BYTES:
+        raise HTTPException(status_code=413, detail="image_too_large")
+    return inp
+  raise HTTPException(status_code=415, detail="unsupported_content_type")
+
+
+async def _recognize_input(inp: _AnalyzeInput, on_cache=None) -> dict:
+  if inp.vision is not None:
+    logger.info(
+      "analyze: known s3_key=%s cache_key=%s -> skip download",
+      inp.s3_key,
+      inp.vision.get("cache_key"),
+    )
+    return {**inp.vision, "cache_hit": True}
+  logger.info(
+    "analyze: start city=%s lang=%s s3_key=%s has_search_text=%s image_len=%s",
+    inp.city,
+    inp.lang,
+    inp.s3_key,
+    bool(inp.search_text),
+    inp.staged.size if inp.staged else len(inp.image_bytes or b""),
+  )
+  if inp.staged:
+    return await run_in_threadpool(
+      recognize_item_from_file,
+      inp.staged.reader(),
+      inp.lang,
+      raw_sha256=inp.staged.sha256,
+      on_asset=inp.asset.update,
+      on_cache=on_cache,
+    )
+  return await run_in_threadpool(
+    recognize_item_from_bytes,
+    inp.image_bytes,
+    inp.lang,
+    storage_key=inp.s3_key,
+    storage_etag=inp.s3_etag,
+    on_cache=on_cache,
+  )
+
+
+@app.post("/analyze", response_model=AnalyzeResponse)
+async def analyze(request: Request, db: Session = Depends(get_db)):
+  principal = getattr(request.state, "principal", None)
+  if not principal or principal.get("type") == "anonymous":
+    raise HTTPException(status_code=401, detail="Unauthorized")
+
+  inp = await _read_analyze_input(request, principal)
+  upload_task: Optional[asyncio.Task] = None
+  try:
+    if inp.staged:
+      # Archive the multipart upload concurrently with recognize/resolve.
+      upload_task = asyncio.create_task(_persist_upload(inp.staged, inp.s3_key, inp.file_ct, inp.asset))
+    vision = await _recognize_input(inp)
+    if upload_task:
+      vision = await _attach_stored_image(vision, upload_task, inp)
+    return await run_in_threadpool(
+      _analyze_from_vision, db, vision, inp.city, inp.lang, inp.search_text, inp.s3_key
+    )
+  finally:
+    if upload_task:
+      await upload_task
+    if inp.staged:
+      await inp.staged.close()
+
+
+def _sse(event: str, data: dict) -> str:
+  return f"event: {event}\ndata: {json.dumps(jsonable_encoder(data))}\n\n"
+
+
+def _vision_event(vision: dict, labels: list[str]) -> dict:
+  return {
+    "cache_hit": bool(vision.get("cache_hit")),
+    "cache_key": vision.get("cache_key"),
+    "canonical_key": vision.get("canonical_key"),
+    "confidence": vision.get("confidence"),
+    "labels": labels,
+    "notes": vision.get("notes"),
+  }
+
+
+@app.post("/analyze/stream")
+async def analyze_stream(request: Request):
+  """
+  /analyze as server-sent events, emitted as soon as each stage is known:
+  cache (hit/miss, before any upstream call) -> vision -> item (item, categories,
+  recycle, repair, donate, warnings, error) -> suggestions (suggestions, prospect)
+  -> done (the full AnalyzeResponse). Failures after the stream started arrive
+  as an error event.
+  """
+  principal = getattr(request.state, "principal", None)
+  if not principal or principal.get("type") == "anonymous":
+    raise HTTPException(status_code=401, detail="Unauthorized")
+  inp = await _read_analyze_input(request, principal)
+
+  async def events():
+    loop = asyncio.get_running_loop()
+    stage_queue: asyncio.Queue = asyncio.Queue()
+    upload_task: Optional[asyncio.Task] = None
+    # The request-scoped session is closed before a streamed body is sent.
+    db = SessionLocal()
+
+    def emit(event: str, data: dict) -> None:
+      loop.call_soon_threadsafe(stage_queue.put_nowait, (event, data))
+
+    def on_cache(hit: bool, cache_key: str) -> None:
+      emit("cache", {"cache_hit": hit, "cache_key": cache_key})
+
+    async def stages(task: asyncio.Future):
+      # Events emitted from the worker thread while task runs, then any left over.
+      while not task.done():
+        getter = asyncio.ensure_future(stage_queue.get())
+        done, _ = await asyncio.wait({getter, task}, return_when=asyncio.FIRST_COMPLETED)
+        if getter in done:
+          yield _sse(*getter.result())
+        else:
+          getter.cancel()
+      while not stage_queue.empty():
+        yield _sse(*stage_queue.get_nowait())
+
+    try:
+      if inp.staged:
+        upload_task = asyncio.create_task(_persist_upload(inp.staged, inp.s3_key, inp.file_ct, inp.asset))
+      if inp.vision is not None:
+        yield _sse("cache", {"cache_hit": True, "cache_key": inp.vision.get("cache_key")})
+      recognize = asyncio.ensure_future(_recognize_input(inp, on_cache))
+      async for event in stages(recognize):
+        yield event
+      vision = recognize.result()
+      labels = await run_in_threadpool(
+        project_labels, db, vision.get("labels") or [], vision.get("labels_lang") or inp.lang, inp.lang
+      )
+      yield _sse("vision", _vision_event(vision, labels))
+      if upload_task:
+        vision = await _attach_stored_image(vision, upload_task, inp)
+
+      item_sent = False
+
+      def on_item(data: dict) -> None:
+        nonlocal item_sent
+        item_sent = True
+        emit("item", data)
+
+      analyzed = asyncio.ensure_future(
+        run_in_threadpool(
+          _analyze_from_vision, db, vision, inp.city, inp.lang, inp.search_text, inp.s3_key, on_item, labels
+        )
+      )
+      async for event in stages(analyzed):
+        yield event
+      body = analyzed.result().model_dump(mode="json")
+      if not item_sent:
+        yield _sse("item", {k: body[k] for k in _ITEM_STAGE_KEYS})
+      yield _sse("suggestions", {"suggestions": body["suggestions"], "prospect": body["prospect"]})
+      yield _sse("done", body)
+    except HTTPException as exc:
+      yield _sse("error", {"status": exc.status_code, "detail": exc.detail})
+    except Exception:
+      logger.exception("analyze: stream failed s3_key=%s", inp.s3_key)
+      yield _sse("error", {"status": 500, "detail": "internal_error"})
+    finally:
+      db.close()
+      if upload_task:
+        await upload_task
+      if inp.staged:
+        await inp.staged.close()
+
+  return StreamingResponse(
+    events(),
+    media_type="text/event-stream",
+    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+  )
+
+
+@app.post("/analyze/probe", response_model=AnalyzeResponse)
+def analyze_probe(payload: AnalyzeProbeRequest, request: Request, db: Session = Depends(get_db)):
+  principal = getattr(request.state, "principal", None)
+  if not principal or principal.get("type") == "anonymous":
+    raise HTTPException(status_code=401, detail="Unauthorized")
+  if not payload.image_sha256 and not payload.fingerprint:
+    raise HTTPException(status_code=400, detail="image_sha256_or_fingerprint_required")
+  vision = lookup_cached_result(image_sha256=payload.image_sha256, fingerprint=payload.fingerprint)
+  if not vision:
+    # Client proceeds with the regular upload (multipart or presign + JSON).
+    raise HTTPException(status_code=404, detail="cache_miss")
+  logger.info(
+    "analyze: probe_hit city=%s lang=%s cache_key=%s",
+    payload.city,
+    payload.lang,
+    vision.get("cache_key"),
+  )
+  return _analyze_from_vision(db, vision, payload.city, payload.lang, payload.search_text, None)
+
+
+def _run_analyze_job(job: dict) -> dict:
+  """Worker side of /analyze/jobs: the same recognize -> alias lookup -> resolve chain as /analyze."""
+  try:
+    return _analyze_job_result(job)
+  except HTTPException as exc:
+    # Missing object, invalid city, ...: retrying cannot change the outcome.
+    raise PermanentJobError(str(exc.detail))
+
+
+def _analyze_job_result(job: dict) -> dict:
+  s3_key = job["s3_key"]
+  vision = _vision_for_known_object(s3_key)
+  if vision is None and job.get("image_sha256"):
+    vision = lookup_cached_result(image_sha256=job["image_sha256"])
+  if vision is None:
+    image_bytes, s3_etag = get_object_with_etag(settings, settings.S3_BUCKET_NAME, s3_key)
+    if len(image_bytes) > settings.MAX_IMAGE_BYTES:
+      raise PermanentJobError("image_too_large")
+    vision = recognize_item_from_bytes(image_bytes, job["lang"], storage_key=s3_key, storage_etag=s3_etag)
+  vision_failed = vision.get("notes") in ("parse_error",) or str(vision.get("notes", "")).startswith("vision_error")
+  if vision_failed and job["attempts"] < settings.ANALYZE_JOB_MAX_ATTEMPTS:
+    # Transient upstream trouble: let the queue retry before settling for vision_unavailable.
+    raise RuntimeError(vision.get("notes"))
+  db = SessionLocal()
+  try:
+    response = _analyze_from_vision(db, vision, job["city"], job["lang"], job.get("search_text"), s3_key)
+  finally:
+    db.close()
+  return response.model_dump(mode="json")
+
+
+@app.post("/analyze/jobs", response_model=AnalyzeJobAccepted, status_code=202)
+async def analyze_job_create(request: Request):
+  principal = getattr(request.state, "principal", None)
+  if not principal or principal.get("type") == "anonymous":
+    raise HTTPException(status_code=401, detail="Unauthorized")
+  owner = _principal_prefix(principal)
+  image_sha256: Optional[str] = None
+  content_type = request.headers.get("content-type", "")
+  if content_type.startswith("multipart/form-data"):
+    staged = await stage_multipart(request, settings.MAX_IMAGE_BYTES, settings.UPLOAD_SPOOL_MAX_BYTES)
+    try:
+      city = staged.form.get("city")
+      lang = staged.form.get("lang")
+      search_text = staged.form.get("search_text") or None
+      if not staged.file:
+        raise HTTPException(status_code=400, detail="file_required")
+      if not city or not lang:
+        raise HTTPException(status_code=400, detail="city_and_lang_required")
+      file_ct = staged.file.content_type or ""
+      ensure_allowed_content_type(file_ct)
+      s3_key = build_object_key(principal, file_ct, staged.file.filename)
+      # The worker reads the image from S3, so the job is only accepted once it is stored.
+      await run_in_threadpool(
+        upload_fileobj, settings, staged.reader(), settings.S3_BUCKET_NAME, s3_key, file_ct
+      )
+      image_sha256 = staged.sha256
+    finally:
+      await staged.close()
+  elif content_type.startswith("application/json"):
+    try:
+      payload = AnalyzeJsonRequest(**(await request.json()))
+    except ValidationError:
+      raise HTTPException(status_code=400, detail="s3_key_required")
+    if not payload.s3_key.startswith(f"{owner}/"):
+      raise HTTPException(status_code=403, detail="forbidden_s3_key")
+    city, lang, search_text, s3_key = payload.city, payload.lang, payload.search_text, payload.s3_key
+  else:
+    raise HTTPException(status_code=415, detail="unsupported_content_type")
+
+  job_id = await run_in_threadpool(
+    enqueue_job, engine, owner, city, lang, s3_key, search_text=search_text, image_sha256=image_sha256
+  )
+  analyze_jobs.notify()
+  logger.info("analyze: job queued job_id=%s s3_key=%s", job_id, s3_key)
+  return {"job_id": job_id, "status": "queued", "poll_url": f"/analyze/jobs/{job_id}"}
+
+
+@app.get("/analyze/jobs/{job_id}", response_model=AnalyzeJobResponse)
+async def analyze_job_status(
+  request: Request,
+  job_id: str,
+  wait: float = Query(0, ge=0),
+):
+  """Job state; with wait>0 the request long-polls until the job finishes or wait seconds pass."""
+  principal = getattr(request.state, "principal", None)
+  if not principal or principal.get("type") == "anonymous":
+    raise HTTPException(status_code=401, detail="Unauthorized")
+  owner = _principal_prefix(principal)
+  deadline = time.monotonic() + min(wait, settings.ANALYZE_JOB_MAX_WAIT_SECONDS)
+  while True:
+    job = await run_in_threadpool(get_job, engine, job_id, owner)
+    if not job:
+      raise HTTPException(status_code=404, detail="job_not_found")
+    if job["status"] in ("done", "failed") or time.monotonic() >= deadline:
+      return job
+    await asyncio.sleep(min(0.25, max(0.0, deadline - time.monotonic())))
+
+
 @app.post("/feedback", response_model=FeedbackResponse)
 def feedback(payload: FeedbackRequest = Body(...), db: Session = Depends(get_db)):
   if payload.feedback not in (-1, 1):
@@ -1167,21 +1798,35 @@ def feedback(payload: FeedbackRequest = Body(...), db: Session = Depends(get_db)
 def admin_list_images(
   request: Request,
   limit: int = Query(50, ge=1, le=200),
-  offset: int = Query(0, ge=0),
+  cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
   db: Session = Depends(get_db),
 ):
   _require_admin(request)
+  try:
+    after = decode_cursor(cursor, (datetime, uuid.UUID))
+  except ValueError:
+    raise HTTPException(status_code=400, detail="invalid_cursor")
+  params: dict[str, object] = {"limit": limit + 1}
+  where_sql = ""
+  if after is not None:
+    where_sql = "WHERE (created_at, image_id) < (CAST(:after_created AS timestamptz), CAST(:after_id AS uuid))"
+    params.update({"after_created": after[0], "after_id": after[1]})
   rows = db.execute(
     text(
-      """
+      f"""
       SELECT image_id::text, width, height, source, created_at
       FROM core.image_asset
-      ORDER BY created_at DESC
-      LIMIT :limit OFFSET :offset
+      {where_sql}
+      ORDER BY created_at DESC, image_id DESC
+      LIMIT :limit
       """
     ),
-    {"limit": limit, "offset": offset},
+    params,
   ).fetchall()
+  next_cursor = None
+  if len(rows) > limit:
+    rows = rows[:limit]
+    next_cursor = encode_cursor([rows[-1][4].isoformat(), rows[-1][0]])
   return {
     "images": [
       {
@@ -1193,7 +1838,8 @@ def admin_list_images(
         "created_at": r[4].isoformat() if r[4] else None,
       }
       for r in rows
-    ]
+    ],
+    "next_cursor": next_cursor,
   }
 
 
@@ -1306,23 +1952,57 @@ def admin_options(
   }
 
 
-@app.post("/admin/images")
-def admin_upload_image(
-  request: Request,
-  payload: AdminImageUploadRequest = Body(...),
-  db: Session = Depends(get_db),
-):
-  principal = _require_admin(request)
-  raw = _decode_base64_payload(payload.image_base64)
+async def _read_admin_image_upload(request: Request, model: type[BaseModel]) -> tuple[bytes, BaseModel]:
+  """Raw image bytes from multipart (file + fields) or JSON (image_base64), decoded exactly once."""
+  content_type = request.headers.get("content-type", "")
+  try:
+    if content_type.startswith("multipart/form-data"):
+      staged = await stage_multipart(request, settings.MAX_IMAGE_BYTES, settings.UPLOAD_SPOOL_MAX_BYTES)
+      try:
+        if not staged.file:
+          raise HTTPException(status_code=400, detail="file_required")
+        raw = await run_in_threadpool(staged.reader().read)
+        payload = model(**{k: v for k, v in staged.form.items() if isinstance(v, str)})
+      finally:
+        await staged.close()
+      return raw, payload
+    if content_type.startswith("application/json"):
+      payload = model(**(await request.json()))
+      if not payload.image_base64:
+        raise HTTPException(status_code=400, detail="image_base64_required")
+      return _decode_base64_payload(payload.image_base64), payload
+  except ValidationError:
+    raise HTTPException(status_code=400, detail="invalid_payload")
+  raise HTTPException(status_code=415, detail="unsupported_content_type")
+
+
+def _ingest_admin_image(principal: dict, raw: bytes, source: str) -> dict:
   if len(raw) > settings.MAX_IMAGE_BYTES:
     raise HTTPException(status_code=413, detail="image_too_large")
   content_type = _detect_content_type(raw)
   ensure_allowed_content_type(content_type)
+  normalized = normalize_for_storage(raw)
+  existing = find_image_by_sha256(normalized["sha256"])
+  if existing:
+    logger.info("admin: image dedup sha256=%s image_id=%s", normalized["sha256"], existing["image_id"])
+    return {"image_id": existing["image_id"], "s3_key": existing["storage_key"]}
   s3_key = build_object_key(principal, content_type, None)
   upload_fileobj(settings, BytesIO(raw), settings.S3_BUCKET_NAME, s3_key, content_type)
-  stored = store_image_from_base64(payload.image_base64, storage_key=s3_key, source=payload.source or "admin")
+  stored = store_normalized_image(normalized, storage_key=s3_key, source=source)
+  return {"image_id": stored["image_id"], "s3_key": s3_key}
+
+
+@app.post("/admin/images")
+async def admin_upload_image(
+  request: Request,
+  db: Session = Depends(get_db),
+):
+  principal = _require_admin(request)
+  raw, payload = await _read_admin_image_upload(request, AdminImageUploadRequest)
+  stored = await run_in_threadpool(_ingest_admin_image, principal, raw, payload.source or "admin")
   image_id = stored["image_id"]
-  return {"image_id": image_id, "image_url": _image_url(db, image_id), "s3_key": s3_key}
+  image_url = await run_in_threadpool(_image_url, db, image_id)
+  return {"image_id": image_id, "image_url": image_url, "s3_key": stored["s3_key"]}
 
 
 @app.get("/admin/items")
@@ -1331,32 +2011,70 @@ def admin_list_items(
   lang: str = Query("de"),
   q: Optional[str] = Query(None),
   limit: int = Query(50, ge=1, le=200),
-  offset: int = Query(0, ge=0),
+  cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
   db: Session = Depends(get_db),
 ):
   _require_admin(request)
   query = f"%{q.strip()}%" if q and q.strip() else None
-  base_sql = """
-      SELECT i.item_id::text, i.canonical_key, t1.text, i.primary_image_id::text, i.is_active
-      FROM core.item i
-      LEFT JOIN core.i18n_translation t1 ON t1.key = i.title_key AND t1.lang = :lang
-  """
-  where_sql = ""
-  params: dict[str, object] = {"lang": lang, "limit": limit, "offset": offset}
+  try:
+    after = decode_cursor(cursor, (bool, str, str, uuid.UUID))
+  except ValueError:
+    raise HTTPException(status_code=400, detail="invalid_cursor")
+  # Keyset on (title IS NULL, title, canonical_key, item_id), i.e. "title NULLS
+  # LAST, canonical_key". Titled and untitled items are read separately so each
+  # part walks an index in order: ix_i18n_translation_lang_text for titles,
+  # ix_item_canonical_key_id for items without a title in lang.
+  params: dict[str, object] = {"lang": lang, "limit": limit + 1}
+  titled_where = ""
+  untitled_where = ""
   if query:
-    where_sql = "WHERE (t1.text ILIKE :q OR i.canonical_key ILIKE :q)"
+    titled_where += " AND (t1.text ILIKE :q OR i.canonical_key ILIKE :q)"
+    untitled_where += " AND i.canonical_key ILIKE :q"
     params["q"] = query
-  rows = db.execute(
-    text(
-      f"""
-      {base_sql}
-      {where_sql}
-      ORDER BY t1.text NULLS LAST, i.canonical_key ASC
-      LIMIT :limit OFFSET :offset
-      """
-    ),
-    params,
-  ).fetchall()
+  if after is not None:
+    params.update({"after_title": after[1], "after_key": after[2], "after_id": after[3]})
+    if after[0]:
+      untitled_where += " AND (i.canonical_key, i.item_id) > (:after_key, CAST(:after_id AS uuid))"
+    else:
+      titled_where += (
+        " AND t1.text >= :after_title"
+        " AND (t1.text, i.canonical_key, i.item_id) > (:after_title, :after_key, CAST(:after_id AS uuid))"
+      )
+  rows = []
+  if after is None or not after[0]:
+    rows = db.execute(
+      text(
+        f"""
+        SELECT i.item_id::text, i.canonical_key, t1.text, i.primary_image_id::text, i.is_active
+        FROM core.i18n_translation t1
+        JOIN core.item i ON i.title_key = t1.key
+        WHERE t1.lang = :lang{titled_where}
+        ORDER BY t1.text, i.canonical_key, i.item_id
+        LIMIT :limit
+        """
+      ),
+      params,
+    ).fetchall()
+  if len(rows) <= limit:
+    rows += db.execute(
+      text(
+        f"""
+        SELECT i.item_id::text, i.canonical_key, NULL::text, i.primary_image_id::text, i.is_active
+        FROM core.item i
+        WHERE NOT EXISTS (
+          SELECT 1 FROM core.i18n_translation t1 WHERE t1.key = i.title_key AND t1.lang = :lang
+        ){untitled_where}
+        ORDER BY i.canonical_key, i.item_id
+        LIMIT :limit
+        """
+      ),
+      {**params, "limit": limit + 1 - len(rows)},
+    ).fetchall()
+  next_cursor = None
+  if len(rows) > limit:
+    rows = rows[:limit]
+    last = rows[-1]
+    next_cursor = encode_cursor([last[2] is None, last[2] or "", last[1], last[0]])
   return {
     "items": [
       {
@@ -1369,7 +2087,8 @@ def admin_list_items(
         "is_active": bool(r[4]),
       }
       for r in rows
-    ]
+    ],
+    "next_cursor": next_cursor,
   }
 
 
@@ -1436,24 +2155,27 @@ def admin_item_images(
 
 
 @app.post("/admin/items/{item_id}/images")
-def admin_upload_item_image(
+async def admin_upload_item_image(
   request: Request,
   item_id: str,
-  payload: AdminItemImageUploadRequest = Body(...),
   db: Session = Depends(get_db),
 ):
   principal = _require_admin(request)
+  raw, payload = await _read_admin_image_upload(request, AdminItemImageUploadRequest)
+  return await run_in_threadpool(_store_admin_item_image, db, principal, item_id, payload, raw)
+
+
+def _store_admin_item_image(
+  db: Session,
+  principal: dict,
+  item_id: str,
+  payload: AdminItemImageUploadRequest,
+  raw: bytes,
+) -> dict:
   city_id = _city_id_from_code(db, payload.city)
   if not city_id:
     raise HTTPException(status_code=400, detail="invalid_city")
-  raw = _decode_base64_payload(payload.image_base64)
-  if len(raw) > settings.MAX_IMAGE_BYTES:
-    raise HTTPException(status_code=413, detail="image_too_large")
-  content_type = _detect_content_type(raw)
-  ensure_allowed_content_type(content_type)
-  s3_key = build_object_key(principal, content_type, None)
-  upload_fileobj(settings, BytesIO(raw), settings.S3_BUCKET_NAME, s3_key, content_type)
-  stored = store_image_from_base64(payload.image_base64, storage_key=s3_key, source=payload.source or "admin")
+  stored = _ingest_admin_image(principal, raw, payload.source or "admin")
   image_id = stored["image_id"]
   db.execute(
     text(
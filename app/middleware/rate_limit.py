@@ -1,22 +1,131 @@
 from __future__ import annotations
 
+import logging
 import threading
 import time
+from collections import OrderedDict
+from typing import Callable, Protocol
 
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import SQLAlchemyError
+
+logger = logging.getLogger("rate_limit")
+
+
+class RateLimiter(Protocol):
+    def hit(self, key: str, limit: int, window_seconds: int = 60) -> bool: ...
+
+
+class _Shard:
+    __slots__ = ("lock", "tats", "next_sweep")
 
-class FixedWindowRateLimiter:
     def __init__(self) -> None:
-        self._lock = threading.Lock()
-        self._buckets: dict[str, tuple[int, int]] = {}
+        self.lock = threading.Lock()
+        # key -> theoretical arrival time; insertion order is least recently hit first
+        self.tats: OrderedDict[str, float] = OrderedDict()
+        self.next_sweep = 0.0
+
+
+class GcraRateLimiter:
+    """
+    GCRA: each key stores one float, its theoretical arrival time (TAT). A hit is
+    allowed while TAT - now <= window - window/limit, and moves TAT forward by
+    window/limit. That allows `limit` hits in a burst, then an even rate, with no
+    boundary where two windows' worth of hits fit into one.
+
+    Keys are spread over independently locked shards. A key whose TAT has
+    passed carries no state and is dropped by a sweep (at most every
+    sweep_seconds per shard); a full shard evicts its least recently hit key,
+    so memory stays bounded by max_keys whatever the number of clients.
+    """
+
+    def __init__(
+        self,
+        shards: int = 32,
+        max_keys: int = 100_000,
+        sweep_seconds: float = 60.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._shards = [_Shard() for _ in range(max(1, shards))]
+        self._max_keys_per_shard = max(1, max_keys // len(self._shards))
+        self._sweep_seconds = sweep_seconds
+        self._clock = clock
+
+    def __len__(self) -> int:
+        return sum(len(shard.tats) for shard in self._shards)
 
     def hit(self, key: str, limit: int, window_seconds: int = 60) -> bool:
-        now = int(time.time())
-        window_start = now - (now % window_seconds)
-        with self._lock:
-            start, count = self._buckets.get(key, (window_start, 0))
-            if start != window_start:
-                start, count = window_start, 0
-            if count >= limit:
+        if limit <= 0:
+            return False
+        interval = window_seconds / limit
+        now = self._clock()
+        shard = self._shards[hash(key) % len(self._shards)]
+        with shard.lock:
+            if now >= shard.next_sweep:
+                self._sweep(shard, now)
+            tat = shard.tats.pop(key, now)
+            if tat - now > window_seconds - interval:
+                shard.tats[key] = tat
                 return False
-            self._buckets[key] = (start, count + 1)
+            if len(shard.tats) >= self._max_keys_per_shard:
+                shard.tats.popitem(last=False)
+            shard.tats[key] = max(tat, now) + interval
             return True
+
+    def _sweep(self, shard: _Shard, now: float) -> None:
+        expired = [key for key, tat in shard.tats.items() if tat <= now]
+        for key in expired:
+            del shard.tats[key]
+        shard.next_sweep = now + self._sweep_seconds
+
+
+class PostgresRateLimiter:
+    """
+    GCRA with the TAT kept in core.rate_limit (UNLOGGED), so every worker and
+    host shares one budget per key. One upsert per hit, timed by the database
+    clock; expired rows are deleted at most every sweep_seconds. Fails open
+    (allows) when the database is unavailable.
+    """
+
+    HIT_SQL = """
+      INSERT INTO core.rate_limit AS r (key, tat)
+      VALUES (:key, extract(epoch FROM clock_timestamp()) + :interval)
+      ON CONFLICT (key) DO UPDATE
+      SET tat = GREATEST(r.tat, EXCLUDED.tat - :interval) + :interval
+      WHERE r.tat - (EXCLUDED.tat - :interval) <= :tolerance
+      RETURNING r.tat
+    """
+
+    def __init__(self, engine: Engine, sweep_seconds: float = 60.0) -> None:
+        self._engine = engine
+        self._sweep_seconds = sweep_seconds
+        self._next_sweep = 0.0
+        self._sweep_lock = threading.Lock()
+
+    def hit(self, key: str, limit: int, window_seconds: int = 60) -> bool:
+        if limit <= 0:
+            return False
+        interval = window_seconds / limit
+        params = {"key": key, "interval": interval, "tolerance": window_seconds - interval}
+        try:
+            with self._engine.begin() as conn:
+                allowed = conn.execute(text(self.HIT_SQL), params).fetchone() is not None
+        except SQLAlchemyError:
+            logger.warning("rate_limit: postgres backend unavailable, allowing %s", key, exc_info=True)
+            return True
+        self._maybe_sweep()
+        return allowed
+
+    def _maybe_sweep(self) -> None:
+        now = time.monotonic()
+        if now < self._next_sweep or not self._sweep_lock.acquire(blocking=False):
+            return
+        try:
+            self._next_sweep = now + self._sweep_seconds
+            with self._engine.begin() as conn:
+                conn.execute(text("DELETE FROM core.rate_limit WHERE tat < extract(epoch FROM clock_timestamp())"))
+        except SQLAlchemyError:
+            logger.warning("rate_limit: sweep failed", exc_info=True)
+        finally:
+            self._sweep_lock.release()
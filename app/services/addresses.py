@@ -0,0 +1,136 @@
+from __future__ import annotations
+from bisect import bisect_left
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+import json
+import logging
+import re
+import threading
+import unicodedata
+
+logger = logging.getLogger("addresses")
+
+_UMLAUTS = (("ä", "ae"), ("ö", "oe"), ("ü", "ue"), ("ß", "ss"))
+_STREET_ABBREV = re.compile(r"str\.?(?=\s|\d|$)")
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+_CITY_CODE = re.compile(r"^[a-z0-9_-]+$")
+
+
+def normalize_address(value: Optional[str]) -> str:
+  """Casefolded, umlauts spelled out, "str." expanded, punctuation collapsed to single spaces."""
+  text_value = unicodedata.normalize("NFKC", value or "").casefold()
+  for src, dst in _UMLAUTS:
+    text_value = text_value.replace(src, dst)
+  text_value = _STREET_ABBREV.sub("strasse", text_value)
+  text_value = unicodedata.normalize("NFKD", text_value).encode("ascii", "ignore").decode("ascii")
+  return " ".join(_NON_ALNUM.sub(" ", text_value).split())
+
+
+class AddressIndex:
+  """
+  Sorted prefix index over normalized "street number plz ort" and
+  "plz street number" keys; completion is a bisect plus a short forward scan.
+  """
+
+  def __init__(self, addresses: List[Dict[str, Any]]) -> None:
+    self.addresses = addresses
+    pairs = set()
+    for i, address in enumerate(addresses):
+      street = f"{address['street']} {address['number']}"
+      pairs.add((normalize_address(f"{street} {address['plz']} {address['ort']}"), i))
+      pairs.add((normalize_address(f"{address['plz']} {street}"), i))
+    ordered = sorted(pairs)
+    self._keys = [key for key, _ in ordered]
+    self._ids = [i for _, i in ordered]
+
+  def __len__(self) -> int:
+    return len(self.addresses)
+
+  def complete(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+    prefix = normalize_address(query)
+    if not prefix:
+      return []
+    out: List[Dict[str, Any]] = []
+    seen = set()
+    for pos in range(bisect_left(self._keys, prefix), len(self._keys)):
+      if not self._keys[pos].startswith(prefix):
+        break
+      i = self._ids[pos]
+      if i in seen:
+        continue
+      seen.add(i)
+      out.append(self.addresses[i])
+      if len(out) >= limit:
+        break
+    return out
+
+  def lookup(self, query: str) -> Optional[Dict[str, Any]]:
+    matches = self.complete(query, limit=1)
+    return matches[0] if matches else None
+
+
+def parse_addresses(data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+  """
+  AHA addresses.json shape (strasse, nummer, plz, ort, breitengrad,
+  laengengrad); entries without coordinates are skipped, duplicates merged.
+  """
+  out = []
+  seen = set()
+  for entry in data:
+    lat = entry.get("breitengrad")
+    lng = entry.get("laengengrad")
+    street = " ".join(str(entry.get("strasse") or "").split())
+    if lat is None or lng is None or not street:
+      continue
+    number = " ".join(str(entry.get("nummer") or "").split())
+    plz = str(entry.get("plz") or "").strip()
+    ort = " ".join(str(entry.get("ort") or "").split())
+    label = f"{street} {number}".strip()
+    if plz or ort:
+      label = f"{label}, {plz} {ort}".strip()
+    if label in seen:
+      continue
+    seen.add(label)
+    out.append(
+      {
+        "label": label,
+        "street": street,
+        "number": number,
+        "plz": plz,
+        "ort": ort,
+        "lat": float(lat),
+        "lng": float(lng),
+      }
+    )
+  return out
+
+
+class AddressIndexes:
+  """
+  Per-city AddressIndex loaded lazily from {data_dir}/{city}_addresses.json.
+  Only loaded cities are kept: a missing file is looked up again on the next
+  request, so a file added later is picked up and unknown codes use no memory.
+  """
+
+  def __init__(self, data_dir: str) -> None:
+    self.data_dir = Path(data_dir)
+    self._lock = threading.Lock()
+    self._cities: Dict[str, AddressIndex] = {}
+
+  def get(self, city_code: str) -> Optional[AddressIndex]:
+    if not _CITY_CODE.match(city_code or ""):
+      return None
+    index = self._cities.get(city_code)
+    if index is not None:
+      return index
+    path = self.data_dir / f"{city_code}_addresses.json"
+    if not path.is_file():
+      return None
+    with self._lock:
+      index = self._cities.get(city_code)
+      if index is None:
+        with path.open("r", encoding="utf-8") as f:
+          index = AddressIndex(parse_addresses(json.load(f)))
+        logger.info("addresses: loaded city=%s addresses=%s", city_code, len(index))
+        self._cities[city_code] = index
+      return index
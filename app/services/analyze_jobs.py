@@ -0,0 +1,305 @@
+from __future__ import annotations
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import json
+import logging
+import threading
+import time
+import uuid
+
+from sqlalchemy import text
+
+logger = logging.getLogger("analyze_jobs")
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+class PermanentJobError(Exception):
+  """Job input is invalid; retrying cannot help."""
+
+
+def enqueue_job(
+  engine,
+  owner: str,
+  city: str,
+  lang: str,
+  s3_key: str,
+  search_text: Optional[str] = None,
+  image_sha256: Optional[str] = None,
+) -> str:
+  with engine.begin() as conn:
+    row = conn.execute(
+      text(
+        """
+        INSERT INTO core.analyze_job (owner, city, lang, search_text, s3_key, image_sha256)
+        VALUES (:owner, :city, :lang, :search_text, :s3_key, :image_sha256)
+        RETURNING job_id::text
+        """
+      ),
+      {
+        "owner": owner,
+        "city": city,
+        "lang": lang,
+        "search_text": search_text,
+        "s3_key": s3_key,
+        "image_sha256": image_sha256,
+      },
+    ).fetchone()
+  return row[0]
+
+
+def get_job(engine, job_id: str, owner: str) -> Optional[Dict[str, Any]]:
+  """None when the job does not exist, is not owner's, or job_id is not a UUID."""
+  try:
+    uuid.UUID(job_id)
+  except ValueError:
+    return None
+  with engine.connect() as conn:
+    row = conn.execute(
+      text(
+        """
+        SELECT job_id::text, status, result, error, attempts, created_at, finished_at
+        FROM core.analyze_job
+        WHERE job_id = CAST(:job_id AS uuid) AND owner = :owner
+        """
+      ),
+      {"job_id": job_id, "owner": owner},
+    ).fetchone()
+  if not row:
+    return None
+  return {
+    "job_id": row[0],
+    "status": row[1],
+    "result": row[2],
+    "error": row[3],
+    "attempts": row[4],
+    "created_at": row[5].isoformat() if row[5] else None,
+    "finished_at": row[6].isoformat() if row[6] else None,
+  }
+
+
+def claim_job(engine, lease_seconds: float, max_attempts: int) -> Optional[Dict[str, Any]]:
+  """
+  Take the oldest runnable job. SKIP LOCKED lets any number of workers (threads
+  or processes) poll the same table without blocking each other. A queued job
+  is runnable once its retry backoff (locked_until) has passed; a running job
+  whose lease expired (worker crashed) becomes claimable again while it has
+  attempts left, and is failed by sweep_jobs otherwise.
+  """
+  with engine.begin() as conn:
+    row = conn.execute(
+      text(
+        """
+        UPDATE core.analyze_job j
+        SET status = 'running',
+            attempts = j.attempts + 1,
+            started_at = now(),
+            locked_until = now() + make_interval(secs => :lease)
+        WHERE j.job_id = (
+          SELECT job_id
+          FROM core.analyze_job
+          WHERE (status = 'queued' AND (locked_until IS NULL OR locked_until <= now()))
+             OR (status = 'running' AND locked_until < now() AND attempts < :max_attempts)
+          ORDER BY created_at
+          FOR UPDATE SKIP LOCKED
+          LIMIT 1
+        )
+        RETURNING j.job_id::text, j.owner, j.city, j.lang, j.search_text, j.s3_key, j.image_sha256, j.attempts
+        """
+      ),
+      {"lease": lease_seconds, "max_attempts": max_attempts},
+    ).fetchone()
+  if not row:
+    return None
+  keys = ("job_id", "owner", "city", "lang", "search_text", "s3_key", "image_sha256", "attempts")
+  return dict(zip(keys, row))
+
+
+def finish_job(
+  engine,
+  job_id: str,
+  attempts: int,
+  status: str,
+  result: Optional[Dict[str, Any]] = None,
+  error: Optional[str] = None,
+  retry_after: float = 0.0,
+) -> bool:
+  """
+  Record the outcome of claim `attempts` of a job. False when that claim no
+  longer owns the job: its lease expired and another worker re-claimed it (or
+  the sweep failed it), whose outcome must not be overwritten.
+  retry_after: for a requeued job, seconds before it may be claimed again.
+  """
+  with engine.begin() as conn:
+    updated = conn.execute(
+      text(
+        """
+        UPDATE core.analyze_job
+        SET status = :status,
+            result = CAST(:result AS jsonb),
+            error = :error,
+            locked_until = CASE WHEN :retry_after > 0 THEN now() + make_interval(secs => :retry_after) END,
+            finished_at = CASE WHEN :status IN ('done', 'failed') THEN now() ELSE NULL END
+        WHERE job_id = CAST(:job_id AS uuid) AND status = 'running' AND attempts = :attempts
+        """
+      ),
+      {
+        "job_id": job_id,
+        "attempts": attempts,
+        "status": status,
+        "result": json.dumps(result) if result is not None else None,
+        "error": error,
+        "retry_after": retry_after,
+      },
+    ).rowcount
+  return bool(updated)
+
+
+def sweep_jobs(engine, max_attempts: int, retention_seconds: float, batch_size: int = 1000) -> Tuple[int, int]:
+  """
+  Fail running jobs whose lease expired on their last attempt, and delete up to
+  batch_size jobs finished more than retention_seconds ago. Returns (failed, deleted).
+  """
+  with engine.begin() as conn:
+    failed = conn.execute(
+      text(
+        """
+        UPDATE core.analyze_job
+        SET status = 'failed',
+            error = 'lease_expired',
+            locked_until = NULL,
+            finished_at = now()
+        WHERE status = 'running' AND locked_until < now() AND attempts >= :max_attempts
+        """
+      ),
+      {"max_attempts": max_attempts},
+    ).rowcount
+    deleted = conn.execute(
+      text(
+        """
+        DELETE FROM core.analyze_job
+        WHERE job_id IN (
+          SELECT job_id
+          FROM core.analyze_job
+          WHERE finished_at < now() - make_interval(secs => :retention)
+          LIMIT :batch_size
+        )
+        """
+      ),
+      {"retention": retention_seconds, "batch_size": batch_size},
+    ).rowcount
+  return failed or 0, deleted or 0
+
+
+class AnalyzeJobWorkers:
+  """
+  Local worker pool for core.analyze_job. Workers poll every poll_interval and
+  are woken immediately by notify() after an enqueue in this process. Failed
+  attempts are requeued with exponential backoff (retry_backoff, doubled per
+  attempt); one worker runs sweep_jobs at most every sweep_seconds.
+  """
+
+  def __init__(
+    self,
+    engine,
+    handler: Callable[[Dict[str, Any]], Dict[str, Any]],
+    workers: int = 2,
+    poll_interval: float = 1.0,
+    lease_seconds: float = 120.0,
+    max_attempts: int = 3,
+    retry_backoff: float = 5.0,
+    retention_seconds: float = 24 * 3600.0,
+    sweep_seconds: float = 300.0,
+  ) -> None:
+    self._engine = engine
+    self._handler = handler
+    self.workers = workers
+    self.poll_interval = poll_interval
+    self.lease_seconds = lease_seconds
+    self.max_attempts = max(1, max_attempts)
+    self.retry_backoff = retry_backoff
+    self.retention_seconds = retention_seconds
+    self.sweep_seconds = sweep_seconds
+    self._next_sweep = 0.0
+    self._sweep_lock = threading.Lock()
+    self._wake = threading.Event()
+    self._stop = threading.Event()
+    self._threads: List[threading.Thread] = []
+
+  def start(self) -> None:
+    if self._threads or self.workers <= 0:
+      return
+    for i in range(self.workers):
+      thread = threading.Thread(target=self._run, name=f"analyze-job-{i}", daemon=True)
+      thread.start()
+      self._threads.append(thread)
+
+  def notify(self) -> None:
+    self._wake.set()
+
+  def stop(self, timeout: float = 10.0) -> None:
+    self._stop.set()
+    self._wake.set()
+    for thread in self._threads:
+      thread.join(timeout=timeout)
+    self._threads = []
+
+  def run_once(self) -> bool:
+    try:
+      job = claim_job(self._engine, self.lease_seconds, self.max_attempts)
+    except Exception as exc:
+      logger.warning("analyze_jobs: claim failed: %s", exc)
+      return False
+    if not job:
+      return False
+    job_id = job["job_id"]
+    try:
+      result = self._handler(job)
+    except PermanentJobError as exc:
+      logger.info("analyze_jobs: job=%s failed: %s", job_id, exc)
+      self._finish(job, FAILED, error=str(exc))
+    except Exception as exc:
+      retry = job["attempts"] < self.max_attempts
+      logger.warning("analyze_jobs: job=%s attempt=%s error=%s retry=%s", job_id, job["attempts"], exc, retry)
+      backoff = self.retry_backoff * 2 ** (job["attempts"] - 1) if retry else 0.0
+      self._finish(job, QUEUED if retry else FAILED, error=str(exc), retry_after=backoff)
+    else:
+      self._finish(job, DONE, result=result)
+    return True
+
+  def _finish(self, job: Dict[str, Any], status: str, **kwargs: Any) -> None:
+    # A failed write leaves the job running; its lease expiry hands it to the
+    # next claim (or the sweep), so log and keep the worker alive.
+    try:
+      if not finish_job(self._engine, job["job_id"], job["attempts"], status, **kwargs):
+        logger.warning("analyze_jobs: job=%s attempt=%s lost its lease, %s not recorded", job["job_id"], job["attempts"], status)
+    except Exception as exc:
+      logger.warning("analyze_jobs: job=%s finish failed: %s", job["job_id"], exc)
+
+  def maybe_sweep(self) -> None:
+    now = time.monotonic()
+    if now < self._next_sweep or not self._sweep_lock.acquire(blocking=False):
+      return
+    try:
+      self._next_sweep = now + self.sweep_seconds
+      failed, deleted = sweep_jobs(self._engine, self.max_attempts, self.retention_seconds)
+      if failed or deleted:
+        logger.info("analyze_jobs: sweep failed=%s deleted=%s", failed, deleted)
+    except Exception as exc:
+      logger.warning("analyze_jobs: sweep failed: %s", exc)
+    finally:
+      self._sweep_lock.release()
+
+  def _run(self) -> None:
+    while not self._stop.is_set():
+      try:
+        self.maybe_sweep()
+        if self.run_once():
+          continue
+      except Exception:
+        # Nothing restarts a dead worker thread; keep polling instead.
+        logger.exception("analyze_jobs: worker error")
+      self._wake.wait(self.poll_interval)
+      self._wake.clear()
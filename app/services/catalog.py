@@ -0,0 +1,269 @@
+from __future__ import annotations
+from typing import Any, Dict, List, Optional, Tuple
+import json
+import logging
+import threading
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.services.snapshots import REQUEST_BROTLI_QUALITY, DatasetVersionWatch, Snapshot
+
+logger = logging.getLogger("catalog")
+
+CATALOG_MEDIA_TYPE = "application/x-ndjson"
+
+# Items that have rules in the city, the same set resolve_item answers for.
+_CITY_ITEMS = """
+  WITH city_items AS (
+    SELECT item_id FROM core.item_city_category WHERE city_id = CAST(:city_id AS uuid) {only}
+    UNION
+    SELECT item_id FROM core.item_city_disposal WHERE city_id = CAST(:city_id AS uuid) {only}
+  )
+"""
+
+# Title/description rules of resolve_item: the city override wins key by key;
+# without one, only a base description written for this city is shown.
+ITEMS_SQL = _CITY_ITEMS + """
+  SELECT i.item_id::text, i.canonical_key, t.text, dt.text, i.primary_image_id::text
+  FROM city_items ci
+  JOIN core.item i ON i.item_id = ci.item_id
+  LEFT JOIN core.item_city_text_override o
+    ON o.city_id = CAST(:city_id AS uuid) AND o.item_id = i.item_id
+  LEFT JOIN core.i18n_translation t
+    ON t.key = COALESCE(o.title_key, i.title_key) AND t.lang = :lang
+  LEFT JOIN core.i18n_translation dt
+    ON dt.lang = :lang
+   AND dt.key = CASE
+     WHEN o.item_id IS NOT NULL THEN COALESCE(o.desc_key, i.desc_key)
+     WHEN right(i.desc_key, length(:desc_suffix)) = :desc_suffix THEN i.desc_key
+   END
+  ORDER BY i.canonical_key
+"""
+
+ALIASES_SQL = _CITY_ITEMS + """
+  SELECT i.item_id::text, a.alias_text, a.alias_norm
+  FROM city_items ci
+  JOIN core.item i ON i.item_id = ci.item_id
+  JOIN core.item_alias a ON a.canonical_key = i.canonical_key AND a.lang = :lang
+  ORDER BY a.alias_id
+"""
+
+CATEGORIES_SQL = """
+  SELECT icc.item_id::text, cat.code, t.text
+  FROM core.item_city_category icc
+  JOIN core.category cat ON cat.category_id = icc.category_id
+  LEFT JOIN core.i18n_translation t ON t.key = cat.name_key AND t.lang = :lang
+  WHERE icc.city_id = CAST(:city_id AS uuid) {only}
+  ORDER BY icc.item_id, icc.priority ASC
+"""
+
+DISPOSALS_SQL = """
+  SELECT icd.item_id::text, d.code, t.text, d.recycle_center_typ_code
+  FROM core.item_city_disposal icd
+  JOIN core.disposal_method d ON d.disposal_id = icd.disposal_id
+  LEFT JOIN core.i18n_translation t ON t.key = d.name_key AND t.lang = :lang
+  WHERE icd.city_id = CAST(:city_id AS uuid) {only}
+  ORDER BY icd.item_id, icd.priority ASC
+"""
+
+WARNINGS_SQL = """
+  SELECT icw.item_id::text, w.code, t.text, bt.text, w.severity
+  FROM core.item_city_warning icw
+  JOIN core.warning w ON w.warning_id = icw.warning_id
+  LEFT JOIN core.i18n_translation t ON t.key = w.title_key AND t.lang = :lang
+  LEFT JOIN core.i18n_translation bt ON bt.key = w.body_key AND bt.lang = :lang
+  WHERE icw.city_id = CAST(:city_id AS uuid) {only}
+  ORDER BY icw.item_id, w.code ASC
+"""
+
+
+def _only(column: str, item_ids: Optional[List[str]]) -> str:
+  return "" if item_ids is None else f"AND {column} = ANY(CAST(:item_ids AS uuid[]))"
+
+
+def load_catalog(
+  db: Session,
+  city_id: str,
+  city_code: str,
+  lang: str,
+  item_ids: Optional[List[str]] = None,
+) -> List[Dict[str, Any]]:
+  """
+  One query per table for the whole city (or just item_ids) instead of
+  resolve_item's per-item lookups. Items carry image_id only: image URLs are
+  presigned and expire.
+  """
+  params = {"city_id": city_id, "lang": lang, "desc_suffix": f".desc.{city_code}", "item_ids": item_ids}
+  only = _only("item_id", item_ids)
+  items: Dict[str, Dict[str, Any]] = {}
+  for r in db.execute(text(ITEMS_SQL.format(only=only)), params).fetchall():
+    items[r[0]] = {
+      "type": "item",
+      "id": r[0],
+      "canonical_key": r[1],
+      "title": r[2],
+      "description": r[3],
+      "image_id": r[4],
+      "aliases": [],
+      "categories": [],
+      "disposals": [],
+      "warnings": [],
+    }
+  for r in db.execute(text(ALIASES_SQL.format(only=only)), params).fetchall():
+    items[r[0]]["aliases"].append({"text": r[1], "norm": r[2]})
+  for r in db.execute(text(CATEGORIES_SQL.format(only=_only("icc.item_id", item_ids))), params).fetchall():
+    items[r[0]]["categories"].append({"code": r[1], "label": r[2]})
+  for r in db.execute(text(DISPOSALS_SQL.format(only=_only("icd.item_id", item_ids))), params).fetchall():
+    items[r[0]]["disposals"].append({"code": r[1], "label": r[2], "recycle_center_typ_code": r[3]})
+  for r in db.execute(text(WARNINGS_SQL.format(only=_only("icw.item_id", item_ids))), params).fetchall():
+    if r[0] in items:
+      items[r[0]]["warnings"].append({"code": r[1], "label": r[2], "body": r[3], "severity": int(r[4])})
+  return list(items.values())
+
+
+def render_catalog(city_code: str, lang: str, version: Optional[int], items: List[Dict[str, Any]]) -> bytes:
+  """NDJSON: a header line, then one line per item."""
+  header = {"type": "catalog", "city": city_code, "lang": lang, "version": version, "items": len(items)}
+  lines = [header] + items
+  return "".join(json.dumps(line, ensure_ascii=False, separators=(",", ":")) + "\n" for line in lines).encode("utf-8")
+
+
+def _city_id(db: Session, city_code: str) -> str:
+  row = db.execute(
+    text("SELECT city_id::text FROM core.city WHERE code = :code AND is_active = true"),
+    {"code": city_code},
+  ).fetchone()
+  if not row:
+    raise ValueError("invalid_city")
+  return row[0]
+
+
+def _check_lang(db: Session, lang: str) -> None:
+  row = db.execute(
+    text("SELECT 1 FROM core.language WHERE lang = :lang AND is_active = true"),
+    {"lang": lang},
+  ).fetchone()
+  if not row:
+    raise ValueError("invalid_lang")
+
+
+def catalog_changes(
+  db: Session,
+  city_code: str,
+  lang: str,
+  since: int,
+  max_items: int = 1000,
+) -> Optional[Dict[str, Any]]:
+  """
+  Items of the city changed after catalog version `since`, read from
+  core.catalog_change. `removed` lists changed ids that no longer have rules in
+  the city (clients drop them; ids they never had are harmless). None when the
+  journal no longer reaches back to `since` (compacted, or a version this
+  database never issued) or more than max_items changed: the client should
+  download the full catalog instead. Raises ValueError like CatalogSnapshots.get.
+  """
+  city_id = _city_id(db, city_code)
+  _check_lang(db, lang)
+  row = db.execute(
+    text("SELECT version, compacted_through FROM core.dataset_version WHERE dataset = 'catalog'")
+  ).fetchone()
+  version, floor = (int(row[0]), int(row[1])) if row else (0, 0)
+  if since < floor or since > version:
+    return None
+  changed = [
+    r[0]
+    for r in db.execute(
+      text(
+        """
+        SELECT DISTINCT item_id::text
+        FROM core.catalog_change
+        WHERE version > :since AND version <= :version
+          AND (city_id = CAST(:city_id AS uuid) OR city_id IS NULL)
+        """
+      ),
+      {"since": since, "version": version, "city_id": city_id},
+    ).fetchall()
+  ]
+  if len(changed) > max_items:
+    return None
+  items = load_catalog(db, city_id, city_code, lang, changed) if changed else []
+  present = {item["id"] for item in items}
+  return {
+    "city": city_code,
+    "lang": lang,
+    "since": since,
+    "version": version,
+    "items": items,
+    "removed": sorted(set(changed) - present),
+  }
+
+
+class CatalogSnapshots:
+  """
+  Per (city, lang) catalog snapshots, built on first request. When
+  core.dataset_version['catalog'] moves, the first request for a key rebuilds
+  it while concurrent requests keep getting the previous snapshot; only a key
+  with no snapshot at all makes requests wait. Builds lock per key, so one
+  city's build never holds up another's.
+  """
+
+  def __init__(self, check_seconds: float = 10.0) -> None:
+    self._lock = threading.Lock()
+    self._key_locks: Dict[Tuple[str, str], threading.Lock] = {}
+    self._snapshots: Dict[Tuple[str, str], Snapshot] = {}
+    self._watch = DatasetVersionWatch("catalog", check_seconds)
+
+  @property
+  def version(self) -> Optional[int]:
+    return self._watch.version
+
+  def get(self, db: Session, city_code: str, lang: str) -> Snapshot:
+    """Raises ValueError("invalid_city") / ValueError("invalid_lang")."""
+    self._watch.changed(db)
+    key = (city_code, lang)
+    snapshot = self._snapshots.get(key)
+    if snapshot is not None and snapshot.version == self._watch.version:
+      return snapshot
+    key_lock = self._key_lock(key)
+    if snapshot is not None:
+      # Stale: rebuild unless another request already is, and serve the old one meanwhile.
+      if not key_lock.acquire(blocking=False):
+        return snapshot
+    else:
+      key_lock.acquire()
+    try:
+      current = self._snapshots.get(key)
+      if current is not None and current.version == self._watch.version:
+        return current
+      return self._build(db, key)
+    except ValueError:
+      # Unknown city/lang: don't keep a lock per junk key.
+      with self._lock:
+        if key not in self._snapshots:
+          self._key_locks.pop(key, None)
+      raise
+    finally:
+      key_lock.release()
+
+  def _key_lock(self, key: Tuple[str, str]) -> threading.Lock:
+    with self._lock:
+      return self._key_locks.setdefault(key, threading.Lock())
+
+  def _build(self, db: Session, key: Tuple[str, str]) -> Snapshot:
+    city_code, lang = key
+    city_id = _city_id(db, city_code)
+    _check_lang(db, lang)
+    version = self._watch.version
+    items = load_catalog(db, city_id, city_code, lang)
+    body = render_catalog(city_code, lang, version, items)
+    snapshot = Snapshot(body, CATALOG_MEDIA_TYPE, len(items), version, brotli_quality=REQUEST_BROTLI_QUALITY)
+    with self._lock:
+      self._snapshots[key] = snapshot
+    logger.info("catalog: built city=%s lang=%s version=%s items=%s bytes=%s br=%s", city_code, lang, version, len(items), len(snapshot.body), len(snapshot.brotli))
+    return snapshot
+
+  def invalidate(self) -> None:
+    with self._lock:
+      self._snapshots = {}
+    self._watch.expire()
@@ -0,0 +1,121 @@
+from __future__ import annotations
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.services.pagination import decode_cursor, encode_cursor
+
+
+def search_sql(ranked: bool, after: bool) -> str:
+  """
+  Ranked search over one city's items.
+
+  Candidates come from two index-driven sets (title translations via the
+  trigram GIN on i18n_translation.text, canonical keys via the trigram GIN on
+  item.canonical_key) instead of one OR across joined tables. Rows are ordered
+  by (score DESC, sort_title, canonical_key); the page continues strictly
+  after the cursor's key. Disposals are aggregated for the page only.
+  """
+  if ranked:
+    hits = """
+      SELECT i.item_id
+      FROM core.i18n_translation t
+      JOIN core.item i ON i.title_key = t.key
+      WHERE t.lang = :lang AND (t.text ILIKE :pattern OR :q <% t.text)
+      UNION
+      SELECT i.item_id
+      FROM core.item i
+      WHERE i.canonical_key ILIKE :pattern OR :q <% i.canonical_key
+    """
+    score = "GREATEST(word_similarity(:q, COALESCE(t1.text, '')), word_similarity(:q, i.canonical_key))::float8"
+  else:
+    hits = "SELECT DISTINCT icc.item_id FROM core.item_city_category icc WHERE icc.city_id = (SELECT city_id FROM city)"
+    score = "0::float8"
+  after_sql = "WHERE (-score, sort_title, canonical_key) > (-CAST(:after_score AS float8), :after_title, :after_key)" if after else ""
+  return f"""
+      WITH city AS (
+        SELECT city_id FROM core.city WHERE code = :city AND is_active = true
+      ),
+      hits AS (
+        {hits}
+      ),
+      scored AS (
+        SELECT
+          i.item_id,
+          i.canonical_key,
+          t1.text AS title,
+          i.primary_image_id,
+          lower(COALESCE(t1.text, i.canonical_key)) AS sort_title,
+          {score} AS score
+        FROM hits h
+        JOIN core.item i ON i.item_id = h.item_id
+        LEFT JOIN core.i18n_translation t1 ON t1.key = i.title_key AND t1.lang = :lang
+        WHERE EXISTS (
+          SELECT 1 FROM core.item_city_category icc
+          WHERE icc.item_id = i.item_id AND icc.city_id = (SELECT city_id FROM city)
+        )
+      ),
+      page AS (
+        SELECT * FROM scored
+        {after_sql}
+        ORDER BY score DESC, sort_title ASC, canonical_key ASC
+        LIMIT :limit
+      )
+      SELECT
+        p.item_id::text,
+        p.canonical_key,
+        p.title,
+        p.primary_image_id::text,
+        COALESCE(d.disposals, '[]'::jsonb),
+        p.score,
+        p.sort_title
+      FROM page p
+      LEFT JOIN LATERAL (
+        SELECT jsonb_agg(
+          DISTINCT jsonb_build_object(
+            'code', dm.code,
+            'label', dt.text,
+            'recycle_center_typ_code', dm.recycle_center_typ_code
+          )
+        ) AS disposals
+        FROM core.item_city_disposal icd
+        JOIN core.disposal_method dm ON dm.disposal_id = icd.disposal_id
+        LEFT JOIN core.i18n_translation dt ON dt.key = dm.name_key AND dt.lang = :lang
+        WHERE icd.item_id = p.item_id AND icd.city_id = (SELECT city_id FROM city)
+      ) d ON TRUE
+      ORDER BY p.score DESC, p.sort_title ASC, p.canonical_key ASC
+      """
+
+
+def search_items(
+  db: Session,
+  city: str,
+  lang: str,
+  q: Optional[str],
+  limit: int,
+  cursor: Optional[str] = None,
+) -> Tuple[List[Tuple[Any, ...]], Optional[str]]:
+  """
+  One page of (item_id, canonical_key, title, primary_image_id, disposals)
+  rows and the cursor for the next page (None on the last page).
+  Raises ValueError for a malformed cursor.
+  """
+  q = (q or "").strip()
+  after = decode_cursor(cursor, (float, str, str))
+  params: Dict[str, Any] = {
+    "city": city,
+    "lang": lang,
+    "q": q,
+    "pattern": f"%{q}%",
+    "limit": limit + 1,
+  }
+  if after is not None:
+    params.update({"after_score": after[0], "after_title": after[1], "after_key": after[2]})
+  rows = db.execute(text(search_sql(bool(q), after is not None)), params).fetchall()
+  next_cursor = None
+  if len(rows) > limit:
+    rows = rows[:limit]
+    last = rows[-1]
+    next_cursor = encode_cursor([last[5], last[6], last[1]])
+  return [tuple(r[:5]) for r in rows], next_cursor
@@ -0,0 +1,57 @@
+from __future__ import annotations
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Sequence
+import base64
+import json
+import uuid
+
+
+def encode_cursor(values: List[Any]) -> str:
+  """Opaque keyset cursor: the sort key of the last row of a page."""
+  raw = json.dumps(values, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+  return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _is_timestamp(value: Any) -> bool:
+  try:
+    datetime.fromisoformat(value)
+  except (TypeError, ValueError):
+    return False
+  return True
+
+
+def _is_uuid(value: Any) -> bool:
+  try:
+    uuid.UUID(value)
+  except (AttributeError, TypeError, ValueError):
+    return False
+  return True
+
+
+# What each cursor value must look like in JSON before it reaches a CAST in SQL.
+_CHECKS: Dict[type, Callable[[Any], bool]] = {
+  bool: lambda v: isinstance(v, bool),
+  str: lambda v: isinstance(v, str),
+  float: lambda v: isinstance(v, (int, float)) and not isinstance(v, bool),
+  datetime: _is_timestamp,
+  uuid.UUID: _is_uuid,
+}
+
+
+def decode_cursor(token: Optional[str], kinds: Sequence[type]) -> Optional[List[Any]]:
+  """
+  Sort key from encode_cursor; ValueError when the token is not a cursor with
+  one value per entry of kinds, each of that kind (datetime and UUID values
+  stay ISO / hex strings).
+  """
+  if not token:
+    return None
+  try:
+    values = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+  except Exception:
+    raise ValueError("invalid_cursor")
+  if not isinstance(values, list) or len(values) != len(kinds):
+    raise ValueError("invalid_cursor")
+  if not all(_CHECKS[kind](value) for kind, value in zip(kinds, values)):
+    raise ValueError("invalid_cursor")
+  return values
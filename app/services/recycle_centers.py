@@ -0,0 +1,454 @@
+from __future__ import annotations
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import logging
+import math
+import threading
+
+import numpy as np
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.disposal_methods import find_disposal_method_seed_by_code
+from app.services.snapshots import REQUEST_BROTLI_QUALITY, DatasetVersionWatch, Snapshot
+
+logger = logging.getLogger("recycle_centers")
+
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEG_LAT = 111.32
+TILE_SIZE_PX = 256
+CLUSTER_CELL_PX = 64
+MAX_MERCATOR_LAT = 85.05112878
+# Beyond this many rings a single vectorized pass over the city is cheaper
+# than walking cells (ring r has 8r cells).
+NEAREST_MAX_RINGS = 64
+
+
+def haversine_km(lat: float, lng: float, lats: np.ndarray, lngs: np.ndarray) -> np.ndarray:
+  lat1 = np.radians(lat)
+  lat2 = np.radians(lats)
+  dlat = lat2 - lat1
+  dlng = np.radians(lngs - lng)
+  a = np.sin(dlat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlng / 2) ** 2
+  return 2 * EARTH_RADIUS_KM * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+
+def mercator_px(lats: np.ndarray, lngs: np.ndarray, zoom: int) -> Tuple[np.ndarray, np.ndarray]:
+  """Web-mercator pixel coordinates at zoom (256px tiles), as used by map clients."""
+  scale = TILE_SIZE_PX * (2 ** zoom)
+  lat = np.radians(np.clip(lats, -MAX_MERCATOR_LAT, MAX_MERCATOR_LAT))
+  x = (lngs + 180.0) / 360.0 * scale
+  y = (1.0 - np.log(np.tan(lat) + 1.0 / np.cos(lat)) / math.pi) / 2.0 * scale
+  return x, y
+
+
+class Clusters:
+  """
+  Centers grouped into CLUSTER_CELL_PX screen cells at one zoom level.
+  Arrays are per cluster; member is the index of one member center (the
+  center itself when count == 1).
+  """
+
+  def __init__(self, lat: np.ndarray, lng: np.ndarray, count: np.ndarray, typ_code: np.ndarray, member: np.ndarray) -> None:
+    self.lat = lat
+    self.lng = lng
+    self.count = count
+    self.typ_code = typ_code
+    self.member = member
+
+  def __len__(self) -> int:
+    return len(self.count)
+
+
+class CityCenterIndex:
+  """
+  Grid index over one city's active centers. Centers are bucketed into cells
+  of cell_deg x cell_deg; queries scan rings of cells outwards from the query
+  point and compute distances for the candidates in one vectorized pass.
+  Queries more than NEAREST_MAX_RINGS rings from the city's far edge compute
+  distances to all centers at once instead.
+  """
+
+  def __init__(self, centers: List[Dict[str, Any]], cell_deg: float = 0.01, cluster_max_zoom: int = -1) -> None:
+    self.centers = centers
+    self.cell_deg = cell_deg
+    self.cluster_max_zoom = cluster_max_zoom
+    self.lat = np.array([c["lat"] for c in centers], dtype=float)
+    self.lng = np.array([c["lng"] for c in centers], dtype=float)
+    self.typ_code = np.array([c["typ_code"] if c["typ_code"] is not None else -1 for c in centers], dtype=np.int64)
+    self._disposal: Dict[str, np.ndarray] = {}
+    for i, center in enumerate(centers):
+      for code in center["disposal_positive"] or []:
+        self._disposal.setdefault(code, np.zeros(len(centers), dtype=bool))[i] = True
+    cells: Dict[Tuple[int, int], List[int]] = {}
+    for i in range(len(centers)):
+      cells.setdefault(self._cell(self.lat[i], self.lng[i]), []).append(i)
+    self._cells = {key: np.array(idx, dtype=np.int64) for key, idx in cells.items()}
+    if centers:
+      rows = [key[0] for key in self._cells]
+      cols = [key[1] for key in self._cells]
+      self._bounds = (min(rows), max(rows), min(cols), max(cols))
+      max_abs_lat = float(np.max(np.abs(self.lat)))
+    else:
+      self._bounds = (0, 0, 0, 0)
+      max_abs_lat = 0.0
+    # Lower bound for the extent of one cell in km (longitude cells shrink towards the poles).
+    self._cell_km = cell_deg * KM_PER_DEG_LAT * max(0.01, math.cos(math.radians(min(89.0, max_abs_lat + cell_deg))))
+    self._known_typ_codes = set(self.typ_codes())
+    # Unfiltered clusters for every clustered zoom are built up front; filtered
+    # variants are built on first use. Both live as long as this index, so only
+    # filters on codes present in the data are cached: the key space stays
+    # bounded whatever clients send.
+    self._clusters: Dict[Tuple[int, Optional[int], Optional[str]], Clusters] = {}
+    for zoom in range(cluster_max_zoom + 1):
+      self.clusters(zoom)
+    self._snapshots: Dict[Tuple[str, Optional[int], Optional[int]], Snapshot] = {}
+
+  def __len__(self) -> int:
+    return len(self.centers)
+
+  def _cell(self, lat: float, lng: float) -> Tuple[int, int]:
+    return (int(math.floor(lat / self.cell_deg)), int(math.floor(lng / self.cell_deg)))
+
+  def _mask(self, typ_code: Optional[int], disposal_positive: Optional[str]) -> Optional[np.ndarray]:
+    mask = None
+    if typ_code is not None:
+      mask = self.typ_code == typ_code
+    if disposal_positive is not None:
+      disposal = self._disposal.get(disposal_positive)
+      if disposal is None:
+        disposal = np.zeros(len(self.centers), dtype=bool)
+      mask = disposal if mask is None else mask & disposal
+    return mask
+
+  def _ring(self, row: int, col: int, r: int) -> List[np.ndarray]:
+    if r == 0:
+      cell = self._cells.get((row, col))
+      return [cell] if cell is not None else []
+    out = []
+    for dr in range(-r, r + 1):
+      step = 1 if abs(dr) == r else 2 * r
+      for dc in range(-r, r + 1, step):
+        cell = self._cells.get((row + dr, col + dc))
+        if cell is not None:
+          out.append(cell)
+    return out
+
+  def _max_ring(self, row: int, col: int) -> int:
+    min_row, max_row, min_col, max_col = self._bounds
+    return max(abs(row - min_row), abs(row - max_row), abs(col - min_col), abs(col - max_col))
+
+  def _min_ring(self, row: int, col: int) -> int:
+    """First ring that touches the cell bounds (0 inside them)."""
+    min_row, max_row, min_col, max_col = self._bounds
+    return max(0, min_row - row, row - max_row, min_col - col, col - max_col)
+
+  def filtered(self, typ_code: Optional[int] = None, disposal_positive: Optional[str] = None) -> List[Dict[str, Any]]:
+    mask = self._mask(typ_code, disposal_positive)
+    if mask is None:
+      return list(self.centers)
+    return [self.centers[i] for i in np.flatnonzero(mask)]
+
+  def typ_codes(self) -> List[int]:
+    return sorted(int(code) for code in set(self.typ_code.tolist()) if code >= 0)
+
+  def snapshot(
+    self,
+    city_code: str,
+    typ_code: Optional[int],
+    render: Callable[[str, List[Dict[str, Any]]], bytes],
+    limit: Optional[int] = None,
+  ) -> Optional[Snapshot]:
+    """
+    Full (optionally typ_code-filtered) list for city_code, or its first
+    `limit` centers, rendered once per index. A limit the list fits in shares
+    the full snapshot; callers keep the number of distinct limits small. None
+    for a typ_code that no center has.
+    """
+    if typ_code is not None and typ_code not in self._known_typ_codes:
+      return None
+    key = (city_code, typ_code, limit)
+    snapshot = self._snapshots.get(key)
+    if snapshot is None:
+      centers = self.filtered(typ_code)
+      if limit is not None and len(centers) <= limit:
+        snapshot = self.snapshot(city_code, typ_code, render)
+      else:
+        centers = centers[:limit]
+        snapshot = Snapshot(render(city_code, centers), count=len(centers), brotli_quality=REQUEST_BROTLI_QUALITY)
+      self._snapshots[key] = snapshot
+    return snapshot
+
+  def in_bbox(
+    self,
+    bbox: Tuple[float, float, float, float],
+    typ_code: Optional[int] = None,
+    disposal_positive: Optional[str] = None,
+  ) -> List[Dict[str, Any]]:
+    """Matching centers inside (min_lng, min_lat, max_lng, max_lat), in load order."""
+    inside = _bbox_mask(self.lat, self.lng, bbox)
+    mask = self._mask(typ_code, disposal_positive)
+    if mask is not None:
+      inside &= mask
+    return [self.centers[i] for i in np.flatnonzero(inside)]
+
+  def clusters(self, zoom: int, typ_code: Optional[int] = None, disposal_positive: Optional[str] = None) -> Clusters:
+    key = (zoom, typ_code, disposal_positive)
+    clusters = self._clusters.get(key)
+    if clusters is None:
+      clusters = self._build_clusters(zoom, self._mask(typ_code, disposal_positive))
+      if self._known_filter(typ_code, disposal_positive):
+        self._clusters[key] = clusters
+    return clusters
+
+  def _known_filter(self, typ_code: Optional[int], disposal_positive: Optional[str]) -> bool:
+    return (typ_code is None or typ_code in self._known_typ_codes) and (
+      disposal_positive is None or disposal_positive in self._disposal
+    )
+
+  def _build_clusters(self, zoom: int, mask: Optional[np.ndarray]) -> Clusters:
+    idx = np.arange(len(self.centers)) if mask is None else np.flatnonzero(mask)
+    if not idx.size:
+      empty = np.zeros(0)
+      return Clusters(empty, empty, np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64))
+    x, y = mercator_px(self.lat[idx], self.lng[idx], zoom)
+    cells = np.stack([np.floor(x / CLUSTER_CELL_PX), np.floor(y / CLUSTER_CELL_PX)], axis=1).astype(np.int64)
+    _, first, group = np.unique(cells, axis=0, return_index=True, return_inverse=True)
+    group = group.reshape(-1)
+    count = np.bincount(group)
+    lat = np.bincount(group, weights=self.lat[idx]) / count
+    lng = np.bincount(group, weights=self.lng[idx]) / count
+    # Dominant typ_code: most frequent per cluster, ties to the lower code.
+    pairs, pair_count = np.unique(np.stack([group, self.typ_code[idx]], axis=1), axis=0, return_counts=True)
+    pairs = pairs[np.lexsort((-pair_count, pairs[:, 0]))]
+    leading = np.concatenate([[True], pairs[1:, 0] != pairs[:-1, 0]])
+    return Clusters(lat, lng, count, pairs[leading, 1], idx[first])
+
+  def nearest(
+    self,
+    lat: float,
+    lng: float,
+    k: int,
+    radius_km: Optional[float] = None,
+    typ_code: Optional[int] = None,
+    disposal_positive: Optional[str] = None,
+  ) -> List[Tuple[Dict[str, Any], float]]:
+    """k nearest matching centers (optionally within radius_km), closest first."""
+    if not self.centers or k <= 0 or not (math.isfinite(lat) and math.isfinite(lng)):
+      return []
+    mask = self._mask(typ_code, disposal_positive)
+    row, col = self._cell(lat, lng)
+    max_ring = self._max_ring(row, col)
+    if radius_km is not None:
+      max_ring = min(max_ring, int(math.ceil(radius_km / self._cell_km)) + 1)
+    found_idx: List[np.ndarray] = []
+    found_dist: List[np.ndarray] = []
+    count = 0
+    if max_ring > NEAREST_MAX_RINGS:
+      # Far from the city (or a huge radius): ring walking would cost O(r^2).
+      idx = np.arange(len(self.centers)) if mask is None else np.flatnonzero(mask)
+      dist = haversine_km(lat, lng, self.lat[idx], self.lng[idx])
+      if radius_km is not None:
+        keep = dist <= radius_km
+        idx, dist = idx[keep], dist[keep]
+      found_idx.append(idx)
+      found_dist.append(dist)
+      count = idx.size
+    else:
+      for r in range(self._min_ring(row, col), max_ring + 1):
+        cells = self._ring(row, col, r)
+        if cells:
+          idx = np.concatenate(cells)
+          if mask is not None:
+            idx = idx[mask[idx]]
+          if idx.size:
+            dist = haversine_km(lat, lng, self.lat[idx], self.lng[idx])
+            if radius_km is not None:
+              keep = dist <= radius_km
+              idx, dist = idx[keep], dist[keep]
+            found_idx.append(idx)
+            found_dist.append(dist)
+            count += idx.size
+        if count >= k:
+          # Anything in ring r+1 or beyond is at least r cells away.
+          kth = np.partition(np.concatenate(found_dist), k - 1)[k - 1]
+          if kth <= r * self._cell_km:
+            break
+    if not count:
+      return []
+    idx = np.concatenate(found_idx)
+    dist = np.concatenate(found_dist)
+    order = np.argsort(dist, kind="stable")[:k]
+    return [(self.centers[int(idx[i])], float(dist[i])) for i in order]
+
+
+class RecycleCenterIndex:
+  """
+  Per-city CityCenterIndex cache. core.dataset_version['recycle_center'] is
+  bumped by a trigger on every write to core.recycle_center (imports included);
+  it is checked at most every check_seconds and all cities reload lazily when
+  it changed.
+  """
+
+  def __init__(self, check_seconds: float = 10.0, cell_deg: float = 0.01, cluster_max_zoom: int = -1) -> None:
+    self.check_seconds = check_seconds
+    self.cell_deg = cell_deg
+    self.cluster_max_zoom = cluster_max_zoom
+    self._lock = threading.Lock()
+    self._cities: Dict[str, CityCenterIndex] = {}
+    self._city_ids: Dict[str, str] = {}
+    self._watch = DatasetVersionWatch("recycle_center", check_seconds)
+
+  def get(self, db: Session, city_id: str) -> CityCenterIndex:
+    if self._watch.changed(db):
+      with self._lock:
+        if self._cities:
+          logger.info("recycle_centers: dataset version %s, reloading", self._watch.version)
+        self._cities = {}
+    with self._lock:
+      index = self._cities.get(city_id)
+    if index is None:
+      index = CityCenterIndex(load_centers(db, city_id), cell_deg=self.cell_deg, cluster_max_zoom=self.cluster_max_zoom)
+      with self._lock:
+        self._cities[city_id] = index
+    return index
+
+  def city_id(self, db: Session, city_code: str) -> Optional[str]:
+    """city code -> city_id; known codes are remembered so snapshot hits skip the database."""
+    city_id = self._city_ids.get(city_code)
+    if city_id is None:
+      row = db.execute(
+        text("SELECT city_id::text FROM core.city WHERE code = :code"),
+        {"code": city_code},
+      ).fetchone()
+      if row:
+        city_id = row[0]
+        self._city_ids[city_code] = city_id
+    return city_id
+
+  @property
+  def version(self) -> Optional[int]:
+    return self._watch.version
+
+  def invalidate(self) -> None:
+    with self._lock:
+      self._cities = {}
+      self._city_ids = {}
+    self._watch.expire()
+
+
+def _bbox_mask(lats: np.ndarray, lngs: np.ndarray, bbox: Tuple[float, float, float, float]) -> np.ndarray:
+  min_lng, min_lat, max_lng, max_lat = bbox
+  return (lats >= min_lat) & (lats <= max_lat) & (lngs >= min_lng) & (lngs <= max_lng)
+
+
+def clusters_in_bbox(
+  index: CityCenterIndex,
+  clusters: Clusters,
+  bbox: Optional[Tuple[float, float, float, float]],
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+  """
+  Split clusters whose centroid lies in bbox into (clusters, centers): groups of
+  one are returned as the plain center so clients render them like markers.
+  """
+  if bbox is None:
+    selected = np.arange(len(clusters))
+  else:
+    selected = np.flatnonzero(_bbox_mask(clusters.lat, clusters.lng, bbox))
+  out_clusters: List[Dict[str, Any]] = []
+  out_centers: List[Dict[str, Any]] = []
+  for i in selected:
+    if clusters.count[i] == 1:
+      out_centers.append(index.centers[int(clusters.member[i])])
+      continue
+    typ_code = int(clusters.typ_code[i])
+    out_clusters.append(
+      {
+        "lat": float(clusters.lat[i]),
+        "lng": float(clusters.lng[i]),
+        "count": int(clusters.count[i]),
+        "typ_code": typ_code if typ_code >= 0 else None,
+      }
+    )
+  return out_clusters, out_centers
+
+
+def center_filter_for_disposal(city_code: str, disposal: Dict[str, Any]) -> Optional[Tuple[Optional[int], Optional[str]]]:
+  """
+  (typ_code, disposal_positive) selecting the centers that accept a disposal:
+  its recycle_center_typ_code when mapped (hannover), otherwise centers listing
+  the disposal's German label in disposal_positive (berlin). None when neither.
+  """
+  typ_code = disposal.get("recycle_center_typ_code")
+  if typ_code is not None:
+    return (typ_code, None)
+  seed = find_disposal_method_seed_by_code(city_code, disposal.get("code") or "")
+  if seed is not None:
+    return (None, seed.label_de)
+  return None
+
+
+def centers_for_disposals(
+  index: CityCenterIndex,
+  city_code: str,
+  disposals: List[Dict[str, Any]],
+  lat: float,
+  lng: float,
+  k: int,
+  radius_km: Optional[float] = None,
+) -> List[Dict[str, Any]]:
+  """Copies of disposals, each with "centers": the k nearest accepting centers."""
+  by_filter: Dict[Tuple[Optional[int], Optional[str]], List[Dict[str, Any]]] = {}
+  out = []
+  for disposal in disposals:
+    center_filter = center_filter_for_disposal(city_code, disposal)
+    centers: List[Dict[str, Any]] = []
+    if center_filter is not None:
+      if center_filter not in by_filter:
+        typ_code, disposal_positive = center_filter
+        nearest = index.nearest(lat, lng, k=k, radius_km=radius_km, typ_code=typ_code, disposal_positive=disposal_positive)
+        by_filter[center_filter] = [{**center, "distance_km": distance} for center, distance in nearest]
+      centers = by_filter[center_filter]
+    out.append({**disposal, "centers": centers})
+  return out
+
+
+def load_centers(db: Session, city_id: str) -> List[Dict[str, Any]]:
+  rows = db.execute(
+    text(
+      """
+      SELECT
+        rc.center_id::text,
+        rc.name,
+        rc.address,
+        rc.lat,
+        rc.lng,
+        rc.typ_code,
+        rc.typ_label,
+        rc.has_glas,
+        rc.has_kleider,
+        rc.has_papier,
+        rc.disposal_positive
+      FROM core.recycle_center rc
+      WHERE rc.city_id = :city_id
+        AND rc.is_active = true
+      ORDER BY rc.name ASC
+      """
+    ),
+    {"city_id": city_id},
+  ).fetchall()
+  return [
+    {
+      "id": row[0],
+      "name": row[1],
+      "address": row[2],
+      "lat": row[3],
+      "lng": row[4],
+      "typ_code": row[5],
+      "typ_label": row[6],
+      "has_glas": row[7],
+      "has_kleider": row[8],
+      "has_papier": row[9],
+      "disposal_positive": list(row[10] or []),
+    }
+    for row in rows
+  ]
@@ -1,5 +1,5 @@
 from __future__ import annotations
-from typing import Optional, Dict, Any, List
+from typing import Optional, Callable, Dict, Any, List
 from sqlalchemy import text
 from sqlalchemy.orm import Session
 import re
@@ -189,6 +189,58 @@ def find_item_id_by_aliases(db: Session, names: List[str], lang: str, city_id: s
   r = db.execute(sql, {"lang": lang, "norms": norms, "city_id": city_id}).fetchone()
   return r[0] if r else None
 
+def project_labels(db: Session, labels: List[str], labels_lang: str, lang: str, limit: int = 5) -> List[str]:
+  """
+  Project language-neutral vision labels (cached in labels_lang) into lang:
+  labels -> canonical keys via core.item_alias in labels_lang -> item title and
+  aliases in lang. Labels without a known item have no name in lang and are
+  dropped rather than leaked in labels_lang.
+  """
+  if not labels or lang == labels_lang:
+    return list(labels or [])
+  norms: List[str] = []
+  for label in labels:
+    norm = _normalize_basic(label)
+    if norm and norm not in norms:
+      norms.append(norm)
+  rows = []
+  if norms:
+    rows = db.execute(
+      text("""
+        WITH keys AS (
+          SELECT a.canonical_key, min(array_position(CAST(:norms AS text[]), a.alias_norm)) AS pos
+          FROM core.item_alias a
+          WHERE a.lang = :labels_lang AND a.alias_norm = ANY(:norms)
+          GROUP BY a.canonical_key
+        )
+        SELECT names.name
+        FROM keys k
+        JOIN core.item i ON i.canonical_key = k.canonical_key
+        CROSS JOIN LATERAL (
+          SELECT t.text AS name, 0 AS rank
+          FROM core.i18n_translation t
+          WHERE t.key = i.title_key AND t.lang = :lang
+          UNION ALL
+          SELECT a.alias_text AS name, CASE WHEN a.alias_type = 'primary' THEN 1 ELSE 2 END AS rank
+          FROM core.item_alias a
+          WHERE a.canonical_key = k.canonical_key AND a.lang = :lang
+        ) names
+        ORDER BY k.pos, names.rank, names.name
+      """),
+      {"norms": norms, "labels_lang": labels_lang, "lang": lang},
+    ).fetchall()
+  out: List[str] = []
+  seen = set()
+  for name in [r[0] for r in rows]:
+    key = _normalize_basic(name)
+    if not key or key in seen:
+      continue
+    seen.add(key)
+    out.append(name)
+    if len(out) >= limit:
+      break
+  return out
+
 def _find_item_by_name(db: Session, name: str, lang: str, city_id: str) -> Optional[str]:
   """
   Exact match search (case-insensitive) across:
@@ -345,7 +397,12 @@ def resolve_item(
   lang: str,
   settings: Settings,
   item_name: Optional[str] = None,
+  on_item: Optional[Callable[[Dict[str, Any]], None]] = None,
 ) -> Dict[str, Any]:
+  """
+  on_item({"item", "categories", "disposals"}) is called as soon as a found
+  item's city rules are loaded, before suggestions and prospects.
+  """
   city_id = _city_id(db, city_code)
   if not city_id:
     return {"error": f"unknown city: {city_code}"}
@@ -444,6 +501,18 @@ def resolve_item(
   """), {"city_id": city_id, "item_id": item_id}).fetchall()
   categories = [{"code": r[0], "label": _t(db, r[1], lang)} for r in rows]
 
+  image_url = _image_url(db, settings, image_id)
+  item_out = {
+    "id": item[0],
+    "canonical_key": item[1],
+    "title": title,
+    "description": desc,
+    "image_id": image_id,
+    "image_url": image_url,
+  }
+  if on_item:
+    on_item({"item": item_out, "categories": categories, "disposals": disposals})
+
   missing_rules = not categories and not disposals
 
   # Suggestions via trigram similarity on aliases (semantic-ish)
@@ -479,17 +548,9 @@ def resolve_item(
     # item exists with rules in requested city; check other cities and create prospects there if missing
     missing_other_cities = _create_missing_city_prospects(db, item_id=item[0], lang=lang, exclude_city_id=city_id, exclude_city_code=city_code)
 
-  image_url = _image_url(db, settings, image_id)
   return {
     "city": city_code,
-    "item": {
-      "id": item[0],
-      "canonical_key": item[1],
-      "title": title,
-      "description": desc,
-      "image_id": image_id,
-      "image_url": image_url,
-    },
+    "item": item_out,
     "categories": categories,
     "disposals": disposals,
     "suggestions": suggestions,
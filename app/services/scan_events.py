@@ -0,0 +1,321 @@
+from __future__ import annotations
+from typing import Any, Dict, List, Optional
+import glob
+import json
+import logging
+import os
+import threading
+import time
+from sqlalchemy import text
+from sqlalchemy.exc import InterfaceError, OperationalError, SQLAlchemyError
+
+logger = logging.getLogger("scan_events")
+
+SCAN_EVENT_COLUMNS = ("image_id", "cache_key", "city_id", "item_id", "prospect_id", "search_text", "source")
+
+
+def _multi_row_insert(count: int):
+  values = ",\n".join(
+    "(" + ", ".join(f":{col}_{i}" for col in SCAN_EVENT_COLUMNS) + f", CAST(:created_at_{i} AS timestamptz))"
+    for i in range(count)
+  )
+  return text(
+    f"""
+    INSERT INTO core.scan_event
+      ({", ".join(SCAN_EVENT_COLUMNS)}, created_at)
+    VALUES
+    {values}
+    """
+  )
+
+
+def _row_error(exc: SQLAlchemyError) -> bool:
+  """True when exc is about the rows written, not the connection or the server."""
+  return not isinstance(exc, (OperationalError, InterfaceError)) and not getattr(exc, "connection_invalidated", False)
+
+
+class ScanEventBuffer:
+  """
+  Write-behind buffer for core.scan_event.
+
+  Events are queued in memory (bounded by max_pending) and flushed by a
+  background thread as one multi-row INSERT when batch_size is reached or
+  flush_interval seconds have passed. A full buffer blocks the producer for up
+  to block_seconds; if it is still full the event is dropped and counted in
+  `dropped`, so a slow database never stalls requests or grows memory.
+
+  With spool_path set, each process appends its queued events to
+  `<spool_path>.<pid>` and flushes append a marker line with the number of rows
+  written, so the spool is only rewritten when it is drained or has grown past
+  max_pending written rows. Appends are group-committed outside the buffer
+  lock: whichever thread finds the spool idle writes and fsyncs every queued
+  line at once, and the flusher picks up what is left on each pass. An event
+  is therefore durable shortly after submit, at the latest within
+  flush_interval (or once a slow flush returns); a crash inside that window
+  loses it. On start the process replays its own spool and adopts the spools
+  of processes that are no longer running.
+  """
+
+  def __init__(
+    self,
+    engine,
+    batch_size: int = 200,
+    flush_interval: float = 1.0,
+    max_pending: int = 10000,
+    block_seconds: float = 0.5,
+    spool_path: Optional[str] = None,
+  ) -> None:
+    self._engine = engine
+    self.batch_size = max(1, batch_size)
+    self.flush_interval = flush_interval
+    self.max_pending = max(self.batch_size, max_pending)
+    self.block_seconds = block_seconds
+    self._spool_base = spool_path
+    # Set in start(): the pid of a forked worker, not of the importing parent.
+    self.spool_path: Optional[str] = None
+    self._spool_written = 0
+    # Spool lines not yet appended; taken and written under _spool_lock.
+    self._spool_queue: List[str] = []
+    self._spool_lock = threading.Lock()
+    self.dropped = 0
+    self._pending: List[Dict[str, Any]] = []
+    self._cond = threading.Condition()
+    self._flush_lock = threading.Lock()
+    self._thread: Optional[threading.Thread] = None
+    self._closed = False
+    self._stopped = threading.Event()
+
+  def start(self) -> None:
+    with self._cond:
+      if self._thread or self._closed:
+        return
+      if self._spool_base:
+        self.spool_path = f"{self._spool_base}.{os.getpid()}"
+        self._replay_spool()
+      self._thread = threading.Thread(target=self._run, name="scan-event-flusher", daemon=True)
+      self._thread.start()
+
+  def submit(self, event: Dict[str, Any]) -> None:
+    row = {col: event.get(col) for col in SCAN_EVENT_COLUMNS}
+    row["created_at"] = event.get("created_at") or time.strftime("%Y-%m-%dT%H:%M:%S+00:00", time.gmtime())
+    self.start()
+    line = json.dumps(row) + "\n" if self.spool_path else None
+    with self._cond:
+      deadline = time.monotonic() + self.block_seconds
+      while len(self._pending) >= self.max_pending and not self._closed:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+          break
+        self._cond.wait(remaining)
+      if len(self._pending) >= self.max_pending:
+        self.dropped += 1
+        dropped = self.dropped
+      else:
+        dropped = 0
+        self._pending.append(row)
+        if line is not None:
+          self._spool_queue.append(line)
+        if len(self._pending) >= self.batch_size:
+          self._cond.notify_all()
+      closed = self._closed
+    if dropped:
+      if dropped == 1 or dropped % 1000 == 0:
+        logger.warning("scan_events: buffer full, dropped %s events so far", dropped)
+      return
+    self._spool_sync(wait=False)
+    if closed:
+      # Flusher already stopped: write on the caller's thread.
+      self.flush()
+
+  def pending(self) -> int:
+    with self._cond:
+      return len(self._pending)
+
+  def flush(self) -> int:
+    written = 0
+    self._spool_sync()
+    with self._flush_lock:
+      while True:
+        with self._cond:
+          batch = self._pending[: self.batch_size]
+        if not batch:
+          return written
+        try:
+          written += self._write(batch)
+        except Exception as exc:
+          logger.warning("scan_events: flush failed rows=%s error=%s", len(batch), exc)
+          return written
+        with self._cond:
+          del self._pending[: len(batch)]
+          self._cond.notify_all()
+        self._spool_flushed(len(batch))
+
+  def close(self) -> None:
+    with self._cond:
+      self._closed = True
+      self._cond.notify_all()
+    self._stopped.set()
+    if self._thread:
+      self._thread.join(timeout=max(5.0, self.flush_interval * 2))
+    self.flush()
+    remaining = self.pending()
+    if remaining:
+      logger.warning("scan_events: %s events left unflushed on shutdown", remaining)
+
+  def _run(self) -> None:
+    while True:
+      with self._cond:
+        if not self._closed and len(self._pending) < self.batch_size:
+          self._cond.wait(self.flush_interval)
+        closed = self._closed
+      backlog = self.pending()
+      written = self.flush()
+      if closed:
+        return
+      if backlog and not written:
+        # Database unavailable: back off instead of spinning on a full batch.
+        self._stopped.wait(self.flush_interval)
+
+  def _write(self, batch: List[Dict[str, Any]]) -> int:
+    """
+    Insert batch; returns the rows written. Rows the database rejects are
+    dropped; connection errors raise and leave the whole batch pending.
+    """
+    params: Dict[str, Any] = {}
+    for i, row in enumerate(batch):
+      for col, value in row.items():
+        params[f"{col}_{i}"] = value
+    try:
+      with self._engine.begin() as conn:
+        conn.execute(_multi_row_insert(len(batch)), params)
+      return len(batch)
+    except SQLAlchemyError as exc:
+      if not _row_error(exc):
+        raise
+    # One bad row (e.g. image deleted meanwhile, malformed uuid) must not block
+    # the whole batch. Savepoints in one transaction: either every good row is
+    # committed or none is, so a retry never duplicates rows.
+    written = 0
+    with self._engine.begin() as conn:
+      for row in batch:
+        try:
+          with conn.begin_nested():
+            conn.execute(_multi_row_insert(1), {f"{col}_0": value for col, value in row.items()})
+          written += 1
+        except SQLAlchemyError as exc:
+          if not _row_error(exc):
+            raise
+          logger.warning("scan_events: dropping row image_id=%s error=%s", row.get("image_id"), exc)
+    return written
+
+  def _spool_write(self, path: str, lines: List[str], mode: str = "a") -> None:
+    with open(path, mode, encoding="utf-8") as fh:
+      fh.writelines(lines)
+      fh.flush()
+      os.fsync(fh.fileno())
+
+  def _spool_sync(self, wait: bool = True) -> None:
+    """
+    Append queued spool lines with one fsync. Without wait, return at once if
+    another thread holds the spool; the flusher writes what that thread missed.
+    """
+    if not self.spool_path or not self._spool_lock.acquire(blocking=wait):
+      return
+    try:
+      while True:
+        with self._cond:
+          lines, self._spool_queue = self._spool_queue, []
+        if not lines:
+          return
+        try:
+          self._spool_write(self.spool_path, lines)
+        except OSError as exc:
+          logger.warning("scan_events: spool append failed rows=%s error=%s", len(lines), exc)
+    finally:
+      self._spool_lock.release()
+
+  def _spool_flushed(self, count: int) -> None:
+    """Record that the oldest `count` spooled rows are in the database."""
+    if not self.spool_path:
+      return
+    with self._spool_lock:
+      self._spool_written += count
+      with self._cond:
+        if self._pending and self._spool_written < self.max_pending:
+          rewrite = None
+        else:
+          # The rewrite covers every pending row: drop their queued appends.
+          rewrite = list(self._pending)
+          self._spool_queue = []
+          self._spool_written = 0
+      try:
+        if rewrite is None:
+          self._spool_write(self.spool_path, [json.dumps({"_written": count}) + "\n"])
+        elif not rewrite:
+          self._spool_write(self.spool_path, [], "w")
+        else:
+          # Compact: keep only the rows still pending.
+          tmp_path = f"{self.spool_path}.tmp"
+          self._spool_write(tmp_path, [json.dumps(row) + "\n" for row in rewrite], "w")
+          os.replace(tmp_path, self.spool_path)
+      except OSError as exc:
+        logger.warning("scan_events: spool update failed: %s", exc)
+
+  @staticmethod
+  def _read_spool(path: str) -> List[Dict[str, Any]]:
+    rows: List[Dict[str, Any]] = []
+    written = 0
+    with open(path, "r", encoding="utf-8") as fh:
+      for line in fh:
+        line = line.strip()
+        if not line:
+          continue
+        try:
+          row = json.loads(line)
+        except ValueError:
+          logger.warning("scan_events: skipping corrupt spool line")
+          continue
+        if "_written" in row:
+          written += int(row["_written"])
+        else:
+          rows.append(row)
+    return rows[written:]
+
+  @staticmethod
+  def _pid_alive(pid: int) -> bool:
+    try:
+      os.kill(pid, 0)
+    except ProcessLookupError:
+      return False
+    except PermissionError:
+      return True
+    return True
+
+  def _replay_spool(self) -> None:
+    own = self.spool_path
+    paths = [own] if os.path.exists(own) else []
+    for path in sorted(glob.glob(f"{glob.escape(self._spool_base)}.*")):
+      suffix = path.rsplit(".", 1)[1]
+      if path != own and suffix.isdigit() and not self._pid_alive(int(suffix)):
+        paths.append(path)
+    replayed = 0
+    for path in paths:
+      try:
+        rows = self._read_spool(path)
+      except OSError as exc:
+        logger.warning("scan_events: spool read failed path=%s error=%s", path, exc)
+        continue
+      self._pending.extend(rows)
+      replayed += len(rows)
+    if not paths:
+      return
+    try:
+      # Own spool now holds exactly the pending rows; adopted spools are merged into it.
+      self._spool_write(own, [json.dumps(row) + "\n" for row in self._pending], "w")
+      for path in paths:
+        if path != own:
+          os.remove(path)
+    except OSError as exc:
+      logger.warning("scan_events: spool replay failed: %s", exc)
+    if replayed:
+      logger.info("scan_events: replayed %s events from %s spool files", replayed, len(paths))
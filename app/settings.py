@@ -17,13 +17,41 @@ class Settings(BaseSettings):
 
     GUEST_JWT_SECRET: str = "change_me_local_only"
     GUEST_TOKEN_TTL_SECONDS: int = 900
+    AUTH_TOKEN_CACHE_SIZE: int = 10_000
+    AUTH_TOKEN_NEGATIVE_TTL_SECONDS: float = 30.0
 
     RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_BACKEND: str = "memory"
+    RATE_LIMIT_MAX_KEYS: int = 100_000
 
     AWS_REGION: str | None = None
     S3_BUCKET_NAME: str | None = None
     S3_PRESIGN_TTL_SECONDS: int = 120
     MAX_IMAGE_BYTES: int = 5 * 1024 * 1024
+    S3_UPLOAD_RETRY_ATTEMPTS: int = 3
+    S3_UPLOAD_RETRY_BACKOFF_SECONDS: float = 2.0
+    UPLOAD_SPOOL_MAX_BYTES: int = 1024 * 1024
+
+    SCAN_EVENT_BUFFER_ENABLED: bool = True
+    SCAN_EVENT_BATCH_SIZE: int = 200
+    SCAN_EVENT_FLUSH_INTERVAL_SECONDS: float = 1.0
+    SCAN_EVENT_MAX_PENDING: int = 10000
+    SCAN_EVENT_BLOCK_SECONDS: float = 0.5
+    SCAN_EVENT_SPOOL_PATH: str | None = None
+
+    RECYCLE_CENTER_INDEX_CHECK_SECONDS: float = 10.0
+    RECYCLE_CENTER_CLUSTER_MAX_ZOOM: int = 13
+    ADDRESS_DATA_DIR: str = "data"
+    CATALOG_CHECK_SECONDS: float = 10.0
+    CATALOG_CHANGES_MAX_ITEMS: int = 1000
+
+    ANALYZE_JOB_WORKERS: int = 2
+    ANALYZE_JOB_POLL_SECONDS: float = 1.0
+    ANALYZE_JOB_LEASE_SECONDS: float = 120.0
+    ANALYZE_JOB_MAX_ATTEMPTS: int = 3
+    ANALYZE_JOB_RETRY_BACKOFF_SECONDS: float = 5.0
+    ANALYZE_JOB_RETENTION_HOURS: float = 24.0
+    ANALYZE_JOB_MAX_WAIT_SECONDS: float = 25.0
     model_config = SettingsConfigDict(
         env_file=".env",
         case_sensitive=False,
@@ -95,6 +95,30 @@ def get_object_bytes(settings: Settings, bucket: str, key: str) -> bytes:
     raise HTTPException(status_code=404, detail="s3_object_not_found") from exc
 
 
+def get_object_with_etag(settings: Settings, bucket: str, key: str) -> tuple[bytes, str | None]:
+  client = get_s3_client(settings)
+  try:
+    resp = client.get_object(Bucket=bucket, Key=key)
+    return resp["Body"].read(), _clean_etag(resp.get("ETag"))
+  except (BotoCoreError, ClientError) as exc:
+    raise HTTPException(status_code=404, detail="s3_object_not_found") from exc
+
+
+def head_object_etag(settings: Settings, bucket: str, key: str) -> str | None:
+  client = get_s3_client(settings)
+  try:
+    resp = client.head_object(Bucket=bucket, Key=key)
+  except (BotoCoreError, ClientError):
+    return None
+  return _clean_etag(resp.get("ETag"))
+
+
+def _clean_etag(etag: str | None) -> str | None:
+  if not etag:
+    return None
+  return etag.strip().strip('"') or None
+
+
 def create_presigned_put(
   settings: Settings,
   bucket: str,
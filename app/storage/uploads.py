@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+from typing import AsyncGenerator, Optional
+
+from fastapi import HTTPException, Request
+from starlette.datastructures import FormData, UploadFile
+from starlette.formparsers import MultiPartException, MultiPartParser
+
+# Room for the non-file form fields (city, lang, search_text) and multipart framing.
+FORM_OVERHEAD_BYTES = 64 * 1024
+CHUNK_BYTES = 64 * 1024
+
+
+class UploadTooLarge(MultiPartException):
+  pass
+
+
+class _HashingMultiPartParser(MultiPartParser):
+  """
+  Multipart parser that hashes and size-checks the file part while it streams in.
+  Subclassing MultiPartException keeps the base parser's cleanup of spooled files.
+  """
+
+  def __init__(self, headers, stream, max_file_bytes: int, spool_max_bytes: int) -> None:
+    super().__init__(headers, stream, max_files=1, max_fields=16)
+    self.max_file_size = spool_max_bytes
+    self.max_file_bytes = max_file_bytes
+    self.file_size = 0
+    self.file_sha256 = hashlib.sha256()
+
+  def on_part_data(self, data: bytes, start: int, end: int) -> None:
+    if self._current_part.file is not None:
+      self.file_size += end - start
+      if self.file_size > self.max_file_bytes:
+        raise UploadTooLarge("image_too_large")
+      self.file_sha256.update(data[start:end])
+    super().on_part_data(data, start, end)
+
+
+async def _limited_stream(request: Request, max_body_bytes: int) -> AsyncGenerator[bytes, None]:
+  received = 0
+  async for chunk in request.stream():
+    received += len(chunk)
+    if received > max_body_bytes:
+      raise UploadTooLarge("image_too_large")
+    yield chunk
+
+
+class SharedFileReader:
+  """
+  Independent read position over a shared spooled file, so the S3 upload and
+  image decoding can consume the same body concurrently.
+  """
+
+  def __init__(self, fileobj, lock: threading.Lock, size: int) -> None:
+    self._file = fileobj
+    self._lock = lock
+    self._size = size
+    self._pos = 0
+
+  def read(self, n: int = -1) -> bytes:
+    with self._lock:
+      self._file.seek(self._pos)
+      data = self._file.read(n if n is not None and n >= 0 else self._size - self._pos)
+    self._pos += len(data)
+    return data
+
+  def seek(self, offset: int, whence: int = 0) -> int:
+    if whence == 1:
+      offset += self._pos
+    elif whence == 2:
+      offset += self._size
+    self._pos = max(0, offset)
+    return self._pos
+
+  def tell(self) -> int:
+    return self._pos
+
+  def readable(self) -> bool:
+    return True
+
+  def seekable(self) -> bool:
+    return True
+
+
+@dataclass
+class StagedUpload:
+  form: FormData
+  file: Optional[UploadFile]
+  size: int
+  sha256: str
+
+  def __post_init__(self) -> None:
+    self._lock = threading.Lock()
+
+  def reader(self) -> SharedFileReader:
+    return SharedFileReader(self.file.file, self._lock, self.size)
+
+  def spill_to_disk(self) -> str:
+    """Copy the body to a named temp file that outlives the request (caller removes it)."""
+    fd, path = tempfile.mkstemp(prefix="er_upload_")
+    with os.fdopen(fd, "wb") as out:
+      shutil.copyfileobj(self.reader(), out, CHUNK_BYTES)
+    return path
+
+  async def close(self) -> None:
+    await self.form.close()
+
+
+async def stage_multipart(request: Request, max_file_bytes: int, spool_max_bytes: int) -> StagedUpload:
+  """
+  Stream a multipart body into a spooled temp file (memory up to spool_max_bytes,
+  disk beyond), hashing the file part on the fly and rejecting oversized bodies
+  with 413 as soon as the limit is crossed.
+  """
+  max_body_bytes = max_file_bytes + FORM_OVERHEAD_BYTES
+  content_length = request.headers.get("content-length")
+  if content_length and content_length.isdigit() and int(content_length) > max_body_bytes:
+    raise HTTPException(status_code=413, detail="image_too_large")
+  parser = _HashingMultiPartParser(
+    request.headers,
+    _limited_stream(request, max_body_bytes),
+    max_file_bytes=max_file_bytes,
+    spool_max_bytes=spool_max_bytes,
+  )
+  try:
+    form = await parser.parse()
+  except UploadTooLarge:
+    raise HTTPException(status_code=413, detail="image_too_large")
+  except MultiPartException:
+    raise HTTPException(status_code=400, detail="invalid_multipart")
+  upload = form.get("file")
+  return StagedUpload(
+    form=form,
+    file=upload if isinstance(upload, UploadFile) else None,
+    size=parser.file_size,
+    sha256=parser.file_sha256.hexdigest(),
+  )
@@ -0,0 +1,48 @@
+"""
+Offline address index latency: autocomplete and exact lookup against a city's
+data/{city}_addresses.json (app/services/addresses.py).
+
+Usage:
+  python scripts/bench_addresses.py
+  python scripts/bench_addresses.py --city hannover --query blumenhof --repeat 5000
+"""
+from __future__ import annotations
+
+import argparse
+import time
+
+from app.services.addresses import AddressIndexes
+
+
+def _per_call_us(fn, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - started) * 1e6 / repeat
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--data-dir", default="data")
+    parser.add_argument("--city", default="hannover")
+    parser.add_argument("--query", default="blumenhof")
+    parser.add_argument("--lookup", default="Blumenhof 3, 30890")
+    parser.add_argument("--repeat", type=int, default=1000)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    index = AddressIndexes(args.data_dir).get(args.city)
+    if index is None:
+        raise SystemExit(f"no address data for {args.city} in {args.data_dir}")
+    print(f"load {len(index)} addresses    {(time.perf_counter() - started) * 1e3:8.1f} ms")
+
+    rows = [
+        (f"complete {args.query!r}", lambda: index.complete(args.query, limit=10)),
+        (f"lookup {args.lookup!r}", lambda: index.lookup(args.lookup)),
+    ]
+    for name, fn in rows:
+        print(f"{name:28} {_per_call_us(fn, args.repeat):8.2f} us/request")
+
+
+if __name__ == "__main__":
+    main()
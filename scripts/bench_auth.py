@@ -0,0 +1,53 @@
+"""
+Auth cost per request: full HS256 verification (python-jose) versus the
+verified-token cache (app/auth/token_cache.py), for valid and garbage tokens.
+
+Usage:
+  python scripts/bench_auth.py
+  python scripts/bench_auth.py --repeat 50000
+"""
+from __future__ import annotations
+
+import argparse
+import time
+
+from app.auth.guest import issue_guest_token, verify_guest_token
+from app.auth.token_cache import VerifiedTokenCache
+from app.settings import Settings
+
+
+def _per_call_us(fn, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        try:
+            fn()
+        except Exception:
+            pass
+    return (time.perf_counter() - started) * 1e6 / repeat
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=20_000)
+    args = parser.parse_args()
+
+    settings = Settings()
+    token = issue_guest_token("bench-device-0001", settings)["token"]
+    garbage = token[:-4] + "AAAA"
+    cache = VerifiedTokenCache()
+
+    def verify(t: str) -> dict:
+        return verify_guest_token(t, settings)
+
+    rows = [
+        ("valid, jwt.decode", lambda: verify(token)),
+        ("valid, cached", lambda: cache.verify(token, verify)),
+        ("bad signature, jwt.decode", lambda: verify(garbage)),
+        ("bad signature, cached", lambda: cache.verify(garbage, verify)),
+    ]
+    for name, fn in rows:
+        print(f"{name:28} {_per_call_us(fn, args.repeat):8.2f} us/request")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""
+Latency benchmark for /items/search: the previous ILIKE + GROUP BY query versus
+the ranked keyset search (app/services/item_search.py).
+
+For each size a synthetic city with that many items is seeded inside a
+transaction, queried, and rolled back; nothing is left in the database.
+
+Usage:
+  python scripts/bench_item_search.py
+  python scripts/bench_item_search.py --sizes 10000,100000 --repeat 30
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import time
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Connection
+
+from app.services.item_search import search_items
+
+WORDS = [
+    "batterie", "flasche", "karton", "zeitung", "glas", "dose", "folie", "kabel",
+    "lampe", "pizzakarton", "kaffeekapsel", "joghurtbecher", "spraydose", "toaster",
+    "handy", "matratze", "farbeimer", "styropor", "tetrapak", "zahnbuerste",
+]
+QUERIES = ["batt", "flasche", "pizzakarton 12", "zeitng", "kaffee"]
+
+LEGACY_SQL = """
+SELECT
+  i.item_id::text,
+  i.canonical_key,
+  t1.text,
+  i.primary_image_id::text,
+  COALESCE(
+    jsonb_agg(
+      DISTINCT jsonb_build_object(
+        'code', d.code,
+        'label', dt.text,
+        'recycle_center_typ_code', d.recycle_center_typ_code
+      )
+    ) FILTER (WHERE d.disposal_id IS NOT NULL),
+    '[]'::jsonb
+  ) AS disposals
+FROM core.item i
+JOIN core.city c ON c.code = :city AND c.is_active = true
+JOIN core.item_city_category icc ON icc.item_id = i.item_id AND icc.city_id = c.city_id
+LEFT JOIN core.item_city_disposal icd ON icd.item_id = i.item_id AND icd.city_id = c.city_id
+LEFT JOIN core.disposal_method d ON d.disposal_id = icd.disposal_id
+LEFT JOIN core.i18n_translation dt ON dt.key = d.name_key AND dt.lang = :lang
+LEFT JOIN core.i18n_translation t1 ON t1.key = i.title_key AND t1.lang = :lang
+WHERE (
+  :q = ''
+  OR t1.text ILIKE :q
+  OR i.canonical_key ILIKE :q
+)
+GROUP BY i.item_id, i.canonical_key, t1.text, i.primary_image_id
+ORDER BY t1.text NULLS LAST, i.canonical_key ASC
+LIMIT :limit
+"""
+
+
+def _get_database_url(value: str | None) -> str:
+    url = value or os.getenv("DATABASE_URL")
+    if not url:
+        raise SystemExit("DATABASE_URL is required (or pass --database-url)")
+    return url
+
+
+def seed(conn: Connection, city: str, size: int) -> None:
+    city_id = conn.execute(
+        text("INSERT INTO core.city (code, name_key) VALUES (:city, :city) RETURNING city_id"),
+        {"city": city},
+    ).scalar()
+    category_id = conn.execute(
+        text("INSERT INTO core.category (code, name_key) VALUES (:city, :city) RETURNING category_id"),
+        {"city": city},
+    ).scalar()
+    conn.execute(
+        text(
+            """
+            INSERT INTO core.item (canonical_key, title_key)
+            SELECT (CAST(:words AS text[]))[1 + g % cardinality(CAST(:words AS text[]))] || '_' || g || '_' || :city,
+                   :city || '.title.' || g
+            FROM generate_series(1, :size) g
+            """
+        ),
+        {"city": city, "words": WORDS, "size": size},
+    )
+    conn.execute(
+        text(
+            """
+            INSERT INTO core.i18n_translation (key, lang, text)
+            SELECT i.title_key, 'de', initcap(split_part(i.canonical_key, '_', 1)) || ' ' || split_part(i.canonical_key, '_', 2)
+            FROM core.item i
+            WHERE i.title_key LIKE :city || '.title.%'
+            """
+        ),
+        {"city": city},
+    )
+    conn.execute(
+        text(
+            """
+            INSERT INTO core.item_city_category (city_id, item_id, category_id)
+            SELECT :city_id, i.item_id, :category_id
+            FROM core.item i
+            WHERE i.title_key LIKE :city || '.title.%'
+            """
+        ),
+        {"city": city, "city_id": city_id, "category_id": category_id},
+    )
+    conn.execute(text("ANALYZE core.item"))
+    conn.execute(text("ANALYZE core.i18n_translation"))
+    conn.execute(text("ANALYZE core.item_city_category"))
+
+
+def _timed(fn, repeat: int) -> tuple[float, float]:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000.0)
+    samples.sort()
+    p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+    return statistics.median(samples), p95
+
+
+def bench(conn: Connection, city: str, repeat: int, limit: int) -> None:
+    for q in QUERIES:
+        legacy = _timed(
+            lambda: conn.execute(
+                text(LEGACY_SQL), {"city": city, "lang": "de", "q": f"%{q}%", "limit": limit}
+            ).fetchall(),
+            repeat,
+        )
+        ranked = _timed(lambda: search_items(conn, city, "de", q, limit), repeat)
+        _, cursor = search_items(conn, city, "de", q, limit)
+        page2 = _timed(lambda: search_items(conn, city, "de", q, limit, cursor), repeat) if cursor else None
+        line = f"  q={q!r:18} legacy p50={legacy[0]:7.1f}ms p95={legacy[1]:7.1f}ms  ranked p50={ranked[0]:7.1f}ms p95={ranked[1]:7.1f}ms"
+        if page2:
+            line += f"  page2 p50={page2[0]:7.1f}ms"
+        print(line)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--database-url", help="Database URL (defaults to DATABASE_URL env)")
+    parser.add_argument("--sizes", default="10000,100000", help="Comma-separated item counts per city")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args()
+
+    engine = create_engine(_get_database_url(args.database_url))
+    for size in [int(s) for s in args.sizes.split(",") if s.strip()]:
+        city = f"bench_{size}"
+        with engine.connect() as conn:
+            tx = conn.begin()
+            try:
+                started = time.perf_counter()
+                seed(conn, city, size)
+                print(f"{size} items (seeded in {time.perf_counter() - started:.1f}s)")
+                bench(conn, city, args.repeat, args.limit)
+            finally:
+                tx.rollback()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Per-hit overhead of the rate limiters under thread contention: the previous
+single-lock fixed-window limiter versus the sharded GCRA limiter
+(app/middleware/rate_limit.py), and optionally the Postgres backend.
+
+Usage:
+  python scripts/bench_rate_limit.py
+  python scripts/bench_rate_limit.py --threads 1,8,32 --keys 100000
+  python scripts/bench_rate_limit.py --database-url "$DATABASE_URL" --hits 2000
+"""
+from __future__ import annotations
+
+import argparse
+import threading
+import time
+
+from sqlalchemy import create_engine
+
+from app.middleware.rate_limit import GcraRateLimiter, PostgresRateLimiter
+
+
+class LegacyFixedWindowRateLimiter:
+    """The limiter this replaced: one global lock, keys never evicted."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._buckets: dict[str, tuple[int, int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def hit(self, key: str, limit: int, window_seconds: int = 60) -> bool:
+        now = int(time.time())
+        window_start = now - (now % window_seconds)
+        with self._lock:
+            start, count = self._buckets.get(key, (window_start, 0))
+            if start != window_start:
+                start, count = window_start, 0
+            if count >= limit:
+                return False
+            self._buckets[key] = (start, count + 1)
+            return True
+
+
+def run(limiter, threads: int, hits: int, keys: int) -> float:
+    """Wall-clock microseconds per hit with `threads` threads hitting `keys` distinct keys."""
+    barrier = threading.Barrier(threads + 1)
+
+    def worker(offset: int) -> None:
+        names = [f"ip-{(offset * 7919 + i) % keys}" for i in range(hits)]
+        barrier.wait()
+        for name in names:
+            limiter.hit(name, limit=120, window_seconds=60)
+
+    workers = [threading.Thread(target=worker, args=(t,)) for t in range(threads)]
+    for w in workers:
+        w.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for w in workers:
+        w.join()
+    return (time.perf_counter() - started) * 1e6 / (threads * hits)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--threads", default="1,4,16", help="Comma-separated thread counts")
+    parser.add_argument("--hits", type=int, default=50_000, help="Hits per thread")
+    parser.add_argument("--keys", type=int, default=200_000, help="Distinct keys (IPs/devices)")
+    parser.add_argument("--max-keys", type=int, default=100_000, help="GCRA memory bound")
+    parser.add_argument("--database-url", help="Also benchmark the Postgres backend")
+    args = parser.parse_args()
+
+    limiters = {
+        "fixed_window": LegacyFixedWindowRateLimiter,
+        "gcra_sharded": lambda: GcraRateLimiter(max_keys=args.max_keys),
+    }
+    if args.database_url:
+        engine = create_engine(args.database_url, pool_size=32)
+        limiters["gcra_postgres"] = lambda: PostgresRateLimiter(engine)
+
+    for threads in [int(t) for t in args.threads.split(",") if t.strip()]:
+        for name, factory in limiters.items():
+            limiter = factory()
+            hits = args.hits if name != "gcra_postgres" else min(args.hits, 2000)
+            us = run(limiter, threads, hits, args.keys)
+            size = len(limiter) if hasattr(limiter, "__len__") else "-"
+            print(f"threads={threads:3} {name:14} {us:8.2f} us/hit  keys held={size}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Delete old core.catalog_change rows and raise the catalog's compacted_through
+floor; clients asking /catalog/{city}/changes from before the floor get
+410 resync_required and download the full catalog.
+
+Whole versions are removed together (a version is one transaction), so the
+floor always sits on a version boundary. Run daily from cron; it is idempotent.
+
+Usage:
+  python scripts/compact_catalog_changes.py
+  python scripts/compact_catalog_changes.py --keep-days 30
+"""
+from __future__ import annotations
+
+import argparse
+import os
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Connection
+
+
+def _get_database_url(value: str | None) -> str:
+    url = value or os.getenv("DATABASE_URL")
+    if not url:
+        raise SystemExit("DATABASE_URL is required (or pass --database-url)")
+    return url
+
+
+def compact(conn: Connection, keep_days: int) -> tuple[int, int]:
+    """Returns (new floor, deleted rows)."""
+    cutoff = conn.execute(
+        text(
+            """
+            SELECT max(version)
+            FROM core.catalog_change
+            WHERE created_at < now() - make_interval(days => :keep_days)
+            """
+        ),
+        {"keep_days": keep_days},
+    ).scalar()
+    if cutoff is None:
+        floor = conn.execute(
+            text("SELECT compacted_through FROM core.dataset_version WHERE dataset = 'catalog'")
+        ).scalar()
+        return int(floor or 0), 0
+    deleted = conn.execute(
+        text("DELETE FROM core.catalog_change WHERE version <= :cutoff"),
+        {"cutoff": cutoff},
+    ).rowcount
+    floor = conn.execute(
+        text(
+            """
+            UPDATE core.dataset_version
+            SET compacted_through = GREATEST(compacted_through, :cutoff)
+            WHERE dataset = 'catalog'
+            RETURNING compacted_through
+            """
+        ),
+        {"cutoff": cutoff},
+    ).scalar()
+    return int(floor or cutoff), deleted or 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--database-url", help="Database URL (defaults to DATABASE_URL env)")
+    parser.add_argument("--keep-days", type=int, default=30, help="Keep journal rows younger than this")
+    args = parser.parse_args()
+
+    engine = create_engine(_get_database_url(args.database_url))
+    with engine.begin() as conn:
+        floor, deleted = compact(conn, args.keep_days)
+    print(f"deleted {deleted} catalog_change rows; compacted_through={floor}")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,6 +5,9 @@ Usage:
   python scripts/import_recycle_centers.py --city hannover --csv data/aha_locations.csv
   python scripts/import_recycle_centers.py --city hannover --csv data/aha_locations.csv --replace
   python scripts/import_recycle_centers.py --city berlin --csv data/berlin_recyclehof.csv --replace
+
+Writes bump core.dataset_version['recycle_center'] (trigger), so running API
+processes reload their recycle center index within RECYCLE_CENTER_INDEX_CHECK_SECONDS.
 """
 from __future__ import annotations
 
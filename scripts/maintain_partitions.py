@@ -0,0 +1,199 @@
+"""
+Create upcoming monthly partitions and drop expired ones for core.scan_event
+(by created_at) and core.vision_cache (by expires_at).
+
+Run daily from cron; it is idempotent.
+
+Usage:
+  python scripts/maintain_partitions.py
+  python scripts/maintain_partitions.py --months-ahead 3 --scan-event-retention-months 24
+  python scripts/maintain_partitions.py --dry-run
+"""
+from __future__ import annotations
+
+import argparse
+import math
+import os
+import re
+from datetime import date, datetime, timezone
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Connection
+
+PARTITION_KEYS = {
+    "scan_event": "created_at",
+    "vision_cache": "expires_at",
+}
+
+
+def _get_database_url(value: str | None) -> str:
+    url = value or os.getenv("DATABASE_URL")
+    if not url:
+        raise SystemExit("DATABASE_URL is required (or pass --database-url)")
+    return url
+
+
+def month_start(value: date) -> date:
+    return date(value.year, value.month, 1)
+
+
+def add_months(value: date, months: int) -> date:
+    index = value.year * 12 + (value.month - 1) + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table: str, month: date) -> str:
+    return f"{table}_p{month:%Y%m}"
+
+
+def partition_month(table: str, name: str) -> date | None:
+    match = re.fullmatch(rf"{re.escape(table)}_p(\d{{4}})(\d{{2}})", name)
+    if not match:
+        return None
+    return date(int(match.group(1)), int(match.group(2)), 1)
+
+
+def partitions_to_create(table: str, existing: list[str], today: date, months_ahead: int) -> list[date]:
+    have = {partition_month(table, name) for name in existing}
+    first = month_start(today)
+    return [m for m in (add_months(first, i) for i in range(months_ahead + 1)) if m not in have]
+
+
+def partitions_to_drop(table: str, existing: list[str], cutoff: date) -> list[str]:
+    """Partitions whose whole range ends on or before cutoff."""
+    drop = []
+    for name in existing:
+        month = partition_month(table, name)
+        if month is not None and add_months(month, 1) <= cutoff:
+            drop.append(name)
+    return sorted(drop)
+
+
+def list_partitions(conn: Connection, table: str) -> list[str]:
+    rows = conn.execute(
+        text(
+            """
+            SELECT c.relname
+            FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            JOIN pg_class p ON p.oid = i.inhparent
+            JOIN pg_namespace n ON n.oid = p.relnamespace
+            WHERE n.nspname = 'core' AND p.relname = :table
+            """
+        ),
+        {"table": table},
+    ).fetchall()
+    return [r[0] for r in rows]
+
+
+def create_partition(conn: Connection, table: str, month: date) -> int:
+    """
+    Create the partition for one month, first moving any rows of that range out
+    of the default partition (ATTACH refuses while the default still holds them).
+    Returns the number of rows moved.
+    """
+    name = partition_name(table, month)
+    column = PARTITION_KEYS[table]
+    bounds = {"start": month, "end": add_months(month, 1)}
+    conn.execute(
+        text(
+            f"CREATE TABLE core.{name} "
+            f"(LIKE core.{table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"
+        )
+    )
+    moved = conn.execute(
+        text(
+            f"""
+            WITH moved AS (
+              DELETE FROM core.{table}_default
+              WHERE {column} >= :start AND {column} < :end
+              RETURNING *
+            )
+            INSERT INTO core.{name} SELECT * FROM moved
+            """
+        ),
+        bounds,
+    ).rowcount
+    conn.execute(
+        text(
+            f"ALTER TABLE core.{table} ATTACH PARTITION core.{name} "
+            f"FOR VALUES FROM ('{bounds['start']}') TO ('{bounds['end']}')"
+        )
+    )
+    return moved or 0
+
+
+def drop_partition(conn: Connection, table: str, name: str) -> None:
+    conn.execute(text(f"ALTER TABLE core.{table} DETACH PARTITION core.{name}"))
+    conn.execute(text(f"DROP TABLE core.{name}"))
+
+
+def _vision_cache_months_ahead(months_ahead: int) -> int:
+    ttl_days = int(os.getenv("VISION_CACHE_TTL_DAYS", "30"))
+    return max(months_ahead, math.ceil(ttl_days / 28) + 1)
+
+
+def maintain(
+    conn: Connection,
+    today: date,
+    months_ahead: int,
+    scan_event_retention_months: int | None,
+    dry_run: bool,
+) -> None:
+    plans = {
+        # Rows only land in partitions that end after today, so any partition
+        # ending on or before the current month holds nothing but expired entries.
+        "vision_cache": (_vision_cache_months_ahead(months_ahead), month_start(today)),
+        "scan_event": (
+            months_ahead,
+            add_months(month_start(today), -scan_event_retention_months)
+            if scan_event_retention_months
+            else None,
+        ),
+    }
+    for table, (ahead, cutoff) in plans.items():
+        existing = list_partitions(conn, table)
+        for month in partitions_to_create(table, existing, today, ahead):
+            if dry_run:
+                print(f"would create core.{partition_name(table, month)}")
+                continue
+            moved = create_partition(conn, table, month)
+            print(f"created core.{partition_name(table, month)} (moved {moved} rows from default)")
+        if cutoff is None:
+            continue
+        for name in partitions_to_drop(table, existing, cutoff):
+            if dry_run:
+                print(f"would drop core.{name}")
+                continue
+            drop_partition(conn, table, name)
+            print(f"dropped core.{name}")
+
+    if not dry_run:
+        expired = conn.execute(
+            text("DELETE FROM core.vision_cache_default WHERE expires_at <= now()")
+        ).rowcount
+        if expired:
+            print(f"deleted {expired} expired rows from core.vision_cache_default")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--database-url", help="Database URL (defaults to DATABASE_URL env)")
+    parser.add_argument("--months-ahead", type=int, default=3, help="Future monthly partitions to keep ready")
+    parser.add_argument(
+        "--scan-event-retention-months",
+        type=int,
+        default=None,
+        help="Drop scan_event partitions older than this many months (default: keep all)",
+    )
+    parser.add_argument("--dry-run", action="store_true", help="Print planned changes only")
+    args = parser.parse_args()
+
+    engine = create_engine(_get_database_url(args.database_url))
+    today = datetime.now(timezone.utc).date()
+    with engine.begin() as conn:
+        maintain(conn, today, args.months_ahead, args.scan_event_retention_months, args.dry_run)
+
+
+if __name__ == "__main__":
+    main()
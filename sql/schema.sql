@@ -31,6 +31,8 @@ CREATE INDEX IF NOT EXISTS ix_i18n_translation_fts
   ON core.i18n_translation USING gin (to_tsvector('simple', text));
 CREATE INDEX IF NOT EXISTS ix_i18n_translation_trgm
   ON core.i18n_translation USING gin (text gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS ix_i18n_translation_lang_text
+  ON core.i18n_translation(lang, text);
 
 CREATE TABLE IF NOT EXISTS core.auth_identity (
   identity_id      uuid PRIMARY KEY DEFAULT gen_random_uuid(),
@@ -102,7 +104,26 @@ CREATE TABLE IF NOT EXISTS core.image_asset (
   created_at        timestamptz NOT NULL DEFAULT now(),
   UNIQUE (normalized_sha256)
 );
-CREATE INDEX IF NOT EXISTS ix_image_asset_created ON core.image_asset(created_at);
+CREATE INDEX IF NOT EXISTS ix_image_asset_created_id
+  ON core.image_asset(created_at DESC, image_id DESC);
+
+CREATE TABLE IF NOT EXISTS core.image_raw_hash (
+  raw_sha256        text PRIMARY KEY,
+  normalized_sha256 text NOT NULL,
+  created_at        timestamptz NOT NULL DEFAULT now()
+);
+CREATE INDEX IF NOT EXISTS ix_image_raw_hash_normalized
+  ON core.image_raw_hash(normalized_sha256);
+
+CREATE TABLE IF NOT EXISTS core.image_storage_index (
+  storage_key text PRIMARY KEY,
+  etag        text NULL,
+  image_id    uuid NOT NULL REFERENCES core.image_asset(image_id) ON DELETE CASCADE,
+  cache_key   text NULL,
+  created_at  timestamptz NOT NULL DEFAULT now()
+);
+CREATE INDEX IF NOT EXISTS ix_image_storage_index_image
+  ON core.image_storage_index(image_id);
 
 CREATE TABLE IF NOT EXISTS core.recycle_center (
   center_id   uuid PRIMARY KEY DEFAULT gen_random_uuid(),
@@ -128,6 +149,31 @@ CREATE INDEX IF NOT EXISTS ix_recycle_center_city
 CREATE INDEX IF NOT EXISTS ix_recycle_center_city_type
   ON core.recycle_center(city_id, typ_code);
 
+-- Bumped on every write to a tracked table; API processes poll it to refresh
+-- in-memory indexes (e.g. the recycle center spatial index).
+CREATE TABLE IF NOT EXISTS core.dataset_version (
+  dataset    text PRIMARY KEY,
+  version    bigint NOT NULL DEFAULT 1,
+  compacted_through bigint NOT NULL DEFAULT 0,
+  updated_at timestamptz NOT NULL DEFAULT now()
+);
+
+CREATE OR REPLACE FUNCTION core.bump_dataset_version() RETURNS trigger AS $$
+BEGIN
+  INSERT INTO core.dataset_version (dataset, version, updated_at)
+  VALUES (TG_ARGV[0], 1, now())
+  ON CONFLICT (dataset) DO UPDATE
+  SET version = core.dataset_version.version + 1,
+      updated_at = now();
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_recycle_center_version ON core.recycle_center;
+CREATE TRIGGER trg_recycle_center_version
+  AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON core.recycle_center
+  FOR EACH STATEMENT EXECUTE FUNCTION core.bump_dataset_version('recycle_center');
+
 CREATE TABLE IF NOT EXISTS core.item (
   item_id               uuid PRIMARY KEY DEFAULT gen_random_uuid(),
   external_document_id  text UNIQUE,
@@ -141,6 +187,10 @@ CREATE TABLE IF NOT EXISTS core.item (
   updated_at            timestamptz NOT NULL DEFAULT now()
 );
 CREATE INDEX IF NOT EXISTS ix_item_primary_image ON core.item(primary_image_id);
+CREATE INDEX IF NOT EXISTS ix_item_canonical_key_trgm
+  ON core.item USING gin (canonical_key gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS ix_item_title_key ON core.item(title_key);
+CREATE INDEX IF NOT EXISTS ix_item_canonical_key_id ON core.item(canonical_key, item_id);
 
 CREATE TABLE IF NOT EXISTS core.item_city_text_override (
   city_id       uuid NOT NULL REFERENCES core.city(city_id) ON DELETE CASCADE,
@@ -211,8 +261,10 @@ CREATE UNIQUE INDEX IF NOT EXISTS ux_prospect_item_city_lang
 CREATE UNIQUE INDEX IF NOT EXISTS ux_prospect_search_city_lang
   ON core.prospect(search_text, city_id, lang) WHERE search_text IS NOT NULL;
 
+-- Monthly range partitions (scan_event_pYYYYMM) are created and dropped by
+-- scripts/maintain_partitions.py; the default partition only catches stragglers.
 CREATE TABLE IF NOT EXISTS core.scan_event (
-  scan_id     uuid PRIMARY KEY DEFAULT gen_random_uuid(),
+  scan_id     uuid NOT NULL DEFAULT gen_random_uuid(),
   image_id    uuid NOT NULL REFERENCES core.image_asset(image_id) ON DELETE CASCADE,
   cache_key   text NULL,
   city_id     uuid NOT NULL REFERENCES core.city(city_id) ON DELETE CASCADE,
@@ -220,26 +272,54 @@ CREATE TABLE IF NOT EXISTS core.scan_event (
   prospect_id uuid NULL REFERENCES core.prospect(prospect_id) ON DELETE SET NULL,
   search_text text NULL,
   source      text NOT NULL DEFAULT 'scan',
-  created_at  timestamptz NOT NULL DEFAULT now()
-);
+  created_at  timestamptz NOT NULL DEFAULT now(),
+  PRIMARY KEY (scan_id, created_at)
+) PARTITION BY RANGE (created_at);
+CREATE TABLE IF NOT EXISTS core.scan_event_default PARTITION OF core.scan_event DEFAULT;
 CREATE INDEX IF NOT EXISTS ix_scan_event_created ON core.scan_event(created_at);
 CREATE INDEX IF NOT EXISTS ix_scan_event_city ON core.scan_event(city_id);
 CREATE INDEX IF NOT EXISTS ix_scan_event_item ON core.scan_event(item_id);
 CREATE INDEX IF NOT EXISTS ix_scan_event_prospect ON core.scan_event(prospect_id);
 
 CREATE TABLE IF NOT EXISTS core.vision_cache (
-  cache_key     text PRIMARY KEY,
+  cache_key     text NOT NULL,
   image_id      uuid NULL REFERENCES core.image_asset(image_id) ON DELETE SET NULL,
   canonical_key text NULL,
   confidence    double precision NOT NULL,
   labels        jsonb NOT NULL,
   notes         text NULL,
+  labels_lang   text NULL,
   created_at    timestamptz NOT NULL DEFAULT now(),
-  expires_at    timestamptz NOT NULL
-);
+  expires_at    timestamptz NOT NULL,
+  PRIMARY KEY (cache_key, expires_at)
+) PARTITION BY RANGE (expires_at);
+CREATE TABLE IF NOT EXISTS core.vision_cache_default PARTITION OF core.vision_cache DEFAULT;
 CREATE INDEX IF NOT EXISTS ix_vision_cache_expires ON core.vision_cache(expires_at);
 CREATE INDEX IF NOT EXISTS ix_vision_cache_image ON core.vision_cache(image_id);
 
+CREATE TABLE IF NOT EXISTS core.analyze_job (
+  job_id       uuid PRIMARY KEY DEFAULT gen_random_uuid(),
+  owner        text NOT NULL,
+  status       text NOT NULL DEFAULT 'queued'
+    CHECK (status IN ('queued', 'running', 'done', 'failed')),
+  city         text NOT NULL,
+  lang         text NOT NULL,
+  search_text  text NULL,
+  s3_key       text NOT NULL,
+  image_sha256 text NULL,
+  attempts     int NOT NULL DEFAULT 0,
+  result       jsonb NULL,
+  error        text NULL,
+  locked_until timestamptz NULL,
+  created_at   timestamptz NOT NULL DEFAULT now(),
+  started_at   timestamptz NULL,
+  finished_at  timestamptz NULL
+);
+CREATE INDEX IF NOT EXISTS ix_analyze_job_runnable
+  ON core.analyze_job(created_at) WHERE status IN ('queued', 'running');
+CREATE INDEX IF NOT EXISTS ix_analyze_job_finished
+  ON core.analyze_job(finished_at) WHERE finished_at IS NOT NULL;
+
 CREATE TABLE IF NOT EXISTS core.item_feedback (
   feedback_id uuid PRIMARY KEY DEFAULT gen_random_uuid(),
   item_id     uuid NOT NULL REFERENCES core.item(item_id) ON DELETE CASCADE,
@@ -257,3 +337,249 @@ CREATE INDEX IF NOT EXISTS ix_item_feedback_created
   ON core.item_feedback(created_at);
 CREATE UNIQUE INDEX IF NOT EXISTS ux_item_feedback_item_city_session
   ON core.item_feedback(item_id, city_id, session_id);
+
+-- GCRA rate limit state shared by all API workers (RATE_LIMIT_BACKEND=postgres):
+-- theoretical arrival time per key, epoch seconds. Losing it on a crash is harmless.
+CREATE UNLOGGED TABLE IF NOT EXISTS core.rate_limit (
+  key text PRIMARY KEY,
+  tat double precision NOT NULL
+);
+
+-- Catalog change journal (delta sync for GET /catalog/{city}/changes). Row
+-- triggers record the (city, item) pairs a write affects, under one catalog
+-- version per transaction; city_id NULL means every city.
+CREATE TABLE IF NOT EXISTS core.catalog_change (
+  change_id  bigserial PRIMARY KEY,
+  version    bigint NOT NULL,
+  city_id    uuid NULL,
+  item_id    uuid NOT NULL,
+  created_at timestamptz NOT NULL DEFAULT now()
+);
+CREATE INDEX IF NOT EXISTS ix_catalog_change_version
+  ON core.catalog_change(version);
+CREATE INDEX IF NOT EXISTS ix_item_desc_key ON core.item(desc_key);
+
+CREATE OR REPLACE FUNCTION core.catalog_xact_version() RETURNS bigint AS $$
+DECLARE
+  xact text := pg_current_xact_id()::text;
+  cached text := current_setting('core.catalog_xact_version', true);
+  v bigint;
+BEGIN
+  IF split_part(cached, ':', 1) = xact THEN
+    RETURN split_part(cached, ':', 2)::bigint;
+  END IF;
+  INSERT INTO core.dataset_version (dataset, version, updated_at)
+  VALUES ('catalog', 1, now())
+  ON CONFLICT (dataset) DO UPDATE
+  SET version = core.dataset_version.version + 1,
+      updated_at = now()
+  RETURNING version INTO v;
+  PERFORM set_config('core.catalog_xact_version', xact || ':' || v, true);
+  RETURN v;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION core.journal_catalog_change(p_city_id uuid, p_item_id uuid) RETURNS void AS $$
+  INSERT INTO core.catalog_change (version, city_id, item_id)
+  VALUES (core.catalog_xact_version(), p_city_id, p_item_id);
+$$ LANGUAGE sql;
+
+CREATE OR REPLACE FUNCTION core.journal_item_city_change() RETURNS trigger AS $$
+BEGIN
+  IF TG_OP <> 'INSERT' THEN
+    PERFORM core.journal_catalog_change(OLD.city_id, OLD.item_id);
+  END IF;
+  IF TG_OP = 'INSERT' OR (TG_OP = 'UPDATE' AND (OLD.city_id, OLD.item_id) IS DISTINCT FROM (NEW.city_id, NEW.item_id)) THEN
+    PERFORM core.journal_catalog_change(NEW.city_id, NEW.item_id);
+  END IF;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION core.journal_item_change() RETURNS trigger AS $$
+BEGIN
+  PERFORM core.journal_catalog_change(NULL, NEW.item_id);
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION core.journal_item_alias_change() RETURNS trigger AS $$
+BEGIN
+  PERFORM core.journal_catalog_change(NULL, i.item_id)
+  FROM core.item i
+  WHERE (TG_OP <> 'INSERT' AND i.canonical_key = OLD.canonical_key)
+     OR (TG_OP <> 'DELETE' AND i.canonical_key = NEW.canonical_key);
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Every item showing the translated key, as title/description (base or
+-- city override) or as the name of one of its categories, disposals or warnings.
+CREATE OR REPLACE FUNCTION core.journal_translation_key(p_key text) RETURNS void AS $$
+BEGIN
+  PERFORM core.journal_catalog_change(x.city_id, x.item_id)
+  FROM (
+    SELECT NULL::uuid AS city_id, i.item_id FROM core.item i WHERE i.title_key = p_key
+    UNION
+    SELECT NULL::uuid, i.item_id FROM core.item i WHERE i.desc_key = p_key
+    UNION
+    SELECT o.city_id, o.item_id FROM core.item_city_text_override o
+    WHERE o.title_key = p_key OR o.desc_key = p_key
+    UNION
+    SELECT icc.city_id, icc.item_id FROM core.category c
+    JOIN core.item_city_category icc ON icc.category_id = c.category_id
+    WHERE c.name_key = p_key
+    UNION
+    SELECT icd.city_id, icd.item_id FROM core.disposal_method d
+    JOIN core.item_city_disposal icd ON icd.disposal_id = d.disposal_id
+    WHERE d.name_key = p_key
+    UNION
+    SELECT icw.city_id, icw.item_id FROM core.warning w
+    JOIN core.item_city_warning icw ON icw.warning_id = w.warning_id
+    WHERE w.title_key = p_key OR w.body_key = p_key
+  ) x;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION core.journal_translation_change() RETURNS trigger AS $$
+BEGIN
+  IF TG_OP <> 'INSERT' THEN
+    PERFORM core.journal_translation_key(OLD.key);
+  END IF;
+  IF TG_OP = 'INSERT' OR (TG_OP = 'UPDATE' AND OLD.key <> NEW.key) THEN
+    PERFORM core.journal_translation_key(NEW.key);
+  END IF;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION core.journal_category_change() RETURNS trigger AS $$
+BEGIN
+  PERFORM core.journal_catalog_change(icc.city_id, icc.item_id)
+  FROM core.item_city_category icc WHERE icc.category_id = NEW.category_id;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION core.journal_disposal_method_change() RETURNS trigger AS $$
+BEGIN
+  PERFORM core.journal_catalog_change(icd.city_id, icd.item_id)
+  FROM core.item_city_disposal icd WHERE icd.disposal_id = NEW.disposal_id;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION core.journal_warning_change() RETURNS trigger AS $$
+BEGIN
+  PERFORM core.journal_catalog_change(icw.city_id, icw.item_id)
+  FROM core.item_city_warning icw WHERE icw.warning_id = NEW.warning_id;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- TRUNCATE has no rows to journal: take a version and make it the floor,
+-- so every client resyncs.
+CREATE OR REPLACE FUNCTION core.journal_catalog_truncate() RETURNS trigger AS $$
+BEGIN
+  UPDATE core.dataset_version
+  SET compacted_through = core.catalog_xact_version()
+  WHERE dataset = 'catalog';
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+INSERT INTO core.dataset_version (dataset) VALUES ('catalog')
+ON CONFLICT (dataset) DO NOTHING;
+
+DROP TRIGGER IF EXISTS trg_item_city_text_override_journal ON core.item_city_text_override;
+CREATE TRIGGER trg_item_city_text_override_journal
+  AFTER INSERT OR DELETE ON core.item_city_text_override
+  FOR EACH ROW EXECUTE FUNCTION core.journal_item_city_change();
+DROP TRIGGER IF EXISTS trg_item_city_text_override_journal_update ON core.item_city_text_override;
+CREATE TRIGGER trg_item_city_text_override_journal_update
+  AFTER UPDATE ON core.item_city_text_override
+  FOR EACH ROW WHEN (OLD.* IS DISTINCT FROM NEW.*) EXECUTE FUNCTION core.journal_item_city_change();
+DROP TRIGGER IF EXISTS trg_item_city_category_journal ON core.item_city_category;
+CREATE TRIGGER trg_item_city_category_journal
+  AFTER INSERT OR DELETE ON core.item_city_category
+  FOR EACH ROW EXECUTE FUNCTION core.journal_item_city_change();
+DROP TRIGGER IF EXISTS trg_item_city_category_journal_update ON core.item_city_category;
+CREATE TRIGGER trg_item_city_category_journal_update
+  AFTER UPDATE ON core.item_city_category
+  FOR EACH ROW WHEN (OLD.* IS DISTINCT FROM NEW.*) EXECUTE FUNCTION core.journal_item_city_change();
+DROP TRIGGER IF EXISTS trg_item_city_disposal_journal ON core.item_city_disposal;
+CREATE TRIGGER trg_item_city_disposal_journal
+  AFTER INSERT OR DELETE ON core.item_city_disposal
+  FOR EACH ROW EXECUTE FUNCTION core.journal_item_city_change();
+DROP TRIGGER IF EXISTS trg_item_city_disposal_journal_update ON core.item_city_disposal;
+CREATE TRIGGER trg_item_city_disposal_journal_update
+  AFTER UPDATE ON core.item_city_disposal
+  FOR EACH ROW WHEN (OLD.* IS DISTINCT FROM NEW.*) EXECUTE FUNCTION core.journal_item_city_change();
+DROP TRIGGER IF EXISTS trg_item_city_warning_journal ON core.item_city_warning;
+CREATE TRIGGER trg_item_city_warning_journal
+  AFTER INSERT OR DELETE ON core.item_city_warning
+  FOR EACH ROW EXECUTE FUNCTION core.journal_item_city_change();
+DROP TRIGGER IF EXISTS trg_item_city_warning_journal_update ON core.item_city_warning;
+CREATE TRIGGER trg_item_city_warning_journal_update
+  AFTER UPDATE ON core.item_city_warning
+  FOR EACH ROW WHEN (OLD.* IS DISTINCT FROM NEW.*) EXECUTE FUNCTION core.journal_item_city_change();
+DROP TRIGGER IF EXISTS trg_i18n_translation_journal ON core.i18n_translation;
+CREATE TRIGGER trg_i18n_translation_journal
+  AFTER INSERT OR DELETE ON core.i18n_translation
+  FOR EACH ROW EXECUTE FUNCTION core.journal_translation_change();
+DROP TRIGGER IF EXISTS trg_i18n_translation_journal_update ON core.i18n_translation;
+CREATE TRIGGER trg_i18n_translation_journal_update
+  AFTER UPDATE ON core.i18n_translation
+  FOR EACH ROW WHEN ((OLD.key, OLD.lang, OLD.text) IS DISTINCT FROM (NEW.key, NEW.lang, NEW.text)) EXECUTE FUNCTION core.journal_translation_change();
+DROP TRIGGER IF EXISTS trg_item_journal_update ON core.item;
+CREATE TRIGGER trg_item_journal_update
+  AFTER UPDATE ON core.item
+  FOR EACH ROW WHEN ((OLD.canonical_key, OLD.title_key, OLD.desc_key, OLD.primary_image_id) IS DISTINCT FROM (NEW.canonical_key, NEW.title_key, NEW.desc_key, NEW.primary_image_id)) EXECUTE FUNCTION core.journal_item_change();
+DROP TRIGGER IF EXISTS trg_category_journal_update ON core.category;
+CREATE TRIGGER trg_category_journal_update
+  AFTER UPDATE ON core.category
+  FOR EACH ROW WHEN ((OLD.code, OLD.name_key) IS DISTINCT FROM (NEW.code, NEW.name_key)) EXECUTE FUNCTION core.journal_category_change();
+DROP TRIGGER IF EXISTS trg_disposal_method_journal_update ON core.disposal_method;
+CREATE TRIGGER trg_disposal_method_journal_update
+  AFTER UPDATE ON core.disposal_method
+  FOR EACH ROW WHEN ((OLD.code, OLD.name_key, OLD.recycle_center_typ_code) IS DISTINCT FROM (NEW.code, NEW.name_key, NEW.recycle_center_typ_code)) EXECUTE FUNCTION core.journal_disposal_method_change();
+DROP TRIGGER IF EXISTS trg_warning_journal_update ON core.warning;
+CREATE TRIGGER trg_warning_journal_update
+  AFTER UPDATE ON core.warning
+  FOR EACH ROW WHEN ((OLD.code, OLD.title_key, OLD.body_key, OLD.severity) IS DISTINCT FROM (NEW.code, NEW.title_key, NEW.body_key, NEW.severity)) EXECUTE FUNCTION core.journal_warning_change();
+DROP TRIGGER IF EXISTS trg_item_journal_truncate ON core.item;
+CREATE TRIGGER trg_item_journal_truncate
+  AFTER TRUNCATE ON core.item
+  FOR EACH STATEMENT EXECUTE FUNCTION core.journal_catalog_truncate();
+DROP TRIGGER IF EXISTS trg_i18n_translation_journal_truncate ON core.i18n_translation;
+CREATE TRIGGER trg_i18n_translation_journal_truncate
+  AFTER TRUNCATE ON core.i18n_translation
+  FOR EACH STATEMENT EXECUTE FUNCTION core.journal_catalog_truncate();
+DROP TRIGGER IF EXISTS trg_item_city_text_override_journal_truncate ON core.item_city_text_override;
+CREATE TRIGGER trg_item_city_text_override_journal_truncate
+  AFTER TRUNCATE ON core.item_city_text_override
+  FOR EACH STATEMENT EXECUTE FUNCTION core.journal_catalog_truncate();
+DROP TRIGGER IF EXISTS trg_item_city_category_journal_truncate ON core.item_city_category;
+CREATE TRIGGER trg_item_city_category_journal_truncate
+  AFTER TRUNCATE ON core.item_city_category
+  FOR EACH STATEMENT EXECUTE FUNCTION core.journal_catalog_truncate();
+DROP TRIGGER IF EXISTS trg_item_city_disposal_journal_truncate ON core.item_city_disposal;
+CREATE TRIGGER trg_item_city_disposal_journal_truncate
+  AFTER TRUNCATE ON core.item_city_disposal
+  FOR EACH STATEMENT EXECUTE FUNCTION core.journal_catalog_truncate();
+DROP TRIGGER IF EXISTS trg_item_city_warning_journal_truncate ON core.item_city_warning;
+CREATE TRIGGER trg_item_city_warning_journal_truncate
+  AFTER TRUNCATE ON core.item_city_warning
+  FOR EACH STATEMENT EXECUTE FUNCTION core.journal_catalog_truncate();
+DROP TRIGGER IF EXISTS trg_category_journal_truncate ON core.category;
+CREATE TRIGGER trg_category_journal_truncate
+  AFTER TRUNCATE ON core.category
+  FOR EACH STATEMENT EXECUTE FUNCTION core.journal_catalog_truncate();
+DROP TRIGGER IF EXISTS trg_disposal_method_journal_truncate ON core.disposal_method;
+CREATE TRIGGER trg_disposal_method_journal_truncate
+  AFTER TRUNCATE ON core.disposal_method
+  FOR EACH STATEMENT EXECUTE FUNCTION core.journal_catalog_truncate();
+DROP TRIGGER IF EXISTS trg_warning_journal_truncate ON core.warning;
+CREATE TRIGGER trg_warning_journal_truncate
+  AFTER TRUNCATE ON core.warning
+  FOR EACH STATEMENT EXECUTE FUNCTION core.journal_catalog_truncate();
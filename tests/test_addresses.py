@@ -0,0 +1,58 @@
+from pathlib import Path
+
+from app.services.addresses import AddressIndex, AddressIndexes, normalize_address, parse_addresses
+
+
+DATA_DIR = Path(__file__).resolve().parents[1] / "data"
+
+
+def _index():
+  return AddressIndex(
+    parse_addresses(
+      [
+        {"strasse": "Angerstr.", "nummer": "4", "plz": "30890", "ort": "Barsinghausen", "breitengrad": 52.29, "laengengrad": 9.50},
+        {"strasse": "Angerstr.", "nummer": "4", "plz": "30890", "ort": "Barsinghausen", "breitengrad": 52.29, "laengengrad": 9.50},
+        {"strasse": "Große Düwelstraße", "nummer": "28", "plz": "30171", "ort": "Hannover", "breitengrad": 52.37, "laengengrad": 9.75},
+        {"strasse": "Anderter Str.", "nummer": "1", "plz": "30629", "ort": "Hannover", "breitengrad": 52.38, "laengengrad": 9.83},
+        {"strasse": "Ohne Koordinaten", "nummer": "1", "plz": "30000", "ort": "Hannover"},
+      ]
+    )
+  )
+
+
+def test_normalize_address_folds_spelling_variants():
+  assert normalize_address("Große Düwelstr. 28") == "grosse duewelstrasse 28"
+  assert normalize_address("grosse  duewelstrasse 28") == "grosse duewelstrasse 28"
+  assert normalize_address("Anderter Str 1, 30629") == "anderter strasse 1 30629"
+
+
+def test_complete_matches_street_and_plz_prefixes():
+  index = _index()
+  assert len(index) == 3
+  assert [a["label"] for a in index.complete("an")] == ["Anderter Str. 1, 30629 Hannover", "Angerstr. 4, 30890 Barsinghausen"]
+  assert [a["label"] for a in index.complete("große düwelstraße")] == ["Große Düwelstraße 28, 30171 Hannover"]
+  assert [a["label"] for a in index.complete("30629 anderter")] == ["Anderter Str. 1, 30629 Hannover"]
+  assert index.complete("an", limit=1)[0]["street"] == "Anderter Str."
+  assert index.complete("") == []
+  assert index.lookup("Hauptstraße 1") is None
+
+
+def test_hannover_data_file_lookup():
+  index = AddressIndexes(str(DATA_DIR)).get("hannover")
+  assert index is not None
+  match = index.lookup("Blumenhof 3, 30890")
+  assert match is not None and round(match["lat"], 3) == 52.315
+  assert index.complete("blumenhof", limit=10)
+  assert AddressIndexes(str(DATA_DIR)).get("../data/hannover") is None
+
+
+def test_missing_city_file_is_not_cached(tmp_path):
+  indexes = AddressIndexes(str(tmp_path))
+  assert indexes.get("hannover") is None
+  (tmp_path / "hannover_addresses.json").write_text(
+    '[{"strasse": "Angerstr.", "nummer": "4", "plz": "30890", "ort": "Barsinghausen", "breitengrad": 52.29, "laengengrad": 9.5}]',
+    encoding="utf-8",
+  )
+  index = indexes.get("hannover")
+  assert index is not None and len(index) == 1
+  assert indexes.get("hannover") is index
@@ -0,0 +1,121 @@
+from datetime import datetime, timezone
+from uuid import UUID
+
+from fastapi.testclient import TestClient
+
+import app.main as main
+from app.services.pagination import decode_cursor, encode_cursor
+
+ID_1 = "00000000-0000-0000-0000-000000000001"
+ID_2 = "00000000-0000-0000-0000-000000000002"
+ID_3 = "00000000-0000-0000-0000-000000000003"
+
+
+class _Result:
+  def __init__(self, rows):
+    self._rows = rows
+
+  def fetchall(self):
+    return self._rows
+
+
+class _FakeDb:
+  def __init__(self, rows):
+    self.rows = rows
+    self.calls = []
+
+  def execute(self, stmt, params):
+    self.calls.append((str(stmt), params))
+    return _Result(self.rows[: params["limit"]])
+
+
+def _client(monkeypatch, db):
+  monkeypatch.setattr(main, "_require_admin", lambda request: {"type": "admin", "sub": "admin:session"})
+  monkeypatch.setattr(main, "_image_url", lambda db, image_id: None)
+  main.app.dependency_overrides[main.get_db] = lambda: db
+  return TestClient(main.app)
+
+
+class _ItemsDb(_FakeDb):
+  """Titled rows for the query driven by i18n_translation, untitled rows otherwise."""
+
+  def __init__(self, titled, untitled):
+    super().__init__([])
+    self.titled = titled
+    self.untitled = untitled
+
+  def execute(self, stmt, params):
+    sql = str(stmt)
+    self.calls.append((sql, params))
+    rows = self.titled if "JOIN core.item i ON i.title_key" in sql else self.untitled
+    return _Result(rows[: params["limit"]])
+
+
+def test_admin_items_keyset_cursor(monkeypatch):
+  db = _ItemsDb(
+    titled=[(ID_1, "akku", "Akku", None, True), (ID_2, "batterie", "Batterie", None, True)],
+    untitled=[(ID_3, "zz_untitled", None, None, False)],
+  )
+  try:
+    client = _client(monkeypatch, db)
+    res = client.get("/admin/items", params={"limit": 2})
+    assert res.status_code == 200
+    body = res.json()
+    assert [i["canonical_key"] for i in body["items"]] == ["akku", "batterie"]
+    assert decode_cursor(body["next_cursor"], (bool, str, str, UUID)) == [False, "Batterie", "batterie", ID_2]
+    assert "OFFSET" not in db.calls[0][0]
+    assert "ORDER BY t1.text, i.canonical_key, i.item_id" in db.calls[0][0]
+    # Two titled rows leave room for one untitled row: enough to know there is a next page.
+    assert db.calls[1][1]["limit"] == 1
+
+    db.titled = db.titled[2:]
+    res = client.get("/admin/items", params={"limit": 2, "cursor": body["next_cursor"]})
+    assert [i["canonical_key"] for i in res.json()["items"]] == ["zz_untitled"]
+    assert res.json()["next_cursor"] is None
+    titled_sql, params = db.calls[2]
+    assert "(t1.text, i.canonical_key, i.item_id) > (:after_title, :after_key, CAST(:after_id AS uuid))" in titled_sql
+    assert params["after_key"] == "batterie"
+    untitled_sql, params = db.calls[3]
+    assert "NOT EXISTS" in untitled_sql and ":after_key" not in untitled_sql
+    assert params["limit"] == 3
+
+    # A cursor inside the untitled part skips the titled query.
+    cursor = encode_cursor([True, "", "aa_untitled", ID_1])
+    res = client.get("/admin/items", params={"limit": 2, "cursor": cursor})
+    assert [i["canonical_key"] for i in res.json()["items"]] == ["zz_untitled"]
+    assert len(db.calls) == 5
+    assert "(i.canonical_key, i.item_id) > (:after_key, CAST(:after_id AS uuid))" in db.calls[4][0]
+
+    assert client.get("/admin/items", params={"cursor": "bogus"}).status_code == 400
+    for values in (["no", "Batterie", "batterie", ID_2], [False, "Batterie", "batterie", "id-2"], [False, 1, "batterie", ID_2]):
+      res = client.get("/admin/items", params={"cursor": encode_cursor(values)})
+      assert res.status_code == 400 and res.json()["detail"] == "invalid_cursor"
+    assert len(db.calls) == 5
+  finally:
+    main.app.dependency_overrides.clear()
+
+
+def test_admin_images_keyset_cursor(monkeypatch):
+  created = datetime(2026, 10, 1, 12, 0, 0, 123456, tzinfo=timezone.utc)
+  db = _FakeDb([(ID_2, 10, 10, "scan", created), (ID_1, 10, 10, "scan", created)])
+  try:
+    client = _client(monkeypatch, db)
+    res = client.get("/admin/images", params={"limit": 1})
+    assert res.status_code == 200
+    cursor = res.json()["next_cursor"]
+    assert decode_cursor(cursor, (datetime, UUID)) == [created.isoformat(), ID_2]
+
+    db.rows = db.rows[1:]
+    res = client.get("/admin/images", params={"limit": 1, "cursor": cursor})
+    assert [i["image_id"] for i in res.json()["images"]] == [ID_1]
+    assert res.json()["next_cursor"] is None
+    sql, params = db.calls[1]
+    assert "(created_at, image_id) < " in sql and "ORDER BY created_at DESC, image_id DESC" in sql
+    assert params["after_id"] == ID_2
+
+    for values in (["yesterday", ID_2], [created.isoformat(), "img-2"], [0, ID_2]):
+      res = client.get("/admin/images", params={"cursor": encode_cursor(values)})
+      assert res.status_code == 400 and res.json()["detail"] == "invalid_cursor"
+    assert len(db.calls) == 2
+  finally:
+    main.app.dependency_overrides.clear()
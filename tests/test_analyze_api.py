@@ -47,3 +47,125 @@ def test_analyze_invalid_base64(monkeypatch):
     json={"city": "hannover", "lang": "de", "image_base64": "!!!not_base64"},
   )
   assert res.status_code == 400
+
+
+def test_persist_upload_failure_is_retried_in_background(monkeypatch):
+  import asyncio
+  import io
+  import os
+  from fastapi import HTTPException
+  from starlette.datastructures import FormData, UploadFile
+  import app.main as main
+  from app.storage.uploads import StagedUpload
+
+  attempts = []
+  bodies = []
+
+  def flaky_upload(settings, fileobj, bucket, key, content_type):
+    attempts.append(key)
+    bodies.append(fileobj.read())
+    if len(attempts) < 3:
+      raise HTTPException(status_code=502, detail="s3_upload_failed")
+
+  spilled = []
+  recorded = []
+  real_remove = os.remove
+  monkeypatch.setattr(main, "upload_fileobj", flaky_upload)
+  monkeypatch.setattr(main, "record_stored_image", lambda asset, key: recorded.append((len(attempts), key)) or "img-1")
+  monkeypatch.setattr(main.os, "remove", lambda path: spilled.append(path) or real_remove(path))
+  monkeypatch.setattr(main.settings, "S3_UPLOAD_RETRY_BACKOFF_SECONDS", 0.0, raising=False)
+  upload = UploadFile(file=io.BytesIO(b"raw-bytes"), filename="a.jpg")
+  staged = StagedUpload(form=FormData([("file", upload)]), file=upload, size=9, sha256="x")
+
+  async def run():
+    # Never raises: the analyze response must not depend on archiving.
+    assert await main._persist_upload(staged, "guest/dev/2026/10/a.jpg", "image/jpeg", {"sha256": "n"}) is False
+    await staged.close()
+    await asyncio.gather(*list(main._background_tasks))
+
+  asyncio.run(run())
+  assert attempts == ["guest/dev/2026/10/a.jpg"] * 3
+  assert bodies == [b"raw-bytes"] * 3
+  assert len(spilled) == 1 and not os.path.exists(spilled[0])
+  # The storage key is only recorded once an upload got through.
+  assert recorded == [(3, "guest/dev/2026/10/a.jpg")]
+
+
+def test_stored_image_is_recorded_only_after_upload_succeeds(monkeypatch):
+  import asyncio
+  import app.main as main
+
+  recorded = []
+  monkeypatch.setattr(main, "record_stored_image", lambda asset, key: recorded.append(key) or "img-1")
+  inp = main._AnalyzeInput("hannover", "de", None, "guest/dev/2026/10/a.jpg", asset={"sha256": "n"})
+
+  async def run(uploaded):
+    async def upload():
+      return uploaded
+
+    return await main._attach_stored_image({"cache_key": "k"}, asyncio.create_task(upload()), inp)
+
+  assert asyncio.run(run(False)) == {"cache_key": "k"}
+  assert recorded == []
+  assert asyncio.run(run(True)) == {"cache_key": "k", "image_id": "img-1"}
+  assert recorded == ["guest/dev/2026/10/a.jpg"]
+
+
+def test_analyze_stream_emits_stages_in_order(monkeypatch):
+  import json as _json
+  import app.main as main
+
+  monkeypatch.setattr(main, "_resolve_principal", lambda request: {"type": "guest", "sub": "guest:dev-1"})
+  monkeypatch.setattr(
+    main,
+    "_vision_for_known_object",
+    lambda key: {"canonical_key": "batterie", "confidence": 0.9, "labels": ["batterie"], "cache_key": "k:m"},
+  )
+
+  class _Db:
+    def close(self):
+      pass
+
+  monkeypatch.setattr(main, "SessionLocal", _Db)
+  projections = []
+  monkeypatch.setattr(main, "project_labels", lambda db, labels, labels_lang, lang: projections.append(lang) or ["Battery"])
+  item_events_before_suggestions = []
+
+  def analyze_from_vision(db, vision, city, lang, search_text, s3_key, on_item=None, labels=None):
+    assert labels == ["Battery"]
+    resolved = {"item": {"id": "i1", "canonical_key": "batterie"}, "disposals": [{"code": "E_SCHROTT"}]}
+    on_item(main._item_stage(s3_key, resolved))
+    # Suggestions are computed after the item stage went out.
+    item_events_before_suggestions.append(True)
+    return main.AnalyzeResponse(
+      s3_key=s3_key,
+      item=resolved["item"],
+      recycle={"disposals": resolved["disposals"]},
+      repair={"available": False},
+      donate={"available": False},
+      warnings=[],
+      debug={},
+      suggestions=[],
+      prospect={"created": False},
+    )
+
+  monkeypatch.setattr(main, "_analyze_from_vision", analyze_from_vision)
+
+  res = client.post(
+    "/analyze/stream",
+    json={"city": "hannover", "lang": "en", "s3_key": "guest/dev-1/2026/10/x.jpg"},
+  )
+  assert res.status_code == 200
+  assert res.headers["content-type"].startswith("text/event-stream")
+  events = []
+  for block in res.text.strip().split("\n\n"):
+    name, data = block.split("\n", 1)
+    events.append((name[len("event: "):], _json.loads(data[len("data: "):])))
+  assert [e[0] for e in events] == ["cache", "vision", "item", "suggestions", "done"]
+  assert events[0][1]["cache_hit"] is True
+  assert events[1][1]["labels"] == ["Battery"]
+  assert events[2][1]["recycle"]["disposals"][0]["code"] == "E_SCHROTT"
+  assert events[4][1]["item"]["id"] == "i1"
+  assert item_events_before_suggestions == [True]
+  assert projections == ["en"]
+  assert set(events[2][1]) == set(main._ITEM_STAGE_KEYS)
@@ -0,0 +1,150 @@
+from fastapi.testclient import TestClient
+
+import app.main as main
+import app.services.analyze_jobs as jobs
+from app.services.analyze_jobs import AnalyzeJobWorkers, PermanentJobError
+
+
+def _pool(monkeypatch, handler, attempts=1, max_attempts=3):
+  finished = []
+  monkeypatch.setattr(
+    jobs,
+    "claim_job",
+    lambda engine, lease, max_attempts: {"job_id": "job-1", "attempts": attempts, "lang": "de", "city": "hannover", "s3_key": "k"},
+  )
+
+  def finish(engine, job_id, attempts, status, result=None, error=None, retry_after=0.0):
+    finished.append((job_id, status, result, error))
+    retries.append(retry_after)
+    return True
+
+  retries = []
+  monkeypatch.setattr(jobs, "finish_job", finish)
+  pool = AnalyzeJobWorkers(None, handler, workers=0, max_attempts=max_attempts, retry_backoff=5.0)
+  pool.retries = retries
+  return pool, finished
+
+
+def test_worker_marks_done_retries_transient_and_fails_permanent(monkeypatch):
+  pool, finished = _pool(monkeypatch, lambda job: {"item": None})
+  assert pool.run_once()
+  assert finished[-1] == ("job-1", "done", {"item": None}, None)
+
+  def transient(job):
+    raise RuntimeError("vision_error: exception_or_timeout")
+
+  pool, finished = _pool(monkeypatch, transient, attempts=1)
+  pool.run_once()
+  assert finished[-1][1] == "queued"
+  assert pool.retries[-1] == 5.0
+  pool, finished = _pool(monkeypatch, transient, attempts=2)
+  pool.run_once()
+  assert pool.retries[-1] == 10.0
+  pool, finished = _pool(monkeypatch, transient, attempts=3)
+  pool.run_once()
+  assert finished[-1][1] == "failed"
+  assert pool.retries[-1] == 0.0
+
+  def permanent(job):
+    raise PermanentJobError("invalid_city")
+
+  pool, finished = _pool(monkeypatch, permanent, attempts=1)
+  pool.run_once()
+  assert finished[-1] == ("job-1", "failed", None, "invalid_city")
+
+
+def test_worker_survives_finish_errors_and_lost_leases(monkeypatch):
+  pool, finished = _pool(monkeypatch, lambda job: {"item": None}, attempts=2)
+
+  def broken(engine, job_id, attempts, status, result=None, error=None, retry_after=0.0):
+    raise RuntimeError("connection reset")
+
+  monkeypatch.setattr(jobs, "finish_job", broken)
+  assert pool.run_once()
+  monkeypatch.setattr(jobs, "finish_job", lambda engine, job_id, attempts, status, **kwargs: False)
+  assert pool.run_once()
+
+
+class _Conn:
+  def __init__(self, calls, rowcount):
+    self.calls = calls
+    self.rowcount = rowcount
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *exc):
+    return False
+
+  def execute(self, stmt, params):
+    self.calls.append((str(stmt), params))
+    return self
+
+
+class _Engine:
+  def __init__(self, rowcount):
+    self.calls = []
+    self.rowcount = rowcount
+
+  def begin(self):
+    return _Conn(self.calls, self.rowcount)
+
+
+def test_finish_job_only_updates_the_claim_that_owns_the_job():
+  engine = _Engine(rowcount=0)
+  assert not jobs.finish_job(engine, "job-1", 2, "done", result={})
+  sql, params = engine.calls[0]
+  assert "status = 'running' AND attempts = :attempts" in sql
+  assert params["attempts"] == 2
+  assert jobs.finish_job(_Engine(rowcount=1), "job-1", 2, "done", result={})
+
+
+def test_get_job_rejects_non_uuid_without_query():
+  assert jobs.get_job(None, "not-a-uuid", "guest/dev-1") is None
+
+
+def test_sweep_runs_at_most_every_sweep_seconds(monkeypatch):
+  calls = []
+  monkeypatch.setattr(jobs, "sweep_jobs", lambda engine, max_attempts, retention: calls.append((max_attempts, retention)) or (0, 0))
+  pool = AnalyzeJobWorkers(None, lambda job: {}, workers=0, max_attempts=4, retention_seconds=60.0, sweep_seconds=300.0)
+  pool.maybe_sweep()
+  pool.maybe_sweep()
+  assert calls == [(4, 60.0)]
+
+
+def test_job_api_enqueues_and_returns_owned_result(monkeypatch):
+  principal = {"type": "guest", "sub": "guest:dev-1"}
+  store = {}
+  monkeypatch.setattr(main, "_resolve_principal", lambda request: principal)
+
+  def fake_enqueue(engine, owner, city, lang, s3_key, search_text=None, image_sha256=None):
+    store["job"] = {"job_id": "job-1", "owner": owner, "status": "done", "result": {"error": None}, "attempts": 1}
+    return "job-1"
+
+  monkeypatch.setattr(main, "enqueue_job", fake_enqueue)
+  monkeypatch.setattr(
+    main,
+    "get_job",
+    lambda engine, job_id, owner: store["job"] if store["job"]["owner"] == owner else None,
+  )
+  client = TestClient(main.app)
+  res = client.post(
+    "/analyze/jobs",
+    json={"city": "hannover", "lang": "de", "s3_key": "guest/other/2026/10/x.jpg"},
+  )
+  assert res.status_code == 403
+
+  res = client.post(
+    "/analyze/jobs",
+    json={"city": "hannover", "lang": "de", "s3_key": "guest/dev-1/2026/10/x.jpg"},
+  )
+  assert res.status_code == 202
+  assert res.json()["poll_url"] == "/analyze/jobs/job-1"
+  assert store["job"]["owner"] == "guest/dev-1"
+
+  res = client.get("/analyze/jobs/job-1?wait=5")
+  assert res.status_code == 200
+  assert res.json()["status"] == "done"
+
+  principal = {"type": "guest", "sub": "guest:someone-else"}
+  assert client.get("/analyze/jobs/job-1").status_code == 404
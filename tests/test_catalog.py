@@ -0,0 +1,168 @@
+import json
+
+import pytest
+
+from app.services.catalog import CatalogSnapshots, catalog_changes, load_catalog, render_catalog
+
+
+class _Result:
+  def __init__(self, rows):
+    self._rows = rows
+
+  def fetchone(self):
+    return self._rows[0] if self._rows else None
+
+  def fetchall(self):
+    return self._rows
+
+
+class FakeCatalogDb:
+  def __init__(self, version=1, compacted_through=0, changed=()):
+    self.version = version
+    self.compacted_through = compacted_through
+    self.changed = list(changed)
+    self.item_queries = 0
+
+  def execute(self, stmt, params=None):
+    result = self._execute(str(stmt), params or {})
+    if params and params.get("item_ids") is not None:
+      result = _Result([r for r in result.fetchall() if r[0] in params["item_ids"]])
+    return result
+
+  def _execute(self, sql, params):
+    if "compacted_through" in sql:
+      return _Result([(self.version, self.compacted_through)])
+    if "core.dataset_version" in sql:
+      return _Result([(self.version,)])
+    if "core.catalog_change" in sql:
+      return _Result([(item_id,) for item_id in self.changed])
+    if "FROM core.city" in sql:
+      return _Result([("city-1",)] if params["code"] == "hannover" else [])
+    if "FROM core.language" in sql:
+      return _Result([(1,)] if params["lang"] in ("de", "en") else [])
+    if "core.item_alias" in sql:
+      return _Result([("i1", "Akku", "akku")])
+    if "core.item_city_text_override" in sql:
+      self.item_queries += 1
+      return _Result([("i1", "battery", "Batterie", "Zum Wertstoffhof", None), ("i2", "glass", "Glas", None, "img-2")])
+    if "FROM core.item_city_category" in sql:
+      return _Result([("i1", "schadstoffe", "Schadstoffe"), ("i2", "glas", "Glas")])
+    if "FROM core.item_city_disposal" in sql:
+      return _Result([("i1", "wertstoffhof", "Wertstoffhof", 1), ("i1", "handel", "Handel", None)])
+    if "FROM core.item_city_warning" in sql:
+      return _Result([("i1", "fire", "Brandgefahr", None, 3)])
+    raise AssertionError(sql)
+
+
+def _lines(body):
+  return [json.loads(line) for line in body.decode("utf-8").splitlines()]
+
+
+def test_load_catalog_groups_rows_per_item():
+  items = load_catalog(FakeCatalogDb(), "city-1", "hannover", "de")
+  assert [i["id"] for i in items] == ["i1", "i2"]
+  battery = items[0]
+  assert battery["aliases"] == [{"text": "Akku", "norm": "akku"}]
+  assert [d["code"] for d in battery["disposals"]] == ["wertstoffhof", "handel"]
+  assert battery["warnings"] == [{"code": "fire", "label": "Brandgefahr", "body": None, "severity": 3}]
+  assert items[1]["image_id"] == "img-2" and items[1]["disposals"] == []
+
+
+def test_render_catalog_is_ndjson_with_header():
+  lines = _lines(render_catalog("hannover", "de", 7, [{"type": "item", "id": "i1", "title": "Glühbirne"}]))
+  assert lines[0] == {"type": "catalog", "city": "hannover", "lang": "de", "version": 7, "items": 1}
+  assert lines[1]["title"] == "Glühbirne"
+
+
+def test_snapshots_build_once_per_version():
+  db = FakeCatalogDb()
+  snapshots = CatalogSnapshots(check_seconds=0)
+  first = snapshots.get(db, "hannover", "de")
+  assert snapshots.get(db, "hannover", "de") is first
+  assert first.version == 1 and first.count == 2
+  assert db.item_queries == 1
+  db.version = 2
+  second = snapshots.get(db, "hannover", "de")
+  assert second is not first and second.version == 2
+  assert db.item_queries == 2
+
+
+def test_catalog_changes_returns_changed_and_removed_items():
+  db = FakeCatalogDb(version=9, changed=["i1", "gone"])
+  changes = catalog_changes(db, "hannover", "de", since=4)
+  assert changes["version"] == 9
+  assert [i["id"] for i in changes["items"]] == ["i1"]
+  assert changes["items"][0]["disposals"][0]["code"] == "wertstoffhof"
+  assert changes["removed"] == ["gone"]
+  assert catalog_changes(FakeCatalogDb(version=9), "hannover", "de", since=9)["items"] == []
+
+
+def test_catalog_changes_require_resync_outside_journal():
+  assert catalog_changes(FakeCatalogDb(version=9, compacted_through=5), "hannover", "de", since=4) is None
+  assert catalog_changes(FakeCatalogDb(version=9), "hannover", "de", since=10) is None
+  db = FakeCatalogDb(version=9, changed=["i1", "i2"])
+  assert catalog_changes(db, "hannover", "de", since=1, max_items=1) is None
+
+
+def test_snapshots_serve_previous_version_while_rebuilding():
+  snapshots = CatalogSnapshots(check_seconds=0)
+  db = FakeCatalogDb(version=5)
+  old = snapshots.get(db, "hannover", "de")
+  assert old.version == 5 and _lines(old.body)[0]["version"] == 5
+
+  db.version = 6
+  lock = snapshots._key_lock(("hannover", "de"))
+  with lock:
+    assert snapshots.get(db, "hannover", "de") is old
+    # other keys build independently of the busy one
+    assert snapshots.get(db, "hannover", "en").version == 6
+  new = snapshots.get(db, "hannover", "de")
+  assert new.version == 6 and _lines(new.body)[0]["version"] == 6
+
+  with pytest.raises(ValueError, match="invalid_city"):
+    snapshots.get(db, "atlantis", "de")
+  assert ("atlantis", "de") not in snapshots._key_locks
+
+
+def test_catalog_endpoint_etag_and_errors(monkeypatch):
+  from fastapi.testclient import TestClient
+
+  import app.main as main
+
+  monkeypatch.setattr(main, "_resolve_principal", lambda request: {"type": "guest", "sub": "u"})
+  monkeypatch.setattr(main, "catalog_snapshots", CatalogSnapshots(check_seconds=0))
+  main.app.dependency_overrides[main.get_db] = lambda: FakeCatalogDb(version=5)
+  try:
+    client = TestClient(main.app)
+    res = client.get("/catalog/hannover", params={"lang": "de"})
+    assert res.status_code == 200
+    assert res.headers["content-type"].startswith("application/x-ndjson")
+    assert res.headers["x-catalog-version"] == "5"
+    assert _lines(res.content)[0]["items"] == 2
+
+    res = client.get("/catalog/hannover", params={"lang": "de"}, headers={"If-None-Match": res.headers["etag"]})
+    assert res.status_code == 304
+
+    assert client.get("/catalog/atlantis").json()["detail"] == "invalid_city"
+    assert client.get("/catalog/hannover", params={"lang": "xx"}).json()["detail"] == "invalid_lang"
+  finally:
+    main.app.dependency_overrides.clear()
+
+
+def test_catalog_changes_endpoint(monkeypatch):
+  from fastapi.testclient import TestClient
+
+  import app.main as main
+
+  monkeypatch.setattr(main, "_resolve_principal", lambda request: {"type": "guest", "sub": "u"})
+  main.app.dependency_overrides[main.get_db] = lambda: FakeCatalogDb(version=9, compacted_through=3, changed=["i2"])
+  try:
+    client = TestClient(main.app)
+    res = client.get("/catalog/hannover/changes", params={"since": 5})
+    assert res.status_code == 200
+    assert [i["id"] for i in res.json()["items"]] == ["i2"]
+    res = client.get("/catalog/hannover/changes", params={"since": 2})
+    assert res.status_code == 410
+    assert res.json()["detail"] == "resync_required"
+  finally:
+    main.app.dependency_overrides.clear()
@@ -1,4 +1,4 @@
-from app.disposal_methods import DISPOSAL_METHOD_SEEDS, find_disposal_method_seed
+from app.disposal_methods import DISPOSAL_METHOD_SEEDS, find_disposal_method_seed, find_disposal_method_seed_by_code
 
 
 def test_disposal_method_seeds_are_unique_by_code() -> None:
@@ -25,3 +25,10 @@ def test_seed_lookup_normalizes_spacing_and_case() -> None:
   seed = find_disposal_method_seed("berlin", "  recyclinghöfe mit schadstoff-annahme ")
   assert seed is not None
   assert seed.code == "recyclinghoefe_mit_schadstoff_annahme"
+
+
+def test_seed_lookup_by_code() -> None:
+  seed = find_disposal_method_seed_by_code("berlin", "recyclinghoefe")
+  assert seed is not None
+  assert seed.label_de == "Recyclinghöfe"
+  assert find_disposal_method_seed_by_code("hannover", "recyclinghoefe") is None
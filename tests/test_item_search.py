@@ -0,0 +1,62 @@
+import pytest
+
+from app.services.item_search import search_items, search_sql
+from app.services.pagination import decode_cursor, encode_cursor
+
+
+class _Result:
+  def __init__(self, rows):
+    self._rows = rows
+
+  def fetchall(self):
+    return self._rows
+
+
+class _FakeDb:
+  def __init__(self, rows):
+    self.rows = rows
+    self.calls = []
+
+  def execute(self, stmt, params):
+    self.calls.append((str(stmt), params))
+    return _Result(self.rows[: params["limit"]])
+
+
+def _row(key, score):
+  return (f"id-{key}", key, key.title(), None, [], score, key)
+
+
+def test_cursor_round_trip_and_validation():
+  token = encode_cursor([0.5, "glas ö", "glass"])
+  assert decode_cursor(token, (float, str, str)) == [0.5, "glas ö", "glass"]
+  assert decode_cursor(None, (float, str, str)) is None
+  with pytest.raises(ValueError):
+    decode_cursor(token, (float, str))
+  with pytest.raises(ValueError):
+    decode_cursor("not a cursor", (float, str, str))
+  with pytest.raises(ValueError):
+    decode_cursor(encode_cursor(["0.5", "glas ö", "glass"]), (float, str, str))
+
+
+def test_search_sql_ranks_with_trigram_candidates_and_keyset():
+  ranked = search_sql(ranked=True, after=True)
+  assert ":q <% t.text" in ranked and ":q <% i.canonical_key" in ranked
+  assert "UNION" in ranked
+  assert "(-score, sort_title, canonical_key) > (-CAST(:after_score AS float8), :after_title, :after_key)" in ranked
+  assert "OFFSET" not in ranked
+  browse = search_sql(ranked=False, after=False)
+  assert "word_similarity" not in browse and "> (-CAST" not in browse
+
+
+def test_search_items_pages_with_cursor():
+  db = _FakeDb([_row("batterie", 0.9), _row("akku", 0.7), _row("knopfzelle", 0.4)])
+  rows, cursor = search_items(db, "hannover", "de", " batt ", limit=2)
+  assert [r[1] for r in rows] == ["batterie", "akku"]
+  assert decode_cursor(cursor, (float, str, str)) == [0.7, "akku", "akku"]
+  sql, params = db.calls[0]
+  assert params["limit"] == 3 and params["q"] == "batt" and params["pattern"] == "%batt%"
+
+  db = _FakeDb([_row("knopfzelle", 0.4)])
+  rows, next_cursor = search_items(db, "hannover", "de", "batt", limit=2, cursor=cursor)
+  assert [r[1] for r in rows] == ["knopfzelle"] and next_cursor is None
+  assert db.calls[0][1]["after_score"] == 0.7 and db.calls[0][1]["after_key"] == "akku"
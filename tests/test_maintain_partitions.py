@@ -0,0 +1,32 @@
+import importlib.util
+from datetime import date
+from pathlib import Path
+
+
+MODULE_PATH = Path(__file__).resolve().parents[1] / "scripts" / "maintain_partitions.py"
+SPEC = importlib.util.spec_from_file_location("maintain_partitions", MODULE_PATH)
+assert SPEC and SPEC.loader
+MODULE = importlib.util.module_from_spec(SPEC)
+SPEC.loader.exec_module(MODULE)
+
+
+def test_partitions_to_create_skips_existing_months_and_wraps_year():
+    existing = ["scan_event_default", "scan_event_p202611"]
+    months = MODULE.partitions_to_create("scan_event", existing, date(2026, 10, 19), 3)
+    assert months == [date(2026, 10, 1), date(2026, 12, 1), date(2027, 1, 1)]
+
+
+def test_partitions_to_drop_only_returns_fully_elapsed_months():
+    existing = [
+        "vision_cache_default",
+        "vision_cache_p202608",
+        "vision_cache_p202609",
+        "vision_cache_p202610",
+        "scan_event_p202601",
+    ]
+    cutoff = MODULE.month_start(date(2026, 10, 19))
+    assert MODULE.partitions_to_drop("vision_cache", existing, cutoff) == [
+        "vision_cache_p202608",
+        "vision_cache_p202609",
+    ]
+    assert MODULE.add_months(date(2026, 1, 1), -24) == date(2024, 1, 1)
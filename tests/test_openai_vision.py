@@ -42,3 +42,109 @@ def test_cache_hit_avoids_network(monkeypatch):
   res = ov.recognize_item_from_base64(b64, "de")
   assert res["canonical_key"] == "item.battery"
   assert res["notes"] == "cache_hit"
+
+
+def test_probe_by_raw_hash_hits_cache(monkeypatch):
+  raw_sha = "a" * 64
+  norm_sha = "b" * 64
+  seen = {}
+
+  def fake_cache_get(key):
+    seen["key"] = key
+    return {"canonical_key": "battery", "confidence": 0.9, "labels": '["battery"]', "notes": "cache_hit", "image_id": None}
+
+  monkeypatch.setattr(ov, "_raw_hash_get", lambda raw: norm_sha if raw == raw_sha else None)
+  monkeypatch.setattr(ov, "_cache_get", fake_cache_get)
+
+  res = ov.lookup_cached_result(image_sha256=raw_sha.upper())
+  assert res["canonical_key"] == "battery"
+  assert res["labels"] == ["battery"]
+  assert res["cache_key"] == f"{norm_sha}:{ov.DEFAULT_MODEL}"
+  assert seen["key"] == res["cache_key"]
+
+
+def test_probe_miss_and_invalid_hash(monkeypatch):
+  monkeypatch.setattr(ov, "_raw_hash_get", lambda raw: None)
+  monkeypatch.setattr(ov, "_cache_get", lambda key: None)
+  assert ov.lookup_cached_result(image_sha256="c" * 64) is None
+  assert ov.lookup_cached_result(fingerprint=f"{'d' * 64}:gpt-4o-mini") is None
+  assert ov.lookup_cached_result(image_sha256="not-a-hash") is None
+
+
+def test_raw_hash_lookup_failure_is_a_miss(monkeypatch):
+  class _BrokenEngine:
+    def connect(self):
+      raise RuntimeError("db down")
+
+  monkeypatch.setattr(ov, "_get_engine", lambda: _BrokenEngine())
+  assert ov._raw_hash_get("c" * 64) is None
+  assert ov.lookup_cached_result(image_sha256="c" * 64) is None
+
+
+def test_storage_index_lookup_requires_current_model(monkeypatch):
+  row = {
+    "storage_etag": "etag-1",
+    "image_id": "img-1",
+    "cache_key": f"{'e' * 64}:{ov.DEFAULT_MODEL}",
+    "canonical_key": "battery",
+    "confidence": 0.8,
+    "labels": '["battery"]',
+    "notes": "cache_hit",
+  }
+  monkeypatch.setattr(ov, "_storage_index_get", lambda key: dict(row))
+  res = ov.lookup_cached_result_by_storage_key("guest/dev/2026/10/x.jpg")
+  assert res["storage_etag"] == "etag-1"
+  assert res["labels"] == ["battery"]
+
+  monkeypatch.setattr(ov, "_storage_index_get", lambda key: {**row, "cache_key": f"{'e' * 64}:old-model"})
+  assert ov.lookup_cached_result_by_storage_key("guest/dev/2026/10/x.jpg") is None
+
+
+def test_cache_miss_requests_neutral_labels_for_any_lang(monkeypatch):
+  calls = []
+  stored = {}
+
+  def fake_call_openai(image_b64, lang):
+    calls.append(lang)
+    return {"canonical_key": "batterie", "confidence": 0.9, "labels": ["Batterie"], "notes": None}
+
+  monkeypatch.setattr(ov, "_normalize_image", lambda _: (b"fake", "ZmFrZQ==", 1, 1))
+  raw_hashes = {}
+  writes = []
+  monkeypatch.setattr(ov, "_raw_hash_get", lambda raw: raw_hashes.get(raw))
+  monkeypatch.setattr(ov, "_raw_hash_set", lambda raw, norm: writes.append(raw) or raw_hashes.setdefault(raw, norm))
+  monkeypatch.setattr(ov, "_upsert_image_asset", lambda *args, **kwargs: None)
+  monkeypatch.setattr(ov, "_cache_get", lambda key: stored.get(key))
+  monkeypatch.setattr(ov, "_cache_set", lambda key, payload: stored.setdefault(key, dict(payload)))
+  monkeypatch.setattr(ov, "_call_openai", fake_call_openai)
+
+  first = ov.recognize_item_from_bytes(b"raw", "tr", storage_key=None)
+  second = ov.recognize_item_from_bytes(b"raw", "en", storage_key=None)
+  assert calls == [ov.LABELS_LANG]
+  assert first["labels_lang"] == second["labels_lang"] == ov.LABELS_LANG
+  assert second["labels"] == ["batterie"]
+  assert len(writes) == 1
+
+
+def test_project_labels_maps_through_aliases_and_drops_other_languages():
+  from app.services.resolve import project_labels
+
+  class _Db:
+    def __init__(self):
+      self.params = None
+
+    def execute(self, stmt, params):
+      self.params = params
+
+      class _Rows:
+        def fetchall(self_inner):
+          return [("Battery",), ("Batteries",)]
+
+      return _Rows()
+
+  db = _Db()
+  assert project_labels(db, ["Batterie"], "de", "de") == ["Batterie"]
+  assert db.params is None
+  # German labels never leak into an English response
+  assert project_labels(db, ["Batterie", "Knopfzelle"], "de", "en") == ["Battery", "Batteries"]
+  assert db.params == {"norms": ["batterie", "knopfzelle"], "labels_lang": "de", "lang": "en"}
@@ -0,0 +1,62 @@
+import threading
+
+from app.middleware.rate_limit import GcraRateLimiter
+
+
+class FakeClock:
+  def __init__(self):
+    self.now = 1000.0
+
+  def __call__(self):
+    return self.now
+
+
+def test_gcra_allows_burst_then_even_rate():
+  clock = FakeClock()
+  limiter = GcraRateLimiter(clock=clock)
+  assert all(limiter.hit("ip", limit=10, window_seconds=60) for _ in range(10))
+  assert not limiter.hit("ip", limit=10, window_seconds=60)
+  clock.now += 5.9
+  assert not limiter.hit("ip", limit=10, window_seconds=60)
+  clock.now += 0.1
+  assert limiter.hit("ip", limit=10, window_seconds=60)
+  assert not limiter.hit("ip", limit=10, window_seconds=60)
+  assert limiter.hit("other", limit=10, window_seconds=60)
+
+
+def test_gcra_has_no_window_boundary_burst():
+  clock = FakeClock()
+  limiter = GcraRateLimiter(clock=clock)
+  clock.now = 59.9
+  allowed = sum(limiter.hit("ip", limit=10, window_seconds=60) for _ in range(20))
+  clock.now = 60.1
+  allowed += sum(limiter.hit("ip", limit=10, window_seconds=60) for _ in range(20))
+  assert allowed == 10
+
+
+def test_gcra_memory_is_bounded():
+  clock = FakeClock()
+  limiter = GcraRateLimiter(shards=4, max_keys=100, sweep_seconds=1.0, clock=clock)
+  for i in range(1000):
+    limiter.hit(f"ip-{i}", limit=5, window_seconds=60)
+  assert len(limiter) <= 100
+  clock.now += 61.0
+  for i in range(4 * 25):
+    limiter.hit(f"late-{i}", limit=5, window_seconds=60)
+  assert len(limiter) <= 100
+  assert not any(key.startswith("ip-") for shard in limiter._shards for key in shard.tats)
+
+
+def test_gcra_is_exact_under_contention():
+  limiter = GcraRateLimiter(shards=8)
+  allowed = []
+
+  def worker():
+    allowed.append(sum(limiter.hit(f"k{i % 4}", limit=50, window_seconds=3600) for i in range(400)))
+
+  threads = [threading.Thread(target=worker) for _ in range(8)]
+  for t in threads:
+    t.start()
+  for t in threads:
+    t.join()
+  assert sum(allowed) == 4 * 50
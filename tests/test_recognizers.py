@@ -0,0 +1,94 @@
+from fastapi.testclient import TestClient
+
+from app.integrations.recognizers import DEFAULT_FAKE_KEYS, ChatCompletionsRecognizer, FakeRecognizer, recognizer_from_env
+from app.integrations.vision_client import VisionClient
+from app.integrations.vision_standin import create_app
+
+
+def _standin_recognizer(**standin_kwargs) -> ChatCompletionsRecognizer:
+  standin = TestClient(create_app(latency_ms=0, **standin_kwargs))
+
+  def post(url, headers, json, timeout):
+    return standin.post("/v1/chat/completions", headers=headers, json=json)
+
+  return ChatCompletionsRecognizer("standin", "http://standin/v1/chat/completions", None, "m", VisionClient(post=post))
+
+
+def test_standin_speaks_chat_completions_and_matches_fake_backend():
+  recognizer = _standin_recognizer()
+  first = recognizer.recognize("aW1hZ2UtYQ==", "de")
+  again = recognizer.recognize("aW1hZ2UtYQ==", "en")
+  expected = FakeRecognizer(DEFAULT_FAKE_KEYS.split(",")).recognize("aW1hZ2UtYQ==", "de")
+  assert first["canonical_key"] == again["canonical_key"] == expected["canonical_key"]
+  assert first["notes"] == "standin"
+
+
+def test_standin_injected_errors_surface_as_vision_error():
+  recognizer = _standin_recognizer(error_rate=1.0)
+  result = recognizer.recognize("aW1hZ2UtYQ==", "de")
+  assert result["canonical_key"] is None
+  assert result["notes"].startswith("vision_error: status=500")
+
+
+def test_backend_selected_by_env(monkeypatch):
+  client = VisionClient()
+  monkeypatch.setenv("VISION_BACKEND", "fake")
+  assert recognizer_from_env(client, "m").name == "fake"
+  monkeypatch.setenv("VISION_BACKEND", "standin")
+  monkeypatch.setenv("VISION_STANDIN_URL", "http://127.0.0.1:9999/v1/chat/completions")
+  standin = recognizer_from_env(client, "m")
+  assert (standin.name, standin.url) == ("standin", "http://127.0.0.1:9999/v1/chat/completions")
+
+
+def test_miss_batcher_groups_concurrent_misses_and_demultiplexes():
+  import threading
+  from app.integrations.openai_vision import MissBatcher
+
+  calls = []
+
+  def call_many(images, lang):
+    calls.append(list(images))
+    return [{"canonical_key": image, "confidence": 0.9, "labels": [], "notes": lang} for image in images]
+
+  batcher = MissBatcher(call_many, max_batch=4, max_wait=1.0)
+  results = {}
+
+  def worker(name):
+    results[name] = batcher.recognize(name, "de")
+
+  threads = [threading.Thread(target=worker, args=(f"img{i}",)) for i in range(4)]
+  for t in threads:
+    t.start()
+  for t in threads:
+    t.join(timeout=5)
+  assert len(calls) == 1 and sorted(calls[0]) == ["img0", "img1", "img2", "img3"]
+  assert all(results[name]["canonical_key"] == name for name in results)
+
+
+
+def test_miss_batcher_followers_stop_waiting_for_a_hung_leader():
+  import threading
+  from app.integrations.openai_vision import MissBatcher
+
+  release = threading.Event()
+
+  def call_many(images, lang):
+    release.wait(5)
+    return [{"canonical_key": image, "confidence": 0.9, "labels": [], "notes": None} for image in images]
+
+  batcher = MissBatcher(call_many, max_batch=2, max_wait=1.0, result_timeout=0.2)
+  leader = threading.Thread(target=batcher.recognize, args=("img0", "de"))
+  leader.start()
+  while not batcher._open:
+    release.wait(0.001)
+  assert batcher.recognize("img1", "de")["notes"] == "vision_error: timeout"
+  release.set()
+  leader.join(timeout=5)
+
+def test_batched_request_through_standin_is_split_per_image():
+  recognizer = _standin_recognizer()
+  images = ["aW1hZ2UtYQ==", "aW1hZ2UtYg==", "aW1hZ2UtYw=="]
+  batched = recognizer.recognize_many(images, "de")
+  single = [recognizer.recognize(image, "de") for image in images]
+  assert [r["canonical_key"] for r in batched] == [r["canonical_key"] for r in single]
+  assert "index" not in batched[0]
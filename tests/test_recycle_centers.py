@@ -0,0 +1,173 @@
+import math
+import random
+
+from app.services.recycle_centers import CityCenterIndex, RecycleCenterIndex, centers_for_disposals, clusters_in_bbox
+
+
+def _center(i, lat, lng, typ_code=1, disposal=None):
+  return {
+    "id": f"c{i}",
+    "name": f"Center {i}",
+    "address": "",
+    "lat": lat,
+    "lng": lng,
+    "typ_code": typ_code,
+    "typ_label": None,
+    "has_glas": False,
+    "has_kleider": False,
+    "has_papier": False,
+    "disposal_positive": disposal or [],
+  }
+
+
+def _brute_km(lat1, lng1, lat2, lng2):
+  dlat = math.radians(lat2 - lat1)
+  dlng = math.radians(lng2 - lng1)
+  a = math.sin(dlat / 2) ** 2 + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(dlng / 2) ** 2
+  return 2 * 6371.0 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+
+
+def _centers(count=500, seed=7):
+  rng = random.Random(seed)
+  return [
+    _center(
+      i,
+      52.3 + rng.random() * 0.2,
+      9.6 + rng.random() * 0.3,
+      typ_code=rng.choice([1, 2, 3]),
+      disposal=rng.sample(["glas", "papier", "e_schrott"], rng.randint(0, 2)),
+    )
+    for i in range(count)
+  ]
+
+
+def test_nearest_matches_brute_force():
+  centers = _centers()
+  index = CityCenterIndex(centers)
+  for lat, lng in [(52.37, 9.73), (52.30, 9.60), (52.60, 10.2)]:
+    got = index.nearest(lat, lng, k=10)
+    expected = sorted(_brute_km(lat, lng, c["lat"], c["lng"]) for c in centers)[:10]
+    assert [round(d, 6) for _, d in got] == [round(d, 6) for d in expected]
+
+
+def test_nearest_applies_radius_and_filters():
+  centers = _centers()
+  index = CityCenterIndex(centers)
+  got = index.nearest(52.37, 9.73, k=1000, radius_km=2.0, typ_code=2, disposal_positive="glas")
+  expected = {
+    c["id"]
+    for c in centers
+    if c["typ_code"] == 2
+    and "glas" in c["disposal_positive"]
+    and _brute_km(52.37, 9.73, c["lat"], c["lng"]) <= 2.0
+  }
+  assert {c["id"] for c, _ in got} == expected
+  assert all(d <= 2.0 for _, d in got)
+  assert index.nearest(52.37, 9.73, k=5, disposal_positive="unknown") == []
+
+
+def test_nearest_far_away_and_just_outside_match_brute_force():
+  centers = _centers()
+  index = CityCenterIndex(centers)
+  # New York (brute-force pass) and a point a few cells outside the city (ring walk).
+  for lat, lng in [(40.71, -74.0), (52.25, 9.55), (-89.9, 179.9)]:
+    got = index.nearest(lat, lng, k=5, typ_code=1)
+    expected = sorted(_brute_km(lat, lng, c["lat"], c["lng"]) for c in centers if c["typ_code"] == 1)[:5]
+    assert [round(d, 6) for _, d in got] == [round(d, 6) for d in expected]
+  assert index.nearest(40.71, -74.0, k=5, radius_km=50.0) == []
+  assert index.nearest(float("nan"), 9.7, k=5) == []
+
+
+def test_filtered_keeps_load_order():
+  centers = [_center(0, 52.0, 9.0, typ_code=1), _center(1, 52.1, 9.1, typ_code=2), _center(2, 52.2, 9.2, typ_code=1)]
+  index = CityCenterIndex(centers)
+  assert [c["id"] for c in index.filtered(typ_code=1)] == ["c0", "c2"]
+
+
+def test_snapshot_limit_truncates_or_shares_the_full_snapshot():
+  index = CityCenterIndex([_center(i, 52.0 + i / 100, 9.0) for i in range(3)])
+
+  def render(city, centers):
+    return ",".join(c["id"] for c in centers).encode()
+
+  full = index.snapshot("hannover", None, render)
+  assert full.count == 3
+  assert index.snapshot("hannover", None, render, limit=5) is full
+  assert index.snapshot("hannover", None, render, limit=2).body == b"c0,c1"
+  assert [c["id"] for c in index.filtered()] == ["c0", "c1", "c2"]
+
+
+def test_index_reloads_when_dataset_version_changes(monkeypatch):
+  import app.services.recycle_centers as module
+  import app.services.snapshots as snapshots
+
+  state = {"version": 1, "loads": 0}
+
+  def fake_load(db, city_id):
+    state["loads"] += 1
+    return [_center(0, 52.0, 9.0)]
+
+  monkeypatch.setattr(snapshots, "dataset_version", lambda db, dataset: state["version"])
+  monkeypatch.setattr(module, "load_centers", fake_load)
+  cache = RecycleCenterIndex(check_seconds=0)
+  first = cache.get(None, "city-1")
+  assert cache.get(None, "city-1") is first
+  assert state["loads"] == 1
+  state["version"] = 2
+  assert cache.get(None, "city-1") is not first
+  assert state["loads"] == 2
+
+
+def test_clusters_cover_every_center_and_split_at_high_zoom():
+  centers = _centers(count=300)
+  index = CityCenterIndex(centers, cluster_max_zoom=13)
+  low = index.clusters(8)
+  assert int(low.count.sum()) == len(centers)
+  assert len(low) < 5
+  clusters, singles = clusters_in_bbox(index, index.clusters(20), None)
+  assert clusters == []
+  assert len(singles) == len(centers)
+
+
+def test_cluster_dominant_type_and_bbox():
+  centers = [
+    _center(0, 52.370, 9.730, typ_code=2),
+    _center(1, 52.371, 9.731, typ_code=1),
+    _center(2, 52.372, 9.732, typ_code=2),
+    _center(3, 48.100, 11.500, typ_code=3),
+  ]
+  index = CityCenterIndex(centers, cluster_max_zoom=10)
+  clusters, singles = clusters_in_bbox(index, index.clusters(10), (9.0, 52.0, 10.0, 53.0))
+  assert len(clusters) == 1
+  assert clusters[0]["count"] == 3
+  assert clusters[0]["typ_code"] == 2
+  assert abs(clusters[0]["lat"] - 52.371) < 1e-9
+  assert singles == []
+  _, singles = clusters_in_bbox(index, index.clusters(10, typ_code=1), None)
+  assert [c["id"] for c in singles] == ["c1"]
+  cached = len(index._clusters)
+  assert len(index.clusters(10, typ_code=99)) == 0
+  assert len(index.clusters(10, disposal_positive="unknown")) == 0
+  assert len(index._clusters) == cached
+  assert [c["id"] for c in index.in_bbox((11.0, 48.0, 12.0, 49.0))] == ["c3"]
+
+
+def test_centers_for_disposals_maps_type_code_and_berlin_labels():
+  centers = [
+    _center(0, 52.50, 13.40, typ_code=1, disposal=["Recyclinghöfe"]),
+    _center(1, 52.51, 13.41, typ_code=2, disposal=["Recyclinghöfe", "Recyclinghöfe mit Schadstoff-Annahme"]),
+    _center(2, 52.60, 13.50, typ_code=2, disposal=[]),
+  ]
+  index = CityCenterIndex(centers)
+  disposals = [
+    {"code": "recyclinghoefe_mit_schadstoff_annahme", "label": "Schadstoffe", "recycle_center_typ_code": None},
+    {"code": "any", "label": "Typ 2", "recycle_center_typ_code": 2},
+    {"code": "gelbe_tonne", "label": "Gelbe Tonne", "recycle_center_typ_code": None},
+  ]
+  out = centers_for_disposals(index, "berlin", disposals, 52.50, 13.40, k=5)
+  assert [c["id"] for c in out[0]["centers"]] == ["c1"]
+  assert [c["id"] for c in out[1]["centers"]] == ["c1", "c2"]
+  assert out[1]["centers"][0]["distance_km"] > 0
+  assert out[2]["centers"] == []
+  assert "centers" not in disposals[0]
+
@@ -0,0 +1,132 @@
+import json
+import os
+from contextlib import contextmanager
+
+from sqlalchemy.exc import DataError
+
+from app.services.scan_events import ScanEventBuffer
+
+
+class _FakeEngine:
+  """Commits a transaction's statements only when it ends without error."""
+
+  def __init__(self, fail: bool = False, fail_after=None, bad_image_ids=()):
+    self.statements = []
+    self.fail = fail
+    self.fail_after = fail_after
+    self.bad_image_ids = set(bad_image_ids)
+
+  @contextmanager
+  def begin(self):
+    engine = self
+    pending = []
+
+    class _Conn:
+      def execute(self, stmt, params):
+        if engine.fail or (engine.fail_after is not None and len(engine.statements) >= engine.fail_after):
+          raise RuntimeError("db down")
+        bad = [v for k, v in params.items() if k.startswith("image_id_") and v in engine.bad_image_ids]
+        if bad:
+          raise DataError(str(stmt), params, ValueError(f"invalid input syntax for type uuid: {bad[0]}"))
+        pending.append((str(stmt), params))
+
+      @contextmanager
+      def begin_nested(self):
+        mark = len(pending)
+        try:
+          yield
+        except Exception:
+          del pending[mark:]
+          raise
+
+    yield _Conn()
+    engine.statements.extend(pending)
+
+
+def _event(i: int) -> dict:
+  return {"image_id": f"img-{i}", "city_id": "city-1", "source": "scan"}
+
+
+def test_buffer_flushes_multi_row_batches_and_drains_on_close():
+  engine = _FakeEngine()
+  buf = ScanEventBuffer(engine, batch_size=3, flush_interval=60, max_pending=10)
+  for i in range(4):
+    buf.submit(_event(i))
+  buf.close()
+  assert buf.pending() == 0
+  written = [p for _, params in engine.statements for k, p in params.items() if k.startswith("image_id_")]
+  assert sorted(written) == ["img-0", "img-1", "img-2", "img-3"]
+  assert any(stmt.count("CAST(:created_at_") == 3 for stmt, _ in engine.statements)
+
+
+def test_spool_survives_failed_flush_and_is_replayed(tmp_path):
+  spool = str(tmp_path / "scan_events.jsonl")
+  down = ScanEventBuffer(_FakeEngine(fail=True), batch_size=100, flush_interval=60, spool_path=spool)
+  down.submit(_event(1))
+  down.submit(_event(2))
+  down.close()
+  assert down.pending() == 2
+
+  engine = _FakeEngine()
+  restarted = ScanEventBuffer(engine, batch_size=100, flush_interval=60, spool_path=spool)
+  restarted.start()
+  assert restarted.pending() == 2
+  restarted.close()
+  assert restarted.pending() == 0
+  assert open(f"{spool}.{os.getpid()}").read() == ""
+  assert engine.statements[0][1]["image_id_0"] == "img-1"
+
+
+def test_full_buffer_drops_instead_of_growing():
+  buf = ScanEventBuffer(_FakeEngine(fail=True), batch_size=2, flush_interval=60, max_pending=2, block_seconds=0)
+  for i in range(5):
+    buf.submit(_event(i))
+  assert buf.pending() == 2
+  assert buf.dropped == 3
+  buf.close()
+
+
+def test_spool_marks_written_rows_and_adopts_dead_process_spool(tmp_path):
+  spool = str(tmp_path / "scan_events.jsonl")
+  # pid above the kernel's pid_max: never a running process
+  with open(f"{spool}.99999999", "w") as fh:
+    for i in range(3):
+      fh.write(json.dumps({"image_id": f"old-{i}"}) + "\n")
+    fh.write(json.dumps({"_written": 2}) + "\n")
+
+  # Only the first batch of two rows gets in, whichever thread flushes it.
+  engine = _FakeEngine(fail_after=1)
+  buf = ScanEventBuffer(engine, batch_size=2, flush_interval=60, max_pending=100, spool_path=spool)
+  buf.start()
+  assert buf.pending() == 1
+  assert not os.path.exists(f"{spool}.99999999")
+  buf.submit(_event(1))
+  buf.submit(_event(2))
+  buf.flush()
+  assert buf.pending() == 1
+  assert ScanEventBuffer._read_spool(f"{spool}.{os.getpid()}") == [buf._pending[0]]
+  engine.fail_after = None
+  buf.close()
+
+
+def test_rejected_row_is_dropped_without_duplicating_the_rest():
+  engine = _FakeEngine(bad_image_ids={"img-1"})
+  buf = ScanEventBuffer(engine, batch_size=3, flush_interval=60, max_pending=10)
+  for i in range(3):
+    buf.submit(_event(i))
+  buf.close()
+  assert buf.pending() == 0
+  written = [p for _, params in engine.statements for k, p in params.items() if k.startswith("image_id_")]
+  assert sorted(written) == ["img-0", "img-2"]
+
+
+def test_spool_append_does_not_wait_for_a_busy_spool(tmp_path):
+  spool = str(tmp_path / "scan_events.jsonl")
+  buf = ScanEventBuffer(_FakeEngine(fail=True), batch_size=100, flush_interval=60, spool_path=spool)
+  buf.start()
+  with buf._spool_lock:
+    buf.submit(_event(1))
+    assert buf.pending() == 1
+  buf.flush()
+  assert ScanEventBuffer._read_spool(f"{spool}.{os.getpid()}") == buf._pending
+  buf.close()
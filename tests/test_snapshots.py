@@ -0,0 +1,31 @@
+import gzip
+
+import brotli
+
+from app.services.snapshots import Snapshot, etag_matches
+
+
+def test_snapshot_variants_round_trip():
+  body = b'{"centers": [' + b",".join(b'{"name": "Center"}' for _ in range(200)) + b"]}"
+  snapshot = Snapshot(body, count=200)
+  assert gzip.decompress(snapshot.gzip) == body
+  assert brotli.decompress(snapshot.brotli) == body
+  assert len(snapshot.brotli) < len(snapshot.gzip) < len(body)
+  assert Snapshot(body).etag == snapshot.etag
+
+
+def test_snapshot_encoding_negotiation():
+  snapshot = Snapshot(b"{}")
+  assert snapshot.encoded("gzip, deflate, br")[1] == "br"
+  assert snapshot.encoded("gzip;q=1.0, br;q=0")[1] == "gzip"
+  assert snapshot.encoded("identity") == (b"{}", None)
+  assert snapshot.encoded("") == (b"{}", None)
+
+
+def test_etag_matches():
+  etag = Snapshot(b"{}").etag
+  assert etag_matches(etag, etag)
+  assert etag_matches(f'"other", W/{etag}', etag)
+  assert etag_matches("*", etag)
+  assert not etag_matches('"other"', etag)
+  assert not etag_matches(None, etag)
@@ -0,0 +1,86 @@
+import pytest
+from jose import jwt
+
+from app.auth.token_cache import TokenRejected, VerifiedTokenCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+class CountingVerifier:
+    def __init__(self, exp):
+        self.exp = exp
+        self.calls = 0
+
+    def __call__(self, token):
+        self.calls += 1
+        if not token.startswith("good"):
+            raise jwt.JWTError("bad signature")
+        return {"sub": token, "exp": self.exp}
+
+
+def test_valid_token_is_verified_once_until_exp():
+    clock = FakeClock()
+    verify = CountingVerifier(exp=clock.now + 60)
+    cache = VerifiedTokenCache(clock=clock)
+    assert cache.verify("good-1", verify)["sub"] == "good-1"
+    assert cache.verify("good-1", verify)["sub"] == "good-1"
+    assert verify.calls == 1
+    clock.now += 60
+    cache.verify("good-1", verify)
+    assert verify.calls == 2
+
+
+def test_invalid_token_is_negatively_cached():
+    clock = FakeClock()
+    verify = CountingVerifier(exp=clock.now + 60)
+    cache = VerifiedTokenCache(negative_ttl_seconds=30, clock=clock)
+    with pytest.raises(jwt.JWTError):
+        cache.verify("garbage", verify)
+    with pytest.raises(TokenRejected):
+        cache.verify("garbage", verify)
+    assert verify.calls == 1
+    clock.now += 30
+    with pytest.raises(jwt.JWTError):
+        cache.verify("garbage", verify)
+    assert verify.calls == 2
+
+
+def test_cache_is_bounded_and_garbage_does_not_evict_valid_tokens():
+    clock = FakeClock()
+    verify = CountingVerifier(exp=clock.now + 600)
+    cache = VerifiedTokenCache(max_entries=10, max_rejected=5, clock=clock)
+    for i in range(50):
+        cache.verify(f"good-{i}", verify)
+    assert len(cache) == 10
+    for i in range(1000):
+        with pytest.raises(jwt.JWTError):
+            cache.verify(f"junk-{i}", verify)
+    calls = verify.calls
+    cache.verify("good-49", verify)
+    assert verify.calls == calls
+
+
+def test_resolve_principal_uses_cache(monkeypatch):
+    import app.main as main
+    from app.auth.guest import issue_guest_token
+    from starlette.requests import Request
+
+    token = issue_guest_token("device-cache-test", main.settings)["token"]
+    calls = []
+
+    def counting(token, settings):
+        calls.append(token)
+        return jwt.decode(token, settings.GUEST_JWT_SECRET, algorithms=["HS256"])
+
+    monkeypatch.setattr(main, "verify_guest_token", counting)
+    monkeypatch.setattr(main, "guest_tokens", VerifiedTokenCache())
+    request = Request({"type": "http", "method": "GET", "path": "/", "headers": [(b"authorization", f"Bearer {token}".encode())]})
+    for _ in range(3):
+        assert main._resolve_principal(request)["sub"] == "guest:device-cache-test"
+    assert len(calls) == 1
@@ -0,0 +1,121 @@
+import asyncio
+import hashlib
+
+from fastapi import HTTPException
+from starlette.requests import Request
+
+from app.storage.uploads import stage_multipart
+
+BOUNDARY = "testboundary"
+
+
+def _multipart_body(file_bytes: bytes) -> bytes:
+  return (
+    f"--{BOUNDARY}\r\n"
+    'Content-Disposition: form-data; name="city"\r\n\r\n'
+    "hannover\r\n"
+    f"--{BOUNDARY}\r\n"
+    'Content-Disposition: form-data; name="file"; filename="a.jpg"\r\n'
+    "Content-Type: image/jpeg\r\n\r\n"
+  ).encode() + file_bytes + f"\r\n--{BOUNDARY}--\r\n".encode()
+
+
+def _request(body: bytes, chunk: int = 1000, content_length: bool = True) -> tuple[Request, list]:
+  chunks = [body[i : i + chunk] for i in range(0, len(body), chunk)]
+  sent = []
+
+  async def receive():
+    data = chunks.pop(0) if chunks else b""
+    sent.append(len(data))
+    return {"type": "http.request", "body": data, "more_body": bool(chunks)}
+
+  headers = [(b"content-type", f"multipart/form-data; boundary={BOUNDARY}".encode())]
+  if content_length:
+    headers.append((b"content-length", str(len(body)).encode()))
+  scope = {"type": "http", "method": "POST", "path": "/analyze", "headers": headers}
+  return Request(scope, receive), sent
+
+
+def test_stage_multipart_hashes_while_streaming():
+  payload = bytes(range(256)) * 40
+  request, _ = _request(_multipart_body(payload))
+
+  async def run():
+    staged = await stage_multipart(request, max_file_bytes=len(payload), spool_max_bytes=1024)
+    try:
+      assert staged.form.get("city") == "hannover"
+      assert staged.size == len(payload)
+      assert staged.sha256 == hashlib.sha256(payload).hexdigest()
+      reader_a, reader_b = staged.reader(), staged.reader()
+      assert reader_a.read(10) == payload[:10]
+      assert reader_b.read() == payload
+      assert reader_a.read() == payload[10:]
+    finally:
+      await staged.close()
+
+  asyncio.run(run())
+
+
+def test_stage_multipart_rejects_oversized_upload_early():
+  payload = b"x" * 50_000
+  request, sent = _request(_multipart_body(payload), content_length=False)
+
+  async def run():
+    await stage_multipart(request, max_file_bytes=10_000, spool_max_bytes=1024)
+
+  try:
+    asyncio.run(run())
+    assert False, "expected HTTPException"
+  except HTTPException as exc:
+    assert exc.status_code == 413
+  # Rejected mid-stream, not after receiving the whole body.
+  assert sum(sent) < 50_000
+
+
+def test_stage_multipart_rejects_by_content_length():
+  request, sent = _request(_multipart_body(b"x" * 200_000))
+
+  async def run():
+    await stage_multipart(request, max_file_bytes=10_000, spool_max_bytes=1024)
+
+  try:
+    asyncio.run(run())
+    assert False, "expected HTTPException"
+  except HTTPException as exc:
+    assert exc.status_code == 413
+  assert sent == []
+
+
+def test_admin_image_upload_dedups_without_s3(monkeypatch):
+  import base64
+  from fastapi.testclient import TestClient
+  import app.main as main
+
+  normalized_calls = []
+
+  def fake_normalize(raw):
+    normalized_calls.append(raw)
+    return {"normalized_bytes": b"n", "sha256": "f" * 64, "width": 1, "height": 1}
+
+  def no_upload(*args, **kwargs):
+    raise AssertionError("known image must not be uploaded again")
+
+  monkeypatch.setattr(main, "_require_admin", lambda request: {"type": "admin", "sub": "admin:session"})
+  monkeypatch.setattr(main, "normalize_for_storage", fake_normalize)
+  monkeypatch.setattr(main, "find_image_by_sha256", lambda sha: {"image_id": "img-1", "storage_key": "admin/k.jpg"})
+  monkeypatch.setattr(main, "upload_fileobj", no_upload)
+  monkeypatch.setattr(main, "_image_url", lambda db, image_id: None)
+  main.app.dependency_overrides[main.get_db] = lambda: None
+  try:
+    client = TestClient(main.app)
+    raw = b"\x89PNG\r\n\x1a\n" + b"0" * 32
+    res = client.post("/admin/images", json={"image_base64": base64.b64encode(raw).decode()})
+    assert res.status_code == 200
+    assert res.json() == {"image_id": "img-1", "image_url": None, "s3_key": "admin/k.jpg"}
+
+    res = client.post("/admin/images", files={"file": ("a.png", raw, "image/png")}, data={"source": "admin"})
+    assert res.status_code == 200
+    assert res.json()["image_id"] == "img-1"
+  finally:
+    main.app.dependency_overrides.clear()
+  assert normalized_calls == [raw, raw]
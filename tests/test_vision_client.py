@@ -0,0 +1,124 @@
+import threading
+import time
+
+import httpx
+
+from app.integrations.vision_client import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, VisionClient, VisionUnavailable
+
+
+class _Clock:
+  def __init__(self):
+    self.now = 0.0
+
+  def __call__(self):
+    return self.now
+
+
+def _response(status: int = 200) -> httpx.Response:
+  return httpx.Response(status, json={"choices": []})
+
+
+def test_circuit_opens_fails_fast_and_recovers_via_half_open_probe():
+  clock = _Clock()
+  calls = []
+
+  def post(url, headers, json, timeout):
+    calls.append(timeout)
+    if len(calls) <= 2:
+      raise httpx.ReadTimeout("slow")
+    return _response()
+
+  client = VisionClient(breaker=CircuitBreaker(failure_threshold=2, open_seconds=30, clock=clock), post=post)
+  for _ in range(2):
+    try:
+      client.post("u", {}, {})
+    except httpx.ReadTimeout:
+      pass
+  assert client.breaker.state == OPEN
+  try:
+    client.post("u", {}, {})
+    assert False, "expected fail-fast"
+  except VisionUnavailable:
+    pass
+  assert len(calls) == 2
+
+  clock.now = 31
+  assert client.breaker.state == HALF_OPEN
+  assert client.post("u", {}, {}).status_code == 200
+  assert client.breaker.state == CLOSED
+  metrics = client.metrics()
+  assert metrics["circuit"]["opened"] == 1
+  assert metrics["circuit"]["short_circuited"] == 1
+
+
+def test_timeout_adapts_to_latency_and_hedge_fires_after_p95():
+  client = VisionClient(min_samples=5, min_timeout=0.5, max_timeout=10, timeout_multiplier=2, hedge_enabled=True)
+  assert client.current_timeout() == 10
+  for _ in range(10):
+    client.latency.record(0.05)
+  assert client.current_timeout() == 0.5
+
+  calls = []
+
+  def post(url, headers, json, timeout):
+    calls.append(timeout)
+    if len(calls) == 1:
+      time.sleep(0.3)
+      raise httpx.ReadTimeout("slow")
+    return _response()
+
+  client._post = post
+  assert client.post("u", {}, {}).status_code == 200
+  assert client.counters["hedges_fired"] == 1
+  assert client.counters["hedges_won"] == 1
+
+
+def test_hedge_runs_off_the_callers_thread_and_only_covers_a_failed_primary():
+  client = VisionClient(min_samples=5, max_timeout=10, hedge_enabled=True, hedge_workers=1)
+  for _ in range(10):
+    client.latency.record(0.05)
+  threads = []
+
+  def post(url, headers, json, timeout):
+    threads.append(threading.current_thread())
+    if len(threads) == 1:
+      time.sleep(0.3)
+      return _response(200)
+    return _response(201)
+
+  client._post = post
+  assert client.post("u", {}, {}).status_code == 200
+  assert threads[0] is threading.current_thread()
+  assert client.counters["hedges_fired"] == 1 and client.counters["hedges_won"] == 0
+
+
+def test_timeouts_feed_latency_and_probe_gets_max_timeout():
+  clock = _Clock()
+  calls = []
+
+  def post(url, headers, json, timeout):
+    calls.append(timeout)
+    raise httpx.ReadTimeout("slow")
+
+  client = VisionClient(
+    breaker=CircuitBreaker(failure_threshold=1, open_seconds=30, clock=clock),
+    min_samples=1,
+    min_timeout=0.5,
+    max_timeout=10,
+    post=post,
+  )
+  client.latency.record(0.05)
+  assert client.current_timeout() == 0.5
+  try:
+    client.post("u", {}, {})
+  except httpx.ReadTimeout:
+    pass
+  assert client.latency.count() == 2
+  assert client.counters["timeouts"] == 1
+
+  clock.now = 31
+  try:
+    client.post("u", {}, {})
+  except httpx.ReadTimeout:
+    pass
+  assert calls == [0.5, 10]